@@ -0,0 +1,319 @@
+"""
+Almacén opcional de resultados en SQLite.
+Guarda por factura las variables generales, los ítems, las filas de comparación y el
+Log_Proceso, con llave (hash del PDF, No. Factura). Reprocesar un PDF reemplaza sus
+filas (upsert) y el consolidado se puede regenerar con una consulta (por contrato,
+mes, NIT o factura) sin volver a leer ningún PDF.
+Las columnas son las de exportacion.COLUMNAS en snake_case ('Fecha Expedición' ->
+fecha_expedicion) y se tipan igual que en los formatos columnares.
+"""
+
+import re
+import sqlite3
+import logging
+import unicodedata
+from datetime import datetime, date
+from exportacion import COLUMNAS, crear_exportador_streaming
+from exportacion_columnar import (
+    TIPOS_COLUMNAS, TIPO_TEXTO, TIPO_DECIMAL, TIPO_ENTERO, FORMATO_FECHA_HORA, convertir_valor,
+)
+
+logger = logging.getLogger(__name__)
+
+VERSION_ESQUEMA = 2
+FACTURAS_POR_TRANSACCION = 200
+
+# Tabla de cada dataset
+TABLAS = {
+    'generales': 'facturas',
+    'conceptos': 'conceptos',
+    'comparacion': 'comparacion',
+    'validacion': 'validacion',
+}
+
+# Índices de consulta sobre la tabla de facturas
+COLUMNAS_INDEXADAS = ['no_factura', 'no_contrato', 'nit_cliente', 'fecha_expedicion']
+
+TIPOS_SQL = {
+    TIPO_TEXTO: 'TEXT',
+    TIPO_DECIMAL: 'REAL',
+    TIPO_ENTERO: 'INTEGER',
+}
+
+_NO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+_MES = re.compile(r'^(\d{4})-(\d{2})$')
+
+def nombre_sql(columna):
+    """
+    Nombre de columna SQL a partir del título del Excel.
+    Ej: 'Total Facturado (Subtotal)' -> 'total_facturado_subtotal'
+    """
+    sin_tildes = unicodedata.normalize('NFKD', columna).encode('ascii', 'ignore').decode('ascii')
+    return _NO_ALFANUMERICO.sub('_', sin_tildes.lower()).strip('_')
+
+def _valor_sql(valor, tipo):
+    valor = convertir_valor(valor, tipo)
+    if isinstance(valor, datetime):
+        return valor.strftime(FORMATO_FECHA_HORA)
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return valor
+
+def rango_mes(mes):
+    """
+    Límites [inicio, fin) de un mes 'AAAA-MM' como fechas ISO.
+    """
+    m = _MES.match(mes or '')
+    if not m or not 1 <= int(m.group(2)) <= 12:
+        raise ValueError(f"Mes inválido (se espera AAAA-MM): {mes}")
+    anio, numero = int(m.group(1)), int(m.group(2))
+    siguiente = (anio + 1, 1) if numero == 12 else (anio, numero + 1)
+    return f"{anio:04d}-{numero:02d}-01", f"{siguiente[0]:04d}-{siguiente[1]:02d}-01"
+
+class AlmacenResultados:
+    """
+    Resultados de extracción en una base SQLite.
+    Las escrituras se acumulan y se confirman en una sola transacción cada
+    'facturas_por_transaccion' facturas (o al llamar vaciar / cerrar).
+    """
+    def __init__(self, ruta, facturas_por_transaccion=FACTURAS_POR_TRANSACCION):
+        self.ruta = ruta
+        self.facturas_por_transaccion = max(1, int(facturas_por_transaccion))
+        self.columnas_sql = {clave: [nombre_sql(c) for c in cols] for clave, cols in COLUMNAS.items()}
+        self.tipos = {
+            clave: [TIPOS_COLUMNAS.get(clave, {}).get(c, TIPO_TEXTO) for c in cols]
+            for clave, cols in COLUMNAS.items()
+        }
+        self.pendientes = []
+        self.facturas_guardadas = 0
+        self.conexion = sqlite3.connect(ruta)
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.execute("PRAGMA synchronous=NORMAL")
+        self._crear_esquema()
+
+    def _crear_esquema(self):
+        version = self.conexion.execute("PRAGMA user_version").fetchone()[0]
+        if version > VERSION_ESQUEMA:
+            raise ValueError(f"{self.ruta} usa un esquema más nuevo ({version}) que este programa ({VERSION_ESQUEMA})")
+
+        with self.conexion:
+            for clave, tabla in TABLAS.items():
+                columnas = [
+                    f"{nombre} {TIPOS_SQL.get(tipo, 'TEXT')}"
+                    for nombre, tipo in zip(self.columnas_sql[clave], self.tipos[clave])
+                    if nombre not in ('no_factura',)
+                ]
+                if clave == 'generales':
+                    definicion = (
+                        "hash_pdf TEXT NOT NULL, no_factura TEXT NOT NULL, "
+                        f"{', '.join(columnas)}, actualizado TEXT, PRIMARY KEY (hash_pdf, no_factura)"
+                    )
+                else:
+                    # hash_pdf es NULL en los registros de PDFs que no se pudieron leer
+                    definicion = f"hash_pdf TEXT, no_factura TEXT, posicion INTEGER, {', '.join(columnas)}"
+                self.conexion.execute(f"CREATE TABLE IF NOT EXISTS {tabla} ({definicion})")
+                if clave != 'generales':
+                    self.conexion.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_{tabla}_llave ON {tabla} (hash_pdf, no_factura)"
+                    )
+
+            if 0 < version < VERSION_ESQUEMA:
+                self._migrar()
+
+            for columna in COLUMNAS_INDEXADAS:
+                self.conexion.execute(f"CREATE INDEX IF NOT EXISTS idx_facturas_{columna} ON facturas ({columna})")
+            self.conexion.execute("CREATE INDEX IF NOT EXISTS idx_validacion_archivo ON validacion (archivo)")
+            self.conexion.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+
+    def _migrar(self):
+        """
+        Agrega a las tablas de un esquema anterior las columnas nuevas de COLUMNAS
+        (versión 2: 'Nombre Archivo' en conceptos y comparacion; NULL en las filas viejas).
+        """
+        for clave, tabla in TABLAS.items():
+            existentes = {fila[1] for fila in self.conexion.execute(f"PRAGMA table_info({tabla})")}
+            for nombre, tipo in zip(self.columnas_sql[clave], self.tipos[clave]):
+                if nombre not in existentes:
+                    self.conexion.execute(f"ALTER TABLE {tabla} ADD COLUMN {nombre} {TIPOS_SQL.get(tipo, 'TEXT')}")
+
+    # --- ESCRITURA ---
+
+    def agregar(self, filas):
+        """
+        Agrega los resultados de una factura.
+        Args:
+            filas (dict): Listas de filas (dicts) por dataset, como las de main.construir_filas,
+                con 'hash_pdf' (None para un PDF que no se pudo leer).
+        """
+        hash_pdf = filas.get('hash_pdf')
+        registro = {'hash_pdf': hash_pdf}
+        for clave in TABLAS:
+            columnas = COLUMNAS[clave]
+            tipos = self.tipos[clave]
+            # La factura es parte de la llave: vacía en lugar de NULL
+            registro[clave] = [
+                tuple(_valor_sql(v, t) if c != 'No. Factura' else str(v or '')
+                      for v, c, t in zip(valores, columnas, tipos))
+                for valores in (
+                    fila if isinstance(fila, tuple) else tuple(fila.get(c) for c in columnas)
+                    for fila in filas.get(clave, [])
+                )
+            ]
+        idx_archivo = COLUMNAS['validacion'].index('Archivo')
+        registro['archivos'] = [fila[idx_archivo] if isinstance(fila, tuple) else fila.get('Archivo')
+                                for fila in filas.get('validacion', [])]
+        self.pendientes.append(registro)
+        if len(self.pendientes) >= self.facturas_por_transaccion:
+            self.vaciar()
+
+    def vaciar(self):
+        """
+        Confirma las facturas pendientes en una sola transacción.
+        """
+        if not self.pendientes:
+            return
+        ahora = datetime.now().strftime(FORMATO_FECHA_HORA)
+        try:
+            with self.conexion:
+                for registro in self.pendientes:
+                    self._escribir(registro, ahora)
+        except sqlite3.Error as e:
+            logger.error(f"Error al guardar {len(self.pendientes)} facturas en {self.ruta}: {e}")
+            raise
+        self.facturas_guardadas += len(self.pendientes)
+        self.pendientes = []
+
+    def _escribir(self, registro, ahora):
+        hash_pdf = registro['hash_pdf']
+        conexion = self.conexion
+
+        # 1. Upsert: las filas anteriores del mismo PDF se reemplazan
+        if hash_pdf is not None:
+            for tabla in TABLAS.values():
+                conexion.execute(f"DELETE FROM {tabla} WHERE hash_pdf = ?", (hash_pdf,))
+        # Un PDF que antes falló y ahora se leyó (o volvió a fallar) reemplaza su registro de error
+        conexion.executemany(
+            "DELETE FROM validacion WHERE hash_pdf IS NULL AND archivo = ?",
+            [(a,) for a in registro['archivos'] if a]
+        )
+
+        # 2. Filas nuevas
+        for clave, tabla in TABLAS.items():
+            filas = registro[clave]
+            if not filas:
+                continue
+            columnas = self.columnas_sql[clave]
+            if clave == 'generales':
+                conexion.executemany(
+                    f"INSERT INTO facturas (hash_pdf, {', '.join(columnas)}, actualizado) "
+                    f"VALUES (?, {', '.join('?' * len(columnas))}, ?) "
+                    f"ON CONFLICT (hash_pdf, no_factura) DO UPDATE SET "
+                    f"{', '.join(f'{c} = excluded.{c}' for c in columnas)}, actualizado = excluded.actualizado",
+                    [(hash_pdf, *fila, ahora) for fila in filas]
+                )
+            else:
+                nombres = ['hash_pdf', 'posicion'] + columnas
+                conexion.executemany(
+                    f"INSERT INTO {tabla} ({', '.join(nombres)}) VALUES ({', '.join('?' * len(nombres))})",
+                    [(hash_pdf, posicion, *fila) for posicion, fila in enumerate(filas)]
+                )
+
+    def cerrar(self):
+        """
+        Confirma lo pendiente y cierra la base.
+        Returns:
+            str: Ruta de la base.
+        """
+        try:
+            self.vaciar()
+        finally:
+            self.conexion.close()
+        return self.ruta
+
+    # --- CONSULTA ---
+
+    @staticmethod
+    def _filtro(contrato=None, mes=None, nit=None, factura=None):
+        """
+        Condición SQL (sobre la tabla de facturas 'f') y sus parámetros.
+        """
+        condiciones = []
+        parametros = []
+        if contrato:
+            condiciones.append("f.no_contrato = ?")
+            parametros.append(contrato)
+        if nit:
+            condiciones.append("f.nit_cliente = ?")
+            parametros.append(nit)
+        if factura:
+            condiciones.append("f.no_factura = ?")
+            parametros.append(factura)
+        if mes:
+            inicio, fin = rango_mes(mes)
+            condiciones.append("f.fecha_expedicion >= ? AND f.fecha_expedicion < ?")
+            parametros.extend([inicio, fin])
+        return " AND ".join(condiciones), parametros
+
+    def iterar_filas(self, clave, **filtros):
+        """
+        Recorre las filas de un dataset (tuplas en el orden de exportacion.COLUMNAS[clave])
+        de las facturas que cumplen los filtros: contrato, mes ('AAAA-MM' sobre la fecha
+        de expedición), nit y factura. Sin filtros se recorre todo el dataset.
+        """
+        self.vaciar()
+        tabla = TABLAS[clave]
+        condicion, parametros = self._filtro(**filtros)
+
+        if clave == 'generales':
+            columnas = ', '.join(f"f.{c}" for c in self.columnas_sql[clave])
+            sql = f"SELECT {columnas} FROM facturas f"
+            if condicion:
+                sql += f" WHERE {condicion}"
+            sql += " ORDER BY f.fecha_expedicion, f.no_factura"
+            cursor = self.conexion.execute(sql, parametros)
+            while True:
+                bloque = cursor.fetchmany(1000)
+                if not bloque:
+                    break
+                yield from bloque
+            return
+
+        columnas = ', '.join(f"t.{c}" for c in self.columnas_sql[clave])
+        if condicion:
+            sql = (
+                f"SELECT {columnas} FROM {tabla} t "
+                f"JOIN facturas f ON f.hash_pdf = t.hash_pdf AND f.no_factura = t.no_factura "
+                f"WHERE {condicion} ORDER BY f.fecha_expedicion, f.no_factura, t.posicion"
+            )
+        else:
+            sql = f"SELECT {columnas} FROM {tabla} t ORDER BY t.rowid"
+
+        cursor = self.conexion.execute(sql, parametros)
+        while True:
+            bloque = cursor.fetchmany(1000)
+            if not bloque:
+                break
+            yield from bloque
+
+    def contar_facturas(self, **filtros):
+        """
+        Número de facturas que cumplen los filtros (los de iterar_filas), incluidas las pendientes.
+        """
+        self.vaciar()
+        condicion, parametros = self._filtro(**filtros)
+        sql = "SELECT COUNT(*) FROM facturas f" + (f" WHERE {condicion}" if condicion else "")
+        return self.conexion.execute(sql, parametros).fetchone()[0]
+
+    def exportar_consulta(self, formatos, ruta_base, **filtros):
+        """
+        Genera el consolidado (mismas hojas y columnas que el de main.py) a partir
+        de una consulta, sin releer los PDFs.
+        Returns:
+            list: Rutas generadas.
+        """
+        exportador = crear_exportador_streaming(formatos, ruta_base)
+        for clave in COLUMNAS:
+            for fila in self.iterar_filas(clave, **filtros):
+                exportador.escribir_fila(clave, fila)
+        rutas = exportador.cerrar()
+        return rutas if isinstance(rutas, list) else [rutas]
@@ -0,0 +1,395 @@
+"""
+Modo API: servidor HTTP local (stdlib) que extrae facturas con un pool de procesos
+ya iniciado, para no pagar el arranque del intérprete y de las librerías por PDF.
+
+Rutas:
+    POST /extraer?nombre=FE_1.pdf   Cuerpo: el PDF (application/pdf). Responde un JSON con
+                                    'conceptos', 'generales', 'comparacion' y 'validacion'.
+    POST /lote                      multipart/form-data con varios archivos, o JSON
+                                    {"archivos": [{"nombre": ..., "contenido_base64": ...}]}.
+    GET  /metrics                   Throughput, latencias y ocupación de la cola.
+    GET  /salud                     Verificación simple.
+La cola es acotada: si no hay cupo se responde 503 con Retry-After, y un lote con más
+archivos que la capacidad total se rechaza con 413.
+"""
+
+import os
+import re
+import json
+import time
+import base64
+import shutil
+import logging
+import tempfile
+import threading
+from collections import deque
+from email import policy
+from email.parser import BytesParser
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import ejecucion
+import exportacion
+import perfilado
+
+logger = logging.getLogger(__name__)
+
+PUERTO_DEFECTO = 8765
+MAX_MB_DEFECTO = 50
+MUESTRAS_LATENCIA = 1000
+INTERVALO_DESALOJO_DEFECTO = 60.0
+
+_NOMBRE_INSEGURO = re.compile(r'[^\w.\- ]')
+
+def _calentar():
+    """
+    Tarea breve para que el pool cree todos sus procesos antes de la primera solicitud.
+    """
+    time.sleep(0.1)
+    return os.getpid()
+
+def nombre_seguro(nombre, indice=0):
+    """
+    Nombre de archivo sin rutas ni caracteres raros, con extensión .pdf.
+    """
+    nombre = _NOMBRE_INSEGURO.sub('_', os.path.basename(nombre or '')).strip() or f"documento_{indice}.pdf"
+    if not nombre.lower().endswith('.pdf'):
+        nombre = f"{nombre}.pdf"
+    return nombre
+
+class MetricasAPI:
+    """
+    Contadores y latencias recientes del servidor (seguro entre hilos).
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inicio = time.time()
+        self.aceptadas = 0
+        self.rechazadas = 0
+        self.completadas = {}
+        self.en_curso = 0
+        self.latencias = deque(maxlen=MUESTRAS_LATENCIA)
+        self.marcas = deque()
+
+    def aceptar(self, cantidad=1):
+        with self.lock:
+            self.aceptadas += cantidad
+            self.en_curso += cantidad
+
+    def rechazar(self, cantidad=1):
+        with self.lock:
+            self.rechazadas += cantidad
+
+    def completar(self, estado, latencia):
+        ahora = time.time()
+        with self.lock:
+            self.en_curso -= 1
+            self.completadas[estado] = self.completadas.get(estado, 0) + 1
+            self.latencias.append(latencia)
+            self.marcas.append(ahora)
+            while self.marcas and ahora - self.marcas[0] > 60:
+                self.marcas.popleft()
+
+    def resumen(self, capacidad):
+        with self.lock:
+            latencias = list(self.latencias)
+            total = sum(self.completadas.values())
+            ahora = time.time()
+            while self.marcas and ahora - self.marcas[0] > 60:
+                self.marcas.popleft()
+            ultimo_minuto = len(self.marcas)
+            return {
+                'segundos_activo': round(ahora - self.inicio, 1),
+                'aceptadas': self.aceptadas,
+                'rechazadas': self.rechazadas,
+                'completadas': dict(self.completadas),
+                'en_curso': self.en_curso,
+                'capacidad': capacidad,
+                'por_segundo': round(total / max(ahora - self.inicio, 1e-9), 3),
+                'por_segundo_ultimo_minuto': round(ultimo_minuto / 60, 3),
+                'latencia_s': {
+                    'p50': round(perfilado.percentil(latencias, 50), 4),
+                    'p95': round(perfilado.percentil(latencias, 95), 4),
+                    'max': round(max(latencias), 4) if latencias else 0.0,
+                    'muestras': len(latencias),
+                },
+            }
+
+class ServidorExtraccion:
+    """
+    Pool de extracción compartido por los hilos del servidor HTTP.
+    Args:
+        funcion: Función de extracción (ruta_pdf, *argumentos_extra) -> datos procesados.
+        argumentos_extra (tuple): Argumentos adicionales para 'funcion' (p. ej. caché y opciones).
+        cola_maxima (int): PDFs aceptados además de los que están en proceso.
+        cache (CacheExtraccion): Caché que usan los trabajadores; se desaloja cada
+            'intervalo_desalojo' segundos si hubo solicitudes, y al cerrar.
+    """
+    def __init__(self, funcion, argumentos_extra=(), workers=1, cola_maxima=None, max_mb=MAX_MB_DEFECTO,
+                 cache=None, intervalo_desalojo=INTERVALO_DESALOJO_DEFECTO):
+        self.funcion = funcion
+        self.argumentos_extra = tuple(argumentos_extra)
+        self.workers = max(1, int(workers))
+        self.capacidad = self.workers + (self.workers * 4 if cola_maxima is None else max(0, int(cola_maxima)))
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.cupos = threading.BoundedSemaphore(self.capacidad)
+        self.metricas = MetricasAPI()
+        self.lock_pool = threading.Lock()
+        self.executor = None
+        self.httpd = None
+        self.cache = cache
+        self.intervalo_desalojo = intervalo_desalojo
+        self.por_desalojar = threading.Event()
+        self.detenido = threading.Event()
+        self.hilo_desalojo = None
+
+    def iniciar_pool(self):
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        pids = set(f.result() for f in [self.executor.submit(_calentar) for _ in range(self.workers * 2)])
+        logger.info(f"Pool de extracción listo ({len(pids)} procesos)")
+
+    def reservar(self, cantidad):
+        """
+        Reserva cupo para 'cantidad' PDFs sin bloquear; False si la cola está llena.
+        """
+        tomados = 0
+        for _ in range(cantidad):
+            if not self.cupos.acquire(blocking=False):
+                for _ in range(tomados):
+                    self.cupos.release()
+                self.metricas.rechazar(cantidad)
+                return False
+            tomados += 1
+        self.metricas.aceptar(cantidad)
+        return True
+
+    def enviar(self, ruta):
+        with self.lock_pool:
+            executor = self.executor
+        return executor, executor.submit(self.funcion, ruta, *self.argumentos_extra)
+
+    def esperar(self, executor, futuro):
+        """
+        Espera un resultado del pool y retorna (estado, datos o mensaje de error).
+        """
+        try:
+            return ejecucion.ESTADO_OK, futuro.result()
+        except BrokenProcessPool as e:
+            with self.lock_pool:
+                if self.executor is executor:
+                    logger.error("El pool de extracción se rompió; se crea uno nuevo")
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            return ejecucion.ESTADO_CAIDA, f"Proceso trabajador terminó inesperadamente: {e}"
+        except Exception as e:
+            return ejecucion.ESTADO_ERROR, f"{type(e).__name__}: {e}"
+
+    def extraer_lote(self, documentos):
+        """
+        Extrae varios PDFs en paralelo. El cupo debe estar reservado (ver reservar).
+        Args:
+            documentos (list): Tuplas (nombre, contenido en bytes).
+        Returns:
+            list: Un resultado por documento, en el mismo orden.
+        """
+        directorio = tempfile.mkdtemp(prefix='api_facturas_')
+        inicio = time.perf_counter()
+        liberados = 0
+        try:
+            envios = []
+            for indice, (nombre, contenido) in enumerate(documentos):
+                carpeta = os.path.join(directorio, str(indice))
+                os.makedirs(carpeta)
+                ruta = os.path.join(carpeta, nombre_seguro(nombre, indice))
+                with open(ruta, 'wb') as f:
+                    f.write(contenido)
+                envios.append((os.path.basename(ruta), self.enviar(ruta)))
+
+            resultados = []
+            for nombre, (executor, futuro) in envios:
+                estado, datos = self.esperar(executor, futuro)
+                latencia = time.perf_counter() - inicio
+                self.cupos.release()
+                liberados += 1
+                respuesta = self._respuesta(nombre, estado, datos, latencia)
+                self.metricas.completar(respuesta['estado'], latencia)
+                resultados.append(respuesta)
+            return resultados
+        finally:
+            # Si algo falló antes de terminar, el cupo de los documentos restantes se devuelve
+            for _ in range(len(documentos) - liberados):
+                self.cupos.release()
+                self.metricas.completar(ejecucion.ESTADO_ERROR, time.perf_counter() - inicio)
+            shutil.rmtree(directorio, ignore_errors=True)
+            self.por_desalojar.set()
+
+    def desalojar_cache(self):
+        if self.cache is None:
+            return
+        try:
+            self.cache.desalojar()
+        except OSError as e:
+            logger.warning(f"No se pudo desalojar la caché: {e}")
+
+    def _ciclo_desalojo(self):
+        """
+        Hilo de fondo: el desalojo recorre todo el directorio de la caché, así que no se
+        hace por solicitud sino como máximo una vez por intervalo.
+        """
+        while not self.detenido.wait(self.intervalo_desalojo):
+            if self.por_desalojar.is_set():
+                self.por_desalojar.clear()
+                self.desalojar_cache()
+
+    @staticmethod
+    def _respuesta(nombre, estado, datos, latencia):
+        respuesta = {'archivo': nombre, 'estado': estado, 'segundos': round(latencia, 4)}
+        if estado == ejecucion.ESTADO_OK and datos:
+            respuesta['datos'] = exportacion.filas_a_dicts(datos)
+        elif estado == ejecucion.ESTADO_OK:
+            respuesta['estado'] = ejecucion.ESTADO_ERROR
+            respuesta['error'] = "Fallo en lectura del archivo"
+        else:
+            respuesta['error'] = datos
+        return respuesta
+
+    def servir(self, host='127.0.0.1', puerto=PUERTO_DEFECTO):
+        """
+        Inicia el pool y el servidor HTTP (puerto 0 = uno libre). Retorna el servidor;
+        llamar a serve_forever() sobre él o usar ejecutar_api.
+        """
+        self.iniciar_pool()
+        self.httpd = ThreadingHTTPServer((host, puerto), _ManejadorAPI)
+        self.httpd.daemon_threads = True
+        self.httpd.extraccion = self
+        if self.cache is not None:
+            self.hilo_desalojo = threading.Thread(target=self._ciclo_desalojo, name='desalojo_cache', daemon=True)
+            self.hilo_desalojo.start()
+        return self.httpd
+
+    def cerrar(self):
+        if self.httpd is not None:
+            self.httpd.server_close()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+        self.detenido.set()
+        if self.hilo_desalojo is not None:
+            self.hilo_desalojo.join()
+        self.desalojar_cache()
+
+class _ManejadorAPI(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, formato, *args):
+        logger.debug(f"{self.address_string()} {formato % args}")
+
+    def _responder(self, codigo, cuerpo, cabeceras=None):
+        contenido = json.dumps(cuerpo, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(contenido)))
+        for clave, valor in (cabeceras or {}).items():
+            self.send_header(clave, valor)
+        self.end_headers()
+        self.wfile.write(contenido)
+
+    def _leer_cuerpo(self, extraccion):
+        largo = int(self.headers.get('Content-Length') or 0)
+        if largo <= 0:
+            self._responder(400, {'error': "Cuerpo vacío"})
+            return None
+        if largo > extraccion.max_bytes:
+            self._responder(413, {'error': f"El cuerpo supera {extraccion.max_bytes} bytes"})
+            self.close_connection = True
+            return None
+        return self.rfile.read(largo)
+
+    def do_GET(self):
+        extraccion = self.server.extraccion
+        ruta = urlparse(self.path).path
+        if ruta == '/metrics':
+            self._responder(200, extraccion.metricas.resumen(extraccion.capacidad))
+        elif ruta == '/salud':
+            self._responder(200, {'estado': 'ok'})
+        else:
+            self._responder(404, {'error': f"Ruta desconocida: {ruta}"})
+
+    def do_POST(self):
+        extraccion = self.server.extraccion
+        url = urlparse(self.path)
+        if url.path not in ('/extraer', '/lote'):
+            self._responder(404, {'error': f"Ruta desconocida: {url.path}"})
+            return
+
+        cuerpo = self._leer_cuerpo(extraccion)
+        if cuerpo is None:
+            return
+
+        if url.path == '/extraer':
+            nombre = parse_qs(url.query).get('nombre', [''])[0]
+            documentos = [(nombre, cuerpo)]
+        else:
+            try:
+                documentos = self._documentos_lote(cuerpo)
+            except (ValueError, KeyError, TypeError) as e:
+                self._responder(400, {'error': f"Lote inválido: {e}"})
+                return
+            if not documentos:
+                self._responder(400, {'error': "El lote no trae archivos"})
+                return
+
+        # Un lote mayor que la capacidad no cabe nunca: reintentarlo no sirve
+        if len(documentos) > extraccion.capacidad:
+            self._responder(413, {'error': f"El lote trae {len(documentos)} archivos; el máximo es "
+                                           f"{extraccion.capacidad}", 'maximo': extraccion.capacidad})
+            return
+
+        if not extraccion.reservar(len(documentos)):
+            self._responder(503, {'error': "Cola llena, reintente más tarde"}, {'Retry-After': '1'})
+            return
+
+        resultados = extraccion.extraer_lote(documentos)
+        if url.path == '/extraer':
+            resultado = resultados[0]
+            codigo = 200 if resultado['estado'] == ejecucion.ESTADO_OK else 422
+            self._responder(codigo, resultado)
+        else:
+            self._responder(200, {'resultados': resultados})
+
+    def _documentos_lote(self, cuerpo):
+        """
+        Lee los archivos de un lote multipart/form-data o JSON con base64.
+        """
+        tipo = self.headers.get('Content-Type', '')
+        if tipo.startswith('multipart/'):
+            mensaje = BytesParser(policy=policy.HTTP).parsebytes(
+                b'Content-Type: ' + tipo.encode('latin-1') + b'\r\n\r\n' + cuerpo
+            )
+            return [
+                (parte.get_filename() or '', parte.get_payload(decode=True) or b'')
+                for parte in mensaje.iter_parts() if parte.get_filename()
+            ]
+
+        datos = json.loads(cuerpo)
+        return [
+            (archivo.get('nombre', ''), base64.b64decode(archivo['contenido_base64']))
+            for archivo in datos['archivos']
+        ]
+
+def ejecutar_api(funcion, argumentos_extra=(), host='127.0.0.1', puerto=PUERTO_DEFECTO, workers=1,
+                 cola_maxima=None, max_mb=MAX_MB_DEFECTO, cache=None):
+    """
+    Inicia el servidor y atiende solicitudes hasta Ctrl+C.
+    """
+    extraccion = ServidorExtraccion(funcion, argumentos_extra, workers, cola_maxima, max_mb, cache)
+    httpd = extraccion.servir(host, puerto)
+    logger.info(f"API de extracción escuchando en http://{host}:{httpd.server_address[1]} "
+                f"(workers: {extraccion.workers}, capacidad: {extraccion.capacidad})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Deteniendo API...")
+    finally:
+        extraccion.cerrar()
@@ -0,0 +1,8 @@
+"""
+Benchmarks de rendimiento del pipeline de facturas.
+Incluye un generador de facturas sintéticas estilo Gecelca (generador) y la medición
+por etapas con resultados en JSON (ejecutar). Uso:
+
+    python -m benchmarks --salida resultados.json
+    python -m benchmarks --comparar base.json --salida actual.json
+"""
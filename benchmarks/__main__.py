@@ -0,0 +1,4 @@
+import sys
+from benchmarks.ejecutar import main
+
+sys.exit(main())
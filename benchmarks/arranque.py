@@ -0,0 +1,75 @@
+"""
+Benchmark del arranque de la línea de comandos.
+Importa main.py en un proceso nuevo con 'python -X importtime' y resume el tiempo
+acumulado de importación por módulo. También verifica que las dependencias pesadas
+(pandas, openpyxl) no se carguen al arrancar: solo deben importarse al exportar.
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+
+RAIZ_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependencias que no deben importarse al arrancar la CLI
+MODULOS_PESADOS = ('pandas', 'openpyxl', 'numpy', 'pyarrow')
+
+def medir_importacion(codigo="import main", python=None):
+    """
+    Ejecuta el código en un intérprete nuevo con -X importtime.
+    Returns:
+        dict: {módulo: microsegundos acumulados} (incluye sus propias importaciones).
+    """
+    resultado = subprocess.run(
+        [python or sys.executable, '-X', 'importtime', '-c', codigo],
+        cwd=RAIZ_REPO, capture_output=True, text=True, check=True,
+    )
+    tiempos = {}
+    for linea in resultado.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not linea.startswith('import time:') or '|' not in linea:
+            continue
+        partes = linea[len('import time:'):].split('|')
+        if len(partes) != 3 or not partes[1].strip().isdigit():
+            continue
+        tiempos[partes[2].strip()] = int(partes[1])
+    return tiempos
+
+def pesados_importados(tiempos):
+    """Módulos de MODULOS_PESADOS (o sus submódulos) presentes en la importación."""
+    return sorted({m.split('.')[0] for m in tiempos if m.split('.')[0] in MODULOS_PESADOS})
+
+def medir_arranque(repeticiones=3, codigo="import main"):
+    """
+    Mide el arranque 'repeticiones' veces y se queda con la mejor.
+    Returns:
+        tuple: (segundos de la mejor importación, tiempos por módulo de esa ejecución).
+    """
+    mejor = None
+    for _ in range(repeticiones):
+        tiempos = medir_importacion(codigo)
+        total = tiempos.get(codigo.split()[-1], 0) / 1e6
+        if mejor is None or total < mejor[0]:
+            mejor = (total, tiempos)
+    return mejor
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Tiempo de arranque de la CLI (python -X importtime)')
+    parser.add_argument('--repeticiones', type=int, default=3, help='Repeticiones (se toma la mejor)')
+    parser.add_argument('--top', type=int, default=15, help='Módulos más lentos a mostrar')
+    args = parser.parse_args(argv)
+
+    total, tiempos = medir_arranque(args.repeticiones)
+    print(f"import main: {total * 1000:.1f} ms")
+    for modulo, us in sorted(tiempos.items(), key=lambda t: t[1], reverse=True)[1:args.top + 1]:
+        print(f"  {modulo:<40} {us / 1000:8.1f} ms")
+
+    pesados = pesados_importados(tiempos)
+    if pesados:
+        print(f"Dependencias pesadas importadas al arrancar: {', '.join(pesados)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""
+Ejecución de benchmarks por etapa del pipeline.
+Mide el arranque de la CLI, extraer_datos_estructurados, extraer_datos_factura,
+FacturaProcessor.obtener_datos_procesados, la consolidación en streaming (modo -d),
+conciliacion.conciliar y ExportadorExcel.exportar (modo -a) sobre un lote sintético,
+y guarda los tiempos en JSON para comparar entre commits.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import platform
+import subprocess
+import tempfile
+import statistics
+
+# Permite ejecutar 'python -m benchmarks' desde la raíz del repositorio
+RAIZ_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ_REPO not in sys.path:
+    sys.path.insert(0, RAIZ_REPO)
+
+from benchmarks import generador, arranque
+
+logger = logging.getLogger(__name__)
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    k = (len(ordenados) - 1) * p / 100
+    inferior = int(k)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (k - inferior)
+
+def resumir(tiempos, unidades=None):
+    """
+    Resume una lista de tiempos (segundos) en estadísticas comparables.
+    """
+    total = sum(tiempos)
+    resumen = {
+        'n': len(tiempos),
+        'total_s': total,
+        'media_s': statistics.mean(tiempos) if tiempos else 0.0,
+        'p50_s': _percentil(tiempos, 50),
+        'p95_s': _percentil(tiempos, 95),
+        'min_s': min(tiempos) if tiempos else 0.0,
+        'max_s': max(tiempos) if tiempos else 0.0,
+    }
+    if unidades is not None and total > 0:
+        resumen['por_segundo'] = unidades / total
+    return resumen
+
+def _medir(funcion, repeticiones):
+    """
+    Ejecuta la función 'repeticiones' veces y retorna (mejor tiempo, último resultado).
+    Se toma el mejor tiempo para reducir el ruido del sistema.
+    """
+    mejor = None
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor, resultado
+
+def _commit_actual():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ_REPO, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def ejecutar_benchmarks(rutas, repeticiones=3, backends=('pdfminer',), directorio_trabajo=None):
+    """
+    Mide cada etapa sobre los PDFs indicados.
+    Returns:
+        dict: Resultados por etapa (ver resumir) más metadatos del entorno.
+    """
+    import extractores_pdf
+    import extractores
+    import procesamiento
+    import exportacion
+    import conciliacion
+    import triaje
+    import ejecucion
+    import main
+
+    etapas = {}
+
+    # 0. Arranque de la CLI (importación de main en un proceso nuevo)
+    duracion, tiempos_import = arranque.medir_arranque(repeticiones)
+    etapas['arranque_cli'] = resumir([duracion])
+    etapas['arranque_cli']['pesados'] = arranque.pesados_importados(tiempos_import)
+
+    # 1. Lectura visual del PDF (por backend)
+    for backend in backends:
+        tiempos = []
+        filas = 0
+        for ruta in rutas:
+            duracion, datos = _medir(lambda: extractores_pdf.extraer_datos_estructurados(ruta, backend=backend),
+                                     repeticiones)
+            tiempos.append(duracion)
+            filas += sum(len(lineas) for lineas in datos.values())
+        etapas[f'extraer_datos_estructurados[{backend}]'] = resumir(tiempos, len(rutas))
+        etapas[f'extraer_datos_estructurados[{backend}]']['filas'] = filas
+
+    # 1b. Triaje previo (metadatos + texto crudo de la página 1, sin layout)
+    tiempos = []
+    clases = {}
+    for ruta in rutas:
+        duracion, resultado = _medir(lambda: triaje.clasificar(ruta), repeticiones)
+        tiempos.append(duracion)
+        clases[resultado.clase] = clases.get(resultado.clase, 0) + 1
+    etapas['triaje.clasificar'] = resumir(tiempos, len(rutas))
+    etapas['triaje.clasificar']['clases'] = clases
+
+    # 2. Extracción completa (lectura + regex + ítems)
+    tiempos = []
+    crudos = []
+    for ruta in rutas:
+        duracion, datos = _medir(lambda: extractores.extraer_datos_factura(ruta), repeticiones)
+        tiempos.append(duracion)
+        crudos.append(datos)
+    etapas['extraer_datos_factura'] = resumir(tiempos, len(rutas))
+    etapas['extraer_datos_factura']['items'] = sum(len(d.get('items', [])) for d in crudos)
+
+    # 3. Procesamiento (sin PDF)
+    tiempos = []
+    procesados = []
+    for datos in crudos:
+        duracion, resultado = _medir(
+            lambda: procesamiento.FacturaProcessor(datos).obtener_datos_procesados(), repeticiones
+        )
+        tiempos.append(duracion)
+        procesados.append(resultado)
+    etapas['FacturaProcessor.obtener_datos_procesados'] = resumir(tiempos, len(crudos))
+
+    # 4. Consolidación como en el modo directorio: las filas de cada factura se escriben
+    # en streaming (sin acumular el lote en memoria)
+    directorio_trabajo = directorio_trabajo or tempfile.mkdtemp(prefix='bench_export_')
+    ruta_base = os.path.join(directorio_trabajo, 'consolidado_bench_streaming')
+    filas_por_factura = [
+        main.construir_filas(os.path.basename(ruta), ejecucion.ESTADO_OK, resultado)
+        for ruta, resultado in zip(rutas, procesados)
+    ]
+    def consolidar():
+        exportador = exportacion.crear_exportador_streaming(['xlsx'], ruta_base)
+        for filas in filas_por_factura:
+            exportador.agregar(filas)
+        return exportador.cerrar()
+    duracion, _ = _medir(consolidar, repeticiones)
+    consolidado = {
+        clave: [fila for resultado in procesados for fila in resultado[clave]]
+        for clave in ('conceptos', 'generales', 'comparacion')
+    }
+    filas_consolidadas = sum(len(filas) for filas in consolidado.values())
+    etapas['ExportadorExcelStreaming'] = resumir([duracion], filas_consolidadas)
+    etapas['ExportadorExcelStreaming']['filas'] = filas_consolidadas
+
+    # 5. Conciliación contra un extracto del Data Lake (las mismas filas, una de cada diez alterada)
+    comparacion = exportacion.filas_a_dataframe(consolidado['comparacion'], exportacion.COLUMNAS_COMPARACION)
+    extracto = comparacion[conciliacion.LLAVES + ['Valor PDF']].rename(columns={'Valor PDF': 'Valor Data Lake'})
+    extracto = extracto.astype({'Valor Data Lake': object})
+    extracto.loc[extracto.index[::10], 'Valor Data Lake'] = '1'
+    duracion, conciliado = _medir(lambda: conciliacion.conciliar(comparacion, extracto), repeticiones)
+    etapas['conciliacion.conciliar'] = resumir([duracion], len(conciliado))
+    etapas['conciliacion.conciliar']['filas'] = len(conciliado)
+
+    # 6. Exportación con DataFrames (modo -a)
+    consolidado['validacion'] = []
+    ruta_excel = os.path.join(directorio_trabajo, 'consolidado_bench.xlsx')
+    duracion, _ = _medir(lambda: exportacion.ExportadorExcel(consolidado, ruta_excel).exportar(), repeticiones)
+    filas_exportadas = sum(len(v) for v in consolidado.values())
+    etapas['ExportadorExcel.exportar'] = resumir([duracion], filas_exportadas)
+    etapas['ExportadorExcel.exportar']['filas'] = filas_exportadas
+
+    return {
+        'commit': _commit_actual(),
+        'fecha': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'facturas': len(rutas),
+        'repeticiones': repeticiones,
+        'etapas': etapas,
+    }
+
+def comparar(base, actual, umbral=10.0):
+    """
+    Compara dos resultados por la media de cada etapa.
+    Returns:
+        list: Tuplas (etapa, media_base, media_actual, variación %, es_regresión).
+    """
+    filas = []
+    for etapa, datos_actual in actual.get('etapas', {}).items():
+        datos_base = base.get('etapas', {}).get(etapa)
+        if not datos_base or not datos_base.get('media_s'):
+            continue
+        variacion = (datos_actual['media_s'] - datos_base['media_s']) / datos_base['media_s'] * 100
+        filas.append((etapa, datos_base['media_s'], datos_actual['media_s'], variacion, variacion > umbral))
+    return filas
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks del procesador de facturas')
+    parser.add_argument('--facturas', type=int, default=20, help='Número de facturas sintéticas (por defecto 20)')
+    parser.add_argument('--items', type=int, nargs=2, default=[1, 40], metavar=('MIN', 'MAX'),
+                        help='Rango de ítems por factura')
+    parser.add_argument('--anexos', type=int, nargs=2, default=[0, 3], metavar=('MIN', 'MAX'),
+                        help='Rango de páginas de anexo por factura')
+    parser.add_argument('--semilla', type=int, default=0, help='Semilla del generador')
+    parser.add_argument('--repeticiones', type=int, default=3, help='Repeticiones por medición (se toma la mejor)')
+    parser.add_argument('--backends', nargs='+', default=['pdfminer', 'rapido'], help='Backends de lectura a medir')
+    parser.add_argument('--directorio', help='Directorio con PDFs propios (en lugar de generar un lote)')
+    parser.add_argument('--salida', help='Archivo JSON donde guardar los resultados')
+    parser.add_argument('--comparar', help='JSON de una ejecución anterior para detectar regresiones')
+    parser.add_argument('--umbral', type=float, default=10.0, help='Variación (%%) considerada regresión')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.directorio:
+        rutas = sorted(
+            os.path.join(args.directorio, f) for f in os.listdir(args.directorio) if f.lower().endswith('.pdf')
+        )
+    else:
+        directorio = tempfile.mkdtemp(prefix='bench_facturas_')
+        rutas = generador.generar_lote(directorio, args.facturas, tuple(args.items), tuple(args.anexos), args.semilla)
+
+    resultados = ejecutar_benchmarks(rutas, args.repeticiones, args.backends)
+
+    for etapa, datos in resultados['etapas'].items():
+        print(f"{etapa:<48} media {datos['media_s'] * 1000:9.2f} ms  p95 {datos['p95_s'] * 1000:9.2f} ms")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+        print(f"Resultados guardados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            base = json.load(f)
+        regresiones = 0
+        print(f"\nComparación contra {args.comparar} (commit {base.get('commit')}):")
+        for etapa, media_base, media_actual, variacion, es_regresion in comparar(base, resultados, args.umbral):
+            marca = "REGRESIÓN" if es_regresion else ""
+            print(f"{etapa:<48} {media_base * 1000:9.2f} -> {media_actual * 1000:9.2f} ms ({variacion:+.1f}%) {marca}")
+            regresiones += es_regresion
+        return 1 if regresiones else 0
+
+    return 0
@@ -0,0 +1,202 @@
+"""
+Generador de facturas sintéticas estilo Gecelca/Air-e.
+Escribe el PDF a mano (sin dependencias): encabezado con Nit/CUFE/Contrato, tabla de
+ítems, pie de totales y páginas de anexo opcionales. El texto usa Helvetica con
+WinAnsiEncoding, de modo que pdfminer lo lee igual que una factura real.
+"""
+
+import os
+import random
+
+ALTO_PAGINA = 842
+ANCHO_PAGINA = 595
+MARGEN_INFERIOR = 90
+TAMANO_FUENTE = 9
+INTERLINEA = 14
+
+CONCEPTOS = [
+    'Energía contrato bilateral', 'Energía en bolsa', 'Cargo por confiabilidad',
+    'Servicios complementarios', 'Restricciones', 'Ajuste periodo anterior',
+]
+
+COLUMNAS_TABLA = [
+    (40, 'Item'), (70, 'Ref'), (110, 'Concepto'), (300, 'Unidad'),
+    (350, 'Cantidad'), (430, 'Tarifa'), (500, 'Total'),
+]
+
+def _escapar(texto):
+    """
+    Codifica el texto en cp1252 (WinAnsi) y escapa los caracteres especiales de PDF.
+    """
+    datos = texto.encode('cp1252', errors='replace')
+    return datos.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+class _Pagina:
+    def __init__(self):
+        self.textos = []
+        self.y = ALTO_PAGINA - 42
+
+    def texto(self, x, cadena, y=None):
+        self.textos.append((x, self.y if y is None else y, cadena))
+
+    def salto(self, lineas=1):
+        self.y -= INTERLINEA * lineas
+
+    def contenido(self):
+        partes = [b'BT', f'/F1 {TAMANO_FUENTE} Tf'.encode('ascii')]
+        for x, y, cadena in self.textos:
+            partes.append(b'1 0 0 1 %d %d Tm (' % (x, y) + _escapar(cadena) + b') Tj')
+        partes.append(b'ET')
+        return b'\n'.join(partes)
+
+def escribir_pdf(ruta, paginas):
+    """
+    Escribe un PDF mínimo válido con una página por elemento de 'paginas'.
+    """
+    objetos = []
+    objetos.append(b'<< /Type /Catalog /Pages 2 0 R >>')
+    objetos.append(None)  # Páginas: se completa al final
+    objetos.append(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+
+    ids_paginas = []
+    for pagina in paginas:
+        contenido = pagina.contenido()
+        objetos.append(b'<< /Length %d >>\nstream\n' % len(contenido) + contenido + b'\nendstream')
+        id_contenido = len(objetos)
+        objetos.append(
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] ' % (ANCHO_PAGINA, ALTO_PAGINA)
+            + b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % id_contenido
+        )
+        ids_paginas.append(len(objetos))
+
+    kids = b' '.join(b'%d 0 R' % i for i in ids_paginas)
+    objetos[1] = b'<< /Type /Pages /Kids [' + kids + b'] /Count %d >>' % len(ids_paginas)
+
+    salida = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    desplazamientos = []
+    for numero, cuerpo in enumerate(objetos, 1):
+        desplazamientos.append(len(salida))
+        salida += b'%d 0 obj\n' % numero + cuerpo + b'\nendobj\n'
+
+    inicio_xref = len(salida)
+    salida += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objetos) + 1)
+    for desplazamiento in desplazamientos:
+        salida += b'%010d 00000 n \n' % desplazamiento
+    salida += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objetos) + 1, inicio_xref)
+
+    with open(ruta, 'wb') as f:
+        f.write(salida)
+
+def _miles(valor):
+    return f"{valor:,}"
+
+def generar_factura(ruta, numero, items=10, paginas_anexo=0, semilla=None):
+    """
+    Genera una factura sintética.
+    Args:
+        ruta (str): Ruta del PDF de salida.
+        numero (int): Número de factura.
+        items (int): Filas de la tabla de ítems (pasa a páginas nuevas si no caben).
+        paginas_anexo (int): Páginas de anexo al final (texto que no aporta datos).
+        semilla: Semilla para que el contenido sea reproducible.
+    Returns:
+        dict: Valores esperados (número, contrato, total) para verificar la extracción.
+    """
+    rnd = random.Random(semilla if semilla is not None else numero)
+    contrato = f"GC-{2020 + numero % 6}-{numero % 97:02d}"
+    paginas = [_Pagina()]
+    p = paginas[0]
+
+    # --- ENCABEZADO ---
+    p.texto(40, 'GECELCA S.A. E.S.P. Nit: 900.123.456-1')
+    p.texto(350, f'FACTURA ELECTRONICA DE VENTA No. {numero}')
+    p.salto()
+    p.texto(40, 'Fecha expedición: 2026-01-11')
+    p.texto(300, 'Fecha vencimiento: 2026-02-10')
+    p.salto()
+    p.texto(40, f'CUFE: {rnd.getrandbits(192):048x}')
+    p.salto(2)
+    p.texto(40, 'Señores: AIR-E S.A.S. E.S.P.')
+    p.salto()
+    p.texto(40, 'Nit: 901380930-2')
+    p.texto(300, f'No. Contrato: {contrato}')
+    p.salto()
+    p.texto(40, 'Dirección: Carrera 57 # 99A-65')
+    p.texto(300, 'Ciudad: Barranquilla')
+    p.salto()
+    p.texto(40, 'Email: facturas@air-e.com')
+    p.texto(300, 'Teléfono: 6053611000')
+    p.salto(2)
+
+    # --- TABLA DE ÍTEMS ---
+    for x, titulo in COLUMNAS_TABLA:
+        p.texto(x, titulo)
+    p.salto()
+
+    total = 0
+    for indice in range(1, items + 1):
+        if p.y < MARGEN_INFERIOR:
+            p = _Pagina()
+            paginas.append(p)
+        cantidad = rnd.randint(1000, 9999999)
+        tarifa = round(rnd.uniform(100, 400), 3)
+        valor = int(cantidad * tarifa)
+        total += valor
+        fila = [str(indice), 'EN', f'{rnd.choice(CONCEPTOS)} {indice}', 'kWh',
+                _miles(cantidad), f'{tarifa}', _miles(valor)]
+        for (x, _), celda in zip(COLUMNAS_TABLA, fila):
+            p.texto(x, celda)
+        p.salto()
+
+    # --- PIE DE TOTALES ---
+    if p.y < MARGEN_INFERIOR + INTERLINEA * 8:
+        p = _Pagina()
+        paginas.append(p)
+    p.salto()
+    p.texto(300, 'TOTAL FACTURADO')
+    p.texto(500, f'$ {_miles(total)}')
+    p.salto()
+    p.texto(300, 'TOTAL A PAGAR')
+    p.texto(500, f'$ {_miles(total)}')
+    p.salto()
+    p.texto(40, 'SON: VALOR EN LETRAS DE LA FACTURA')
+    p.salto()
+    p.texto(40, 'Medio de pago: Transferencia')
+    p.texto(250, 'Entidad: Bancolombia')
+    p.salto()
+    p.texto(40, 'Cuenta: Ahorros')
+    p.texto(250, 'Número: 123456789')
+    p.salto()
+    p.texto(40, 'Forma de pago: Crédito')
+
+    # --- ANEXOS ---
+    for indice in range(paginas_anexo):
+        anexo = _Pagina()
+        anexo.texto(40, f'ANEXO {indice + 1} - Detalle horario de la medición')
+        anexo.salto(2)
+        while anexo.y > MARGEN_INFERIOR:
+            anexo.texto(40, f'Hora {rnd.randint(0, 23):02d}')
+            anexo.texto(200, _miles(rnd.randint(1000, 999999)))
+            anexo.texto(350, 'kWh medidos en frontera comercial')
+            anexo.salto()
+        paginas.append(anexo)
+
+    escribir_pdf(ruta, paginas)
+    return {'numero_factura': str(numero), 'contrato': contrato, 'total': float(total), 'paginas': len(paginas)}
+
+def generar_lote(directorio, cantidad, items=(1, 40), paginas_anexo=(0, 3), semilla=0):
+    """
+    Genera 'cantidad' facturas con número de ítems y anexos variables.
+    Returns:
+        list: Rutas de los PDFs generados.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    rnd = random.Random(semilla)
+    rutas = []
+    for indice in range(cantidad):
+        numero = 100000 + indice
+        ruta = os.path.join(directorio, f"FE_{numero}.pdf")
+        generar_factura(ruta, numero, items=rnd.randint(*items),
+                        paginas_anexo=rnd.randint(*paginas_anexo), semilla=semilla * 100000 + indice)
+        rutas.append(ruta)
+    return rutas
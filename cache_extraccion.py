@@ -0,0 +1,146 @@
+"""
+Caché persistente en disco para los resultados de extracción.
+La llave es el SHA-256 del PDF; las entradas viven en un subdirectorio por versión
+del código de extracción, de modo que cualquier cambio en los patrones o extractores
+invalida automáticamente la caché anterior.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# Módulos cuyo código determina el resultado de la extracción
+MODULOS_VERSIONADOS = [
+    'extractores.py',
+    'extractores_pdf.py',
+    'extractores_patrones.py',
+    'motor_patrones.py',
+    'numeros.py',
+    'tabla_items.py',
+    'utils.py',
+]
+
+TAMANO_MAXIMO_DEFECTO = 512 * 1024 * 1024  # 512 MB
+
+def calcular_version_codigo():
+    """
+    Genera una huella corta del código fuente de los módulos de extracción.
+    """
+    sha = hashlib.sha256()
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    for nombre in MODULOS_VERSIONADOS:
+        sha.update(nombre.encode('utf-8'))
+        try:
+            with open(os.path.join(directorio, nombre), 'rb') as f:
+                sha.update(f.read())
+        except OSError:
+            sha.update(b'-')
+    return sha.hexdigest()[:16]
+
+def calcular_llave(hash_pdf, opciones=None):
+    """
+    Llave de caché: el hash del PDF, combinado con las opciones de extracción si las hay
+    (un mismo PDF leído con límites de páginas distintos produce datos distintos).
+    """
+    if not opciones:
+        return hash_pdf
+    firma = json.dumps(opciones, sort_keys=True, default=str)
+    return hashlib.sha256(f"{hash_pdf}|{firma}".encode('utf-8')).hexdigest()
+
+class CacheExtraccion:
+    def __init__(self, directorio, tamano_maximo=TAMANO_MAXIMO_DEFECTO):
+        """
+        Inicializa la caché.
+        Args:
+            directorio (str): Directorio raíz de la caché.
+            tamano_maximo (int): Tamaño máximo en bytes antes de desalojar entradas.
+        """
+        self.directorio = directorio
+        self.tamano_maximo = tamano_maximo
+        self.version = calcular_version_codigo()
+        self.directorio_version = os.path.join(directorio, self.version)
+
+    def preparar(self):
+        """
+        Crea el directorio de la versión actual y elimina las versiones antiguas.
+        Se llama una vez desde el proceso principal antes del lote.
+        """
+        os.makedirs(self.directorio_version, exist_ok=True)
+        for entrada in os.scandir(self.directorio):
+            if entrada.is_dir() and entrada.name != self.version:
+                logger.info(f"Invalidando caché de versión anterior: {entrada.name}")
+                shutil.rmtree(entrada.path, ignore_errors=True)
+
+    def _ruta_entrada(self, llave):
+        return os.path.join(self.directorio_version, llave[:2], f"{llave}.json")
+
+    def obtener(self, llave):
+        """
+        Retorna los datos guardados para la llave o None si no existen.
+        En un acierto se actualiza la fecha de modificación (orden LRU del desalojo).
+        """
+        ruta = self._ruta_entrada(llave)
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+            os.utime(ruta, None)
+            return datos
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Entrada de caché ilegible {ruta}: {e}")
+            return None
+
+    def guardar(self, llave, datos):
+        """
+        Guarda los datos de forma atómica (archivo temporal + rename).
+        """
+        ruta = self._ruta_entrada(llave)
+        directorio = os.path.dirname(ruta)
+        try:
+            os.makedirs(directorio, exist_ok=True)
+            fd, ruta_tmp = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(datos, f, ensure_ascii=False)
+            os.replace(ruta_tmp, ruta)
+        except OSError as e:
+            logger.warning(f"No se pudo escribir en la caché {ruta}: {e}")
+
+    def desalojar(self):
+        """
+        Elimina las entradas menos usadas hasta quedar por debajo del tamaño máximo.
+        """
+        entradas = []
+        total = 0
+        for raiz, _, archivos in os.walk(self.directorio_version):
+            for nombre in archivos:
+                ruta = os.path.join(raiz, nombre)
+                try:
+                    st = os.stat(ruta)
+                except OSError:
+                    continue
+                entradas.append((st.st_mtime, st.st_size, ruta))
+                total += st.st_size
+
+        if total <= self.tamano_maximo:
+            return 0
+
+        eliminadas = 0
+        entradas.sort()
+        for _, tamano, ruta in entradas:
+            if total <= self.tamano_maximo:
+                break
+            try:
+                os.remove(ruta)
+                total -= tamano
+                eliminadas += 1
+            except OSError:
+                pass
+
+        logger.info(f"Caché: {eliminadas} entradas desalojadas por tamaño")
+        return eliminadas
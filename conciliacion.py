@@ -0,0 +1,253 @@
+"""
+Módulo de conciliación contra un extracto del Data Lake.
+Cruza las filas de la hoja Comparación con un extracto local (CSV, Parquet o Excel)
+por (No. Factura, No. Contrato, Variable) con un merge vectorizado de pandas, llena
+'Valor Data Lake', marca por campo si coincide o está dentro de la tolerancia, y
+resume las discrepancias por variable y por factura.
+"""
+
+import os
+import logging
+import pandas as pd
+from exportacion import HOJAS, COLUMNAS_COMPARACION
+from exportacion_columnar import TIPOS_COLUMNAS, TIPO_DECIMAL
+from numeros import interpretar_numeros, FORMATO_INVALIDO
+
+logger = logging.getLogger(__name__)
+
+LLAVES = ['No. Factura', 'No. Contrato', 'Variable']
+
+# Columna del valor en el extracto (la primera que exista)
+COLUMNAS_VALOR_EXTRACTO = ['Valor Data Lake', 'Valor']
+
+# Variables que se comparan como montos/cantidades (con tolerancia); el resto como texto
+VARIABLES_NUMERICAS = [c for c, t in TIPOS_COLUMNAS['generales'].items() if t == TIPO_DECIMAL]
+SUFIJOS_NUMERICOS = (' - Cantidad', ' - Tarifa', ' - Total')
+
+TOLERANCIA_ABSOLUTA_DEFECTO = 1.0   # Pesos / unidades
+TOLERANCIA_RELATIVA_DEFECTO = 0.0   # Fracción del valor del Data Lake (0.001 = 0,1 %)
+
+# Estados de conciliación
+ESTADO_COINCIDE = 'COINCIDE'
+ESTADO_TOLERANCIA = 'EN TOLERANCIA'
+ESTADO_DIFERENCIA = 'DIFERENCIA'
+ESTADO_SIN_DATA_LAKE = 'SIN DATO DATA LAKE'
+ESTADO_SOLO_DATA_LAKE = 'SOLO DATA LAKE'
+ESTADOS = [ESTADO_COINCIDE, ESTADO_TOLERANCIA, ESTADO_DIFERENCIA, ESTADO_SIN_DATA_LAKE, ESTADO_SOLO_DATA_LAKE]
+
+COLUMNAS_CONCILIACION = COLUMNAS_COMPARACION + ['Diferencia', 'Coincide', 'En Tolerancia', 'Estado Conciliación']
+
+HOJAS_CONCILIACION = {
+    'conciliacion': 'Conciliacion',
+    'variables': 'Discrepancias_Variable',
+    'facturas': 'Discrepancias_Factura',
+}
+
+# --- CARGA ---
+
+def leer_tabla(ruta, hoja=None):
+    """
+    Lee un CSV, Parquet, JSON Lines o Excel con las llaves como texto.
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    tipos_llave = {c: str for c in LLAVES}
+    if extension == '.parquet':
+        return pd.read_parquet(ruta)
+    if extension in ('.xlsx', '.xlsm', '.xls'):
+        return pd.read_excel(ruta, sheet_name=hoja or 0, dtype=tipos_llave)
+    if extension in ('.csv', '.txt'):
+        return pd.read_csv(ruta, dtype=tipos_llave, keep_default_na=False)
+    if extension == '.jsonl':
+        return pd.read_json(ruta, lines=True, dtype=tipos_llave)
+    raise ValueError(f"Formato de archivo no soportado para conciliar: {ruta}")
+
+def cargar_comparacion(ruta):
+    """
+    Carga las filas de comparación de un consolidado: el .xlsx (hoja Comparación),
+    el archivo '_comparacion' en CSV/Parquet/JSONL, o un almacén SQLite (--sqlite).
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension in ('.db', '.sqlite', '.sqlite3'):
+        import almacen_resultados
+        almacen = almacen_resultados.AlmacenResultados(ruta)
+        try:
+            return pd.DataFrame(list(almacen.iterar_filas('comparacion')), columns=COLUMNAS_COMPARACION)
+        finally:
+            almacen.cerrar()
+    return leer_tabla(ruta, hoja=HOJAS['comparacion'])
+
+def cargar_extracto(ruta):
+    """
+    Carga el extracto del Data Lake: una fila por (No. Factura, No. Contrato, Variable)
+    con el valor en 'Valor Data Lake' (o 'Valor').
+    Returns:
+        DataFrame con LLAVES + ['Valor Data Lake'].
+    """
+    df = leer_tabla(ruta)
+    faltantes = [c for c in LLAVES if c not in df.columns]
+    if faltantes:
+        raise ValueError(f"Al extracto {ruta} le faltan las columnas: {', '.join(faltantes)}")
+    columna_valor = next((c for c in COLUMNAS_VALOR_EXTRACTO if c in df.columns), None)
+    if columna_valor is None:
+        raise ValueError(f"El extracto {ruta} no tiene columna de valor ({' o '.join(COLUMNAS_VALOR_EXTRACTO)})")
+    return df[LLAVES + [columna_valor]].rename(columns={columna_valor: 'Valor Data Lake'})
+
+# --- CONCILIACIÓN ---
+
+def normalizar_llave(serie):
+    """Llaves como texto sin espacios sobrantes ('100000.0' de Excel -> '100000')."""
+    texto = serie.fillna('').astype(str).str.strip()
+    return texto.str.replace(r'^(\d+)\.0$', r'\1', regex=True)
+
+def normalizar_texto(serie):
+    """Texto comparable: mayúsculas y espacios simples."""
+    return serie.fillna('').astype(str).str.strip().str.upper().str.replace(r'\s+', ' ', regex=True)
+
+def es_variable_numerica(variables):
+    return variables.isin(VARIABLES_NUMERICAS) | variables.str.endswith(SUFIJOS_NUMERICOS)
+
+def conciliar(comparacion, extracto, tolerancia_absoluta=TOLERANCIA_ABSOLUTA_DEFECTO,
+              tolerancia_relativa=TOLERANCIA_RELATIVA_DEFECTO):
+    """
+    Cruza las filas de comparación con el extracto del Data Lake.
+    Las variables numéricas coinciden si los valores son iguales y están en
+    tolerancia si |PDF - DL| <= max(tolerancia_absoluta, tolerancia_relativa * |DL|);
+    las de texto se comparan sin distinguir mayúsculas ni espacios.
+    Returns:
+        DataFrame con COLUMNAS_CONCILIACION (incluye las filas que solo están en el Data Lake).
+    """
+    # 1. Llaves normalizadas; en el extracto cada llave debe ser única
+    comparacion = comparacion.drop(columns=['Valor Data Lake'], errors='ignore').copy()
+    extracto = extracto.copy()
+    for df in (comparacion, extracto):
+        for llave in LLAVES:
+            df[llave] = normalizar_llave(df[llave])
+
+    duplicadas = extracto.duplicated(LLAVES, keep='last')
+    if duplicadas.any():
+        logger.warning(f"Extracto del Data Lake: {int(duplicadas.sum())} llaves repetidas, se usa la última")
+        extracto = extracto[~duplicadas]
+
+    # 2. Merge vectorizado
+    df = comparacion.merge(extracto, on=LLAVES, how='outer', indicator=True, sort=False)
+    solo_pdf = (df['_merge'] == 'left_only').to_numpy()
+    solo_dl = (df['_merge'] == 'right_only').to_numpy()
+    df = df.drop(columns='_merge')
+    if 'Tipo' in df.columns:
+        df['Tipo'] = df['Tipo'].fillna('')
+
+    # 3. Comparación numérica (variables numéricas presentes en ambos lados, con valores
+    # interpretables; vacío = 0). Sin contraparte no hay diferencia que reportar.
+    pareadas = ~solo_pdf & ~solo_dl
+    pdf = interpretar_numeros(df['Valor PDF'])
+    dl = interpretar_numeros(df['Valor Data Lake'])
+    validos = (pdf['formato'] != FORMATO_INVALIDO) & (dl['formato'] != FORMATO_INVALIDO)
+    numerica = (es_variable_numerica(df['Variable']) & validos).to_numpy() & pareadas
+
+    diferencia = (pdf['valor'] - dl['valor']).to_numpy()
+    limite = (dl['valor'].abs() * tolerancia_relativa).clip(lower=tolerancia_absoluta).to_numpy()
+    iguales_numero = numerica & (diferencia == 0)
+    tolerancia_numero = numerica & (abs(diferencia) <= limite)
+
+    # 4. Comparación de texto para el resto
+    iguales_texto = ~numerica
+    if iguales_texto.any():
+        texto = df.loc[iguales_texto, ['Valor PDF', 'Valor Data Lake']]
+        iguales_texto[iguales_texto] = (
+            normalizar_texto(texto['Valor PDF']) == normalizar_texto(texto['Valor Data Lake'])
+        ).to_numpy()
+
+    coincide = (iguales_numero | iguales_texto) & pareadas
+    en_tolerancia = (tolerancia_numero | iguales_texto) & pareadas
+
+    df['Diferencia'] = pd.Series(diferencia, index=df.index).where(numerica)
+    df['Coincide'] = coincide
+    df['En Tolerancia'] = en_tolerancia
+
+    estado = pd.Series(ESTADO_DIFERENCIA, index=df.index)
+    estado[en_tolerancia] = ESTADO_TOLERANCIA
+    estado[coincide] = ESTADO_COINCIDE
+    estado[solo_pdf] = ESTADO_SIN_DATA_LAKE
+    estado[solo_dl] = ESTADO_SOLO_DATA_LAKE
+    df['Estado Conciliación'] = estado
+
+    # Los consolidados anteriores a 'Nombre Archivo' no traen esa columna
+    return df.reindex(columns=COLUMNAS_CONCILIACION)
+
+def resumir_discrepancias(conciliado):
+    """
+    Resume la conciliación.
+    Returns:
+        tuple: (por variable, por factura). Los ítems se agrupan por campo
+        ('Item 3 - Total' cuenta como 'Item - Total').
+    """
+    variable = conciliado['Variable'].str.replace(r'^Item \d+ - ', 'Item - ', regex=True)
+
+    por_variable = pd.crosstab(variable, conciliado['Estado Conciliación']).reindex(columns=ESTADOS, fill_value=0)
+    diferencia = conciliado['Diferencia'].abs()
+    por_variable['Máx. Diferencia'] = diferencia.groupby(variable).max().reindex(por_variable.index)
+    por_variable['Suma Diferencias'] = diferencia.groupby(variable).sum().reindex(por_variable.index)
+    por_variable = por_variable.reset_index()
+    por_variable.columns.name = None
+
+    llaves = [conciliado['No. Factura'], conciliado['No. Contrato']]
+    por_factura = pd.crosstab(llaves, conciliado['Estado Conciliación']).reindex(columns=ESTADOS, fill_value=0)
+    por_factura['Diferencia Neta'] = conciliado['Diferencia'].groupby(llaves).sum().reindex(por_factura.index)
+    por_factura = por_factura[(por_factura[[ESTADO_DIFERENCIA, ESTADO_SIN_DATA_LAKE, ESTADO_SOLO_DATA_LAKE]] > 0).any(axis=1)]
+    por_factura = por_factura.sort_values(ESTADO_DIFERENCIA, ascending=False).reset_index()
+    por_factura.columns.name = None
+
+    return por_variable, por_factura
+
+# --- SALIDA ---
+
+def escribir_conciliacion(conciliado, por_variable, por_factura, ruta_base, formatos=('xlsx',)):
+    """
+    Escribe la conciliación y los resúmenes en los formatos pedidos.
+    Returns:
+        list: Rutas generadas.
+    """
+    tablas = {
+        'conciliacion': conciliado,
+        'variables': por_variable,
+        'facturas': por_factura,
+    }
+    rutas = []
+    for formato in formatos:
+        if formato == 'xlsx':
+            from exportacion import ExportadorExcel
+            ruta = f"{ruta_base}.xlsx"
+            with pd.ExcelWriter(ruta, engine='openpyxl') as writer:
+                dataframes = {}
+                for clave, df in tablas.items():
+                    df.to_excel(writer, sheet_name=HOJAS_CONCILIACION[clave], index=False)
+                    dataframes[HOJAS_CONCILIACION[clave]] = df
+                ExportadorExcel(None, ruta).ajustar_ancho_columnas(writer, dataframes)
+            rutas.append(ruta)
+            continue
+        for clave, df in tablas.items():
+            ruta = f"{ruta_base}_{clave}.{formato}"
+            if formato == 'csv':
+                df.to_csv(ruta, index=False)
+            elif formato == 'parquet':
+                df.to_parquet(ruta, index=False)
+            elif formato == 'jsonl':
+                df.to_json(ruta, orient='records', lines=True, force_ascii=False)
+            else:
+                raise ValueError(f"Formato de salida no soportado: {formato}")
+            rutas.append(ruta)
+    return rutas
+
+def conciliar_archivos(ruta_comparacion, ruta_extracto, ruta_base, formatos=('xlsx',),
+                       tolerancia_absoluta=TOLERANCIA_ABSOLUTA_DEFECTO,
+                       tolerancia_relativa=TOLERANCIA_RELATIVA_DEFECTO):
+    """
+    Carga, concilia y escribe. Retorna (rutas generadas, conteo por estado).
+    """
+    comparacion = cargar_comparacion(ruta_comparacion)
+    extracto = cargar_extracto(ruta_extracto)
+    conciliado = conciliar(comparacion, extracto, tolerancia_absoluta, tolerancia_relativa)
+    por_variable, por_factura = resumir_discrepancias(conciliado)
+    rutas = escribir_conciliacion(conciliado, por_variable, por_factura, ruta_base, formatos)
+    conteo = conciliado['Estado Conciliación'].value_counts().reindex(ESTADOS, fill_value=0).to_dict()
+    return rutas, conteo
@@ -0,0 +1,163 @@
+"""
+Módulo del diario de consolidación (checkpoint y reanudación).
+Durante una corrida -d cada factura terminada se agrega como una línea JSON a un
+diario local de solo anexado, con sus filas ya construidas. El diario se sincroniza
+a disco (fsync) cada ARCHIVOS_POR_PUNTO archivos o SEGUNDOS_POR_PUNTO segundos.
+Si la corrida muere, --reanudar vuelve a escribir en el consolidado las filas del
+diario (sin releer esos PDFs) y continúa con los archivos que faltan.
+"""
+
+import os
+import json
+import time
+import logging
+from exportacion import COLUMNAS
+
+logger = logging.getLogger(__name__)
+
+VERSION_DIARIO = 3
+NOMBRE_DIARIO = ".diario_consolidado"
+
+# Resultado de cada archivo registrado (el mismo desenlace que en la corrida original)
+RESULTADO_OK = 'OK'
+RESULTADO_OMITIDO = 'OMITIDO'
+RESULTADO_FALLIDO = 'FALLIDO'
+
+ARCHIVOS_POR_PUNTO = 25
+SEGUNDOS_POR_PUNTO = 30.0
+
+def ruta_diario(directorio_salida, sufijo=""):
+    """Ruta del diario de una corrida (un diario por shard)."""
+    return os.path.join(directorio_salida, f"{NOMBRE_DIARIO}{sufijo}.jsonl")
+
+def _como_lista(clave, fila):
+    if isinstance(fila, dict):
+        return [fila.get(c) for c in COLUMNAS[clave]]
+    return list(fila)
+
+class DiarioConsolidacion:
+    def __init__(self, ruta, archivos_por_punto=ARCHIVOS_POR_PUNTO, segundos_por_punto=SEGUNDOS_POR_PUNTO):
+        """
+        Args:
+            ruta (str): Archivo .jsonl del diario.
+            archivos_por_punto (int): Archivos registrados entre dos fsync.
+            segundos_por_punto (float): Segundos máximos entre dos fsync.
+        """
+        self.ruta = ruta
+        self.archivos_por_punto = archivos_por_punto
+        self.segundos_por_punto = segundos_por_punto
+        self.encabezado = None
+        self.completados = set()
+        self.archivo = None
+        self.pendientes = 0
+        self.ultimo_punto = time.time()
+
+    def cargar(self):
+        """
+        Lee el diario de una corrida interrumpida: el encabezado y el conjunto de
+        archivos completados. Una última línea truncada (caída a mitad de escritura)
+        se descarta y el archivo se recorta hasta la última línea válida.
+        Returns:
+            bool: True si había un diario utilizable.
+        """
+        if not os.path.exists(self.ruta):
+            return False
+        valido = 0
+        with open(self.ruta, 'rb') as f:
+            for linea in f:
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    logger.warning(f"Diario: se descarta una línea incompleta en {self.ruta}")
+                    break
+                if not linea.endswith(b'\n'):
+                    break
+                if self.encabezado is None:
+                    if registro.get('version') != VERSION_DIARIO:
+                        logger.warning(f"Diario con versión incompatible, se ignora: {self.ruta}")
+                        return False
+                    self.encabezado = registro
+                else:
+                    self.completados.add(registro['archivo'])
+                valido += len(linea)
+        if self.encabezado is None:
+            return False
+        with open(self.ruta, 'r+b') as f:
+            f.truncate(valido)
+        return True
+
+    def iniciar(self, encabezado):
+        """
+        Crea un diario nuevo (descarta el anterior) con el encabezado de la corrida.
+        """
+        self.encabezado = dict(encabezado, version=VERSION_DIARIO)
+        self.completados = set()
+        self.archivo = open(self.ruta, 'w', encoding='utf-8')
+        self._escribir(self.encabezado)
+        self.punto_de_control()
+
+    def continuar(self):
+        """
+        Abre el diario cargado para seguir agregando registros.
+        """
+        self.archivo = open(self.ruta, 'a', encoding='utf-8')
+
+    def iterar_registros(self):
+        """
+        Genera (archivo, resultado, filas) de cada factura del diario, leyendo el archivo
+        en streaming. 'filas' tiene el formato de main.construir_filas con tuplas.
+        """
+        with open(self.ruta, 'r', encoding='utf-8') as f:
+            next(f, None)
+            for linea in f:
+                registro = json.loads(linea)
+                filas = {clave: [tuple(v) for v in valores] for clave, valores in registro['filas'].items()}
+                if registro.get('hash_pdf'):
+                    filas['hash_pdf'] = registro['hash_pdf']
+                yield registro['archivo'], registro['resultado'], filas
+
+    def registrar(self, archivo, resultado, filas):
+        """
+        Agrega el resultado (RESULTADO_OK, _OMITIDO o _FALLIDO) de un archivo. Cada línea queda en el sistema operativo
+        al escribirse (sobrevive a la caída del proceso); el fsync periódico la
+        protege también de un reinicio de la máquina.
+        """
+        self._escribir({
+            'archivo': archivo,
+            'resultado': resultado,
+            'hash_pdf': filas.get('hash_pdf'),
+            'filas': {clave: [_como_lista(clave, fila) for fila in filas.get(clave, [])] for clave in COLUMNAS
+                      if filas.get(clave)},
+        })
+        self.completados.add(archivo)
+        self.pendientes += 1
+        if (self.pendientes >= self.archivos_por_punto
+                or time.time() - self.ultimo_punto >= self.segundos_por_punto):
+            self.punto_de_control()
+
+    def _escribir(self, registro):
+        self.archivo.write(json.dumps(registro, ensure_ascii=False))
+        self.archivo.write('\n')
+        self.archivo.flush()
+
+    def punto_de_control(self):
+        """Sincroniza el diario con el disco."""
+        os.fsync(self.archivo.fileno())
+        self.pendientes = 0
+        self.ultimo_punto = time.time()
+
+    def cerrar(self):
+        if self.archivo is not None:
+            self.punto_de_control()
+            self.archivo.close()
+            self.archivo = None
+
+    def eliminar(self):
+        """
+        Borra el diario cuando el consolidado quedó guardado (ya no hay nada que reanudar).
+        """
+        self.cerrar()
+        try:
+            os.remove(self.ruta)
+        except OSError as e:
+            logger.warning(f"No se pudo borrar el diario {self.ruta}: {e}")
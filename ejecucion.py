@@ -0,0 +1,265 @@
+"""
+Módulo de ejecución paralela.
+Reparte tareas entre procesos trabajadores supervisados y entrega los resultados
+en el mismo orden en que se recibieron las tareas.
+El supervisor puede imponer a cada tarea un límite de tiempo de pared y de memoria
+(RSS): el trabajador que lo supera se mata y se reemplaza, y solo falla su tarea.
+"""
+
+import os
+import time
+import logging
+import multiprocessing
+from multiprocessing.connection import wait
+
+logger = logging.getLogger(__name__)
+
+# Estados posibles de una tarea
+ESTADO_OK = 'OK'
+ESTADO_ERROR = 'ERROR'
+ESTADO_CAIDA = 'CAIDA'
+ESTADO_TIMEOUT = 'TIMEOUT'
+ESTADO_MEMORIA = 'MEMORIA'
+ESTADOS_LIMITE = (ESTADO_TIMEOUT, ESTADO_MEMORIA)
+# Estados que asigna el pool (no la función): se muestran tal cual en el Log_Proceso
+ESTADOS_POOL = (ESTADO_CAIDA,) + ESTADOS_LIMITE
+
+# Segundos entre dos mediciones de memoria de los trabajadores
+INTERVALO_VIGILANCIA = 0.25
+
+_TAMANO_PAGINA = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+def memoria_proceso_mb(pid):
+    """
+    Memoria residente (RSS) de un proceso en MB: /proc/<pid>/statm en Linux o psutil
+    si está instalado. None si no se puede medir.
+    """
+    try:
+        with open(f"/proc/{pid}/statm", 'rb') as f:
+            return int(f.read().split()[1]) * _TAMANO_PAGINA / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+    except Exception:
+        return None
+
+def _bucle_trabajador(conexion, funcion):
+    """
+    Bucle del proceso trabajador: recibe tareas por la tubería y devuelve resultados.
+    Un mensaje None indica que el trabajador debe terminar.
+    """
+    while True:
+        try:
+            mensaje = conexion.recv()
+        except EOFError:
+            break
+        if mensaje is None:
+            break
+
+        id_tarea, argumentos = mensaje
+        try:
+            resultado = funcion(*argumentos)
+            conexion.send((id_tarea, ESTADO_OK, resultado))
+        except Exception as e:
+            conexion.send((id_tarea, ESTADO_ERROR, f"{type(e).__name__}: {e}"))
+
+class _Trabajador:
+    """
+    Proceso trabajador con su tubería y la tarea que tiene asignada.
+    """
+    def __init__(self, contexto, funcion):
+        self.conexion, conexion_hijo = contexto.Pipe()
+        self.proceso = contexto.Process(target=_bucle_trabajador, args=(conexion_hijo, funcion), daemon=True)
+        self.proceso.start()
+        conexion_hijo.close()
+        self.id_tarea = None
+        self.inicio = None
+
+    def asignar(self, id_tarea, argumentos):
+        self.id_tarea = id_tarea
+        self.inicio = time.monotonic()
+        self.conexion.send((id_tarea, argumentos))
+
+    def detener(self):
+        try:
+            self.conexion.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.proceso.join(timeout=5)
+        if self.proceso.is_alive():
+            self.proceso.kill()
+            self.proceso.join()
+        self.conexion.close()
+
+    def matar(self):
+        self.proceso.kill()
+        self.proceso.join()
+        self.conexion.close()
+
+class PoolSupervisado:
+    """
+    Pool de procesos en el que cada trabajador atiende una tarea a la vez.
+    Si un trabajador muere (segfault, OOM killer...), solo falla su tarea:
+    el proceso se reemplaza y el lote continúa.
+    Con limite_segundos / limite_memoria_mb, el trabajador cuya tarea supera el
+    tiempo de pared o la memoria residente se mata y se reemplaza; la tarea
+    termina con ESTADO_TIMEOUT o ESTADO_MEMORIA.
+    """
+    def __init__(self, funcion, workers, limite_segundos=None, limite_memoria_mb=None):
+        self.funcion = funcion
+        self.workers = max(1, int(workers))
+        self.contexto = multiprocessing.get_context()
+        self.trabajadores = []
+        self.limite_segundos = limite_segundos or None
+        self.limite_memoria_mb = limite_memoria_mb or None
+
+    def _nuevo_trabajador(self):
+        return _Trabajador(self.contexto, self.funcion)
+
+    def procesar(self, tareas):
+        """
+        Generador que entrega (argumentos, estado, resultado) en el orden original.
+        'tareas' es un iterable de tuplas de argumentos para la función; se consume
+        de forma perezosa con una ventana acotada de tareas en vuelo.
+        """
+        iterador = iter(tareas)
+        ventana = self.workers * 4
+        pendientes = {}      # id -> argumentos (aún sin asignar)
+        argumentos_por_id = {}
+        completados = {}     # id -> (estado, resultado)
+        siguiente_id = 0
+        siguiente_entrega = 0
+        agotado = False
+
+        self.trabajadores = [self._nuevo_trabajador() for _ in range(self.workers)]
+        try:
+            while True:
+                # 1. Leer nuevas tareas mientras haya espacio en la ventana
+                while not agotado and siguiente_id - siguiente_entrega < ventana:
+                    try:
+                        argumentos = next(iterador)
+                    except StopIteration:
+                        agotado = True
+                        break
+                    pendientes[siguiente_id] = argumentos
+                    argumentos_por_id[siguiente_id] = argumentos
+                    siguiente_id += 1
+
+                # 2. Asignar tareas pendientes a trabajadores libres
+                for indice, trabajador in enumerate(self.trabajadores):
+                    if trabajador.id_tarea is None and pendientes:
+                        if not trabajador.proceso.is_alive():
+                            trabajador.matar()
+                            trabajador = self.trabajadores[indice] = self._nuevo_trabajador()
+                        id_tarea = min(pendientes)
+                        trabajador.asignar(id_tarea, pendientes.pop(id_tarea))
+
+                # 3. Entregar en orden lo que ya esté completo
+                while siguiente_entrega in completados:
+                    estado, resultado = completados.pop(siguiente_entrega)
+                    yield argumentos_por_id.pop(siguiente_entrega), estado, resultado
+                    siguiente_entrega += 1
+
+                if agotado and siguiente_entrega == siguiente_id:
+                    break
+
+                # 4. Esperar resultados o caídas de trabajadores
+                ocupados = [t for t in self.trabajadores if t.id_tarea is not None]
+                if not ocupados:
+                    continue
+                objetos = [t.conexion for t in ocupados] + [t.proceso.sentinel for t in ocupados]
+                listos = wait(objetos, timeout=self._espera(ocupados))
+
+                for trabajador in ocupados:
+                    if trabajador.conexion in listos:
+                        try:
+                            id_tarea, estado, resultado = trabajador.conexion.recv()
+                        except (EOFError, OSError):
+                            self._reemplazar(trabajador, completados)
+                            continue
+                        completados[id_tarea] = (estado, resultado)
+                        trabajador.id_tarea = None
+                    elif trabajador.proceso.sentinel in listos:
+                        self._reemplazar(trabajador, completados)
+
+                # 5. Reemplazar a los trabajadores que superaron un límite
+                self._vigilar(completados)
+        finally:
+            for trabajador in self.trabajadores:
+                trabajador.detener()
+            self.trabajadores = []
+
+    def _espera(self, ocupados):
+        """
+        Segundos que puede bloquearse la espera de resultados antes de revisar los
+        límites (None: sin límites, se espera indefinidamente).
+        """
+        esperas = []
+        if self.limite_segundos:
+            ahora = time.monotonic()
+            esperas.append(max(0.0, min(t.inicio for t in ocupados) + self.limite_segundos - ahora))
+        if self.limite_memoria_mb:
+            esperas.append(INTERVALO_VIGILANCIA)
+        return min(esperas) if esperas else None
+
+    def _vigilar(self, completados):
+        """
+        Revisa el tiempo y la memoria de las tareas en curso.
+        """
+        if not (self.limite_segundos or self.limite_memoria_mb):
+            return
+        ahora = time.monotonic()
+        for trabajador in [t for t in self.trabajadores if t.id_tarea is not None]:
+            if trabajador.conexion.poll():
+                # El resultado ya llegó: se recoge en la siguiente espera
+                continue
+            if self.limite_segundos and ahora - trabajador.inicio > self.limite_segundos:
+                self._reemplazar(trabajador, completados, ESTADO_TIMEOUT,
+                                 f"Se superó el límite de {self.limite_segundos:g} s por archivo")
+                continue
+            if self.limite_memoria_mb:
+                memoria = memoria_proceso_mb(trabajador.proceso.pid)
+                if memoria is None:
+                    logger.warning("No se puede medir la memoria de los trabajadores; se desactiva el límite de memoria")
+                    self.limite_memoria_mb = None
+                elif memoria > self.limite_memoria_mb:
+                    self._reemplazar(trabajador, completados, ESTADO_MEMORIA,
+                                     f"Se superó el límite de {self.limite_memoria_mb:g} MB de memoria "
+                                     f"({memoria:.0f} MB)")
+
+    def _reemplazar(self, trabajador, completados, estado=ESTADO_CAIDA, detalle=None):
+        """
+        Marca como fallida la tarea del trabajador (caído o que superó un límite),
+        lo termina y lo sustituye por uno nuevo.
+        """
+        if detalle is None:
+            codigo = trabajador.proceso.exitcode
+            logger.error(f"Trabajador {trabajador.proceso.pid} terminó inesperadamente (código {codigo})")
+            detalle = f"Proceso trabajador terminó con código {codigo}"
+        else:
+            logger.warning(f"Trabajador {trabajador.proceso.pid}: {detalle}; se reemplaza")
+        completados[trabajador.id_tarea] = (estado, detalle)
+        trabajador.matar()
+        indice = self.trabajadores.index(trabajador)
+        self.trabajadores[indice] = self._nuevo_trabajador()
+
+def procesar_en_orden(funcion, tareas, workers=1, limite_segundos=None, limite_memoria_mb=None):
+    """
+    Ejecuta 'funcion' sobre cada tupla de argumentos de 'tareas'.
+    Con workers <= 1 y sin límites se ejecuta en el proceso actual; en otro caso se
+    usa un PoolSupervisado (un límite solo se puede imponer a otro proceso).
+    Entrega tuplas (argumentos, estado, resultado) en el orden original.
+    """
+    if workers <= 1 and not (limite_segundos or limite_memoria_mb):
+        for argumentos in tareas:
+            try:
+                yield argumentos, ESTADO_OK, funcion(*argumentos)
+            except Exception as e:
+                logger.error(f"Error en tarea {argumentos}: {e}", exc_info=True)
+                yield argumentos, ESTADO_ERROR, f"{type(e).__name__}: {e}"
+        return
+
+    pool = PoolSupervisado(funcion, workers, limite_segundos, limite_memoria_mb)
+    yield from pool.procesar(tareas)
@@ -0,0 +1,98 @@
+"""
+Módulo de escaneo de directorios de entrada.
+Recorre el archivo de PDFs con os.scandir (opcionalmente de forma recursiva, p. ej.
+año/mes/proveedor/), filtra con globs de inclusión y exclusión, y entrega las rutas
+de forma perezosa, sin construir la lista completa.
+Con un shard 'i/N' cada máquina toma solo los archivos cuyo hash de ruta relativa
+cae en su porción: la asignación es determinista y no depende del punto de montaje.
+"""
+
+import os
+import hashlib
+import logging
+from fnmatch import fnmatch
+
+logger = logging.getLogger(__name__)
+
+INCLUIR_DEFECTO = ['*.pdf']
+
+def parsear_shard(texto):
+    """
+    Interpreta 'i/N' (1 <= i <= N).
+    Returns:
+        tuple: (i, N)
+    """
+    try:
+        indice, total = (int(parte) for parte in texto.split('/'))
+    except ValueError:
+        raise ValueError(f"Shard inválido (se espera i/N, p. ej. 2/4): {texto}")
+    if total < 1 or not 1 <= indice <= total:
+        raise ValueError(f"Shard inválido (se espera 1 <= i <= N): {texto}")
+    return indice, total
+
+def sufijo_shard(shard):
+    """Sufijo para los nombres de salida de un shard: '_shard2de4'."""
+    return f"_shard{shard[0]}de{shard[1]}" if shard else ""
+
+def shard_de(ruta_relativa, total):
+    """
+    Shard (1..total) al que pertenece una ruta relativa ('/' como separador).
+    """
+    digest = hashlib.sha1(ruta_relativa.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % total + 1
+
+def coincide(ruta_relativa, patrones):
+    """
+    Un patrón con '/' se compara con la ruta relativa completa ('2024/*/*.pdf');
+    uno sin '/' solo con el nombre ('*.pdf'). Sin distinguir mayúsculas.
+    Como en fnmatch, '*' también cruza '/': '2024/*' toma todo lo que cuelga de 2024/.
+    """
+    ruta = ruta_relativa.lower()
+    nombre = ruta.rsplit('/', 1)[-1]
+    for patron in patrones:
+        patron = patron.lower()
+        if fnmatch(ruta if '/' in patron else nombre, patron):
+            return True
+    return False
+
+def iterar_pdfs(directorio, recursivo=False, incluir=None, excluir=None, shard=None):
+    """
+    Genera las rutas relativas (con '/') de los archivos que cumplen los filtros,
+    en orden alfabético dentro de cada directorio.
+    Args:
+        incluir (list): Globs de inclusión (por defecto '*.pdf').
+        excluir (list): Globs de exclusión; un directorio excluido no se recorre.
+        shard (tuple): (i, N) para tomar solo una porción del archivo.
+    """
+    incluir = incluir or INCLUIR_DEFECTO
+    excluir = excluir or []
+    pendientes = ['']
+    while pendientes:
+        relativo = pendientes.pop()
+        actual = os.path.join(directorio, relativo) if relativo else directorio
+        try:
+            with os.scandir(actual) as iterador:
+                entradas = sorted(iterador, key=lambda e: e.name)
+        except OSError as e:
+            logger.error(f"No se pudo leer el directorio {actual}: {e}")
+            continue
+
+        subdirectorios = []
+        for entrada in entradas:
+            ruta_relativa = f"{relativo}/{entrada.name}" if relativo else entrada.name
+            try:
+                es_directorio = entrada.is_dir()
+            except OSError:
+                continue
+            if es_directorio:
+                if recursivo and not coincide(ruta_relativa, excluir):
+                    subdirectorios.append(ruta_relativa)
+                continue
+            if not coincide(ruta_relativa, incluir) or coincide(ruta_relativa, excluir):
+                continue
+            if shard and shard_de(ruta_relativa, shard[1]) != shard[0]:
+                continue
+            yield ruta_relativa
+
+        # Pila: se invierte para recorrer los subdirectorios en orden alfabético
+        pendientes.extend(reversed(subdirectorios))
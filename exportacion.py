@@ -1,56 +1,153 @@
 """
 Módulo para la exportación de datos a Excel.
 Genera un archivo con múltiples hojas: Detalle, Resumen y Comparación.
+Los formatos columnares (Parquet/CSV/JSONL) viven en exportacion_columnar.
 """
 
-import pandas as pd
 import logging
-from openpyxl.utils import get_column_letter
+from exportacion_columnar import EXPORTADORES_COLUMNARES
+
+# pandas y openpyxl se importan dentro de los exportadores que los usan: las constantes
+# de este módulo (HOJAS, COLUMNAS, FORMATOS) y las salidas columnares no los necesitan.
 
 logger = logging.getLogger(__name__)
 
+# --- ESTRUCTURA DE HOJAS ---
+HOJAS = {
+    'conceptos': 'Conceptos_Vertical',
+    'generales': 'Variables_Generales',
+    'comparacion': 'Comparacion',
+    'validacion': 'Log_Proceso',
+}
+
+COLUMNAS_CONCEPTOS = [
+    'No. Factura', 'No. Contrato', 'Item ID', 'Referencia', 
+    'Concepto', 'Unidad', 'Cantidad', 'Tarifa', 'Valor Total Item',
+    'Nombre Archivo'    # PDF de origen (la factura sola no lo identifica)
+]
+
+COLUMNAS_GENERALES = [
+    'Nombre Archivo', 'No. Factura', 'CUFE', 'No. Contrato',
+    'Fecha Expedición', 'Fecha Vencimiento', 'Periodo Facturación',
+    'Cliente', 'NIT Cliente', 'Dirección', 'Ciudad', 'Email', 'Teléfono',
+    'Total Facturado (Subtotal)', 'Intereses', 'Anticipo/Prepago', 'Total a Pagar', 
+    'Valor en Letras', 'Medio de Pago', 'Banco', 'Tipo Cuenta', 'No. Cuenta', 
+    'Forma de Pago', 'IPP', 'TRM', 'Observaciones', 
+    'Items Detectados', 'Estado Validación', 'Errores'
+]
+
+COLUMNAS_COMPARACION = [
+    'No. Factura',      # <--- Llave Primaria
+    'No. Contrato',     # <--- Llave Secundaria
+    'Tipo', 
+    'Variable', 
+    'Valor PDF', 
+    'Valor Data Lake',
+    'Nombre Archivo'    # PDF de origen
+]
+
+COLUMNAS_VALIDACION = ['Fecha Proceso', 'Archivo', 'No. Factura', 'Es Válida', 'Errores']
+
+COLUMNAS = {
+    'conceptos': COLUMNAS_CONCEPTOS,
+    'generales': COLUMNAS_GENERALES,
+    'comparacion': COLUMNAS_COMPARACION,
+    'validacion': COLUMNAS_VALIDACION,
+}
+
+def filas_a_dataframe(filas, columnas):
+    """
+    DataFrame de un dataset a partir de registros (tuplas en el orden de 'columnas'),
+    de dicts, o de un DataFrame ya armado.
+    """
+    import pandas as pd
+
+    if isinstance(filas, pd.DataFrame):
+        return filas
+    if filas and isinstance(filas[0], tuple):
+        return pd.DataFrame.from_records(filas, columns=columnas)
+    return pd.DataFrame(filas)
+
+def filas_a_dicts(datos):
+    """
+    Copia de 'datos' con las filas de cada dataset como dicts por título de columna
+    (para serializar a JSON: las tuplas con nombre se escribirían como listas).
+    """
+    resultado = dict(datos)
+    for clave, columnas in COLUMNAS.items():
+        filas = datos.get(clave)
+        if isinstance(filas, list):
+            resultado[clave] = [dict(zip(columnas, f)) if isinstance(f, tuple) else f for f in filas]
+    return resultado
+
+def calcular_ancho_columna(max_length):
+    """
+    Ancho de columna a partir de la longitud del texto más largo (entre 10 y 60).
+    """
+    return min(max(max_length + 2, 10), 60)
+
 class ExportadorExcel:
     def __init__(self, datos_procesados, ruta_salida):
         """
         Inicializa el exportador.
         Args:
-            datos_procesados (dict): Diccionario con listas 'conceptos', 'generales', 'comparacion' y 'validacion'.
+            datos_procesados (dict): Diccionario con 'conceptos', 'generales', 'comparacion' y 'validacion':
+                listas de registros o dicts, o DataFrames.
             ruta_salida (str): Ruta completa donde se guardará el archivo .xlsx.
         """
         self.datos = datos_procesados
         self.ruta_salida = ruta_salida
 
-    def ajustar_ancho_columnas(self, writer):
+    @staticmethod
+    def calcular_anchos(df):
+        """
+        Calcula el ancho de cada columna a partir del DataFrame, antes de escribirlo.
+        Usa la longitud máxima del texto por columna (vectorizado) e incluye el encabezado;
+        los valores vacíos, nulos o cero se ignoran igual que en el Excel escrito, y un
+        flotante entero (p. ej. una cantidad en una columna con nulos) cuenta sin '.0',
+        como queda en la celda.
+        """
+        anchos = []
+        for columna in df.columns:
+            serie = df[columna]
+            serie = serie[serie.notna()]
+            if not serie.empty:
+                serie = serie[serie.astype(bool)]
+            max_length = len(str(columna))
+            if not serie.empty:
+                textos = serie.astype(str)
+                if serie.dtype.kind == 'f':
+                    textos = textos.str.removesuffix('.0')
+                elif serie.dtype == object:
+                    flotantes = serie.map(lambda v: isinstance(v, float)).astype(bool)
+                    textos[flotantes] = textos[flotantes].str.removesuffix('.0')
+                max_length = max(max_length, int(textos.str.len().max()))
+            anchos.append(calcular_ancho_columna(max_length))
+        return anchos
+
+    def ajustar_ancho_columnas(self, writer, dataframes):
         """
-        Ajusta automáticamente el ancho de las columnas en todas las hojas.
+        Aplica a cada hoja los anchos calculados desde sus DataFrames
+        (sin volver a recorrer las celdas del libro escrito).
         """
-        workbook = writer.book
-        for sheet_name in writer.sheets:
+        from openpyxl.utils import get_column_letter
+
+        for sheet_name, df in dataframes.items():
             worksheet = writer.sheets[sheet_name]
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = get_column_letter(column[0].column)
-                
-                for cell in column:
-                    try:
-                        if cell.value:
-                            val_len = len(str(cell.value))
-                            max_length = max(max_length, val_len)
-                    except:
-                        pass
-                
-                adjusted_width = min(max(max_length + 2, 10), 60)
-                worksheet.column_dimensions[column_letter].width = adjusted_width
+            for indice, ancho in enumerate(self.calcular_anchos(df), 1):
+                worksheet.column_dimensions[get_column_letter(indice)].width = ancho
 
     def exportar(self):
         """
         Ejecuta la exportación a Excel.
         """
+        import pandas as pd
+
         try:
             # 1. Preparar DataFrames
-            df_conceptos = pd.DataFrame(self.datos.get('conceptos', []))
-            df_generales = pd.DataFrame(self.datos.get('generales', []))
-            df_comparacion = pd.DataFrame(self.datos.get('comparacion', []))
+            df_conceptos = filas_a_dataframe(self.datos.get('conceptos', []), COLUMNAS_CONCEPTOS)
+            df_generales = filas_a_dataframe(self.datos.get('generales', []), COLUMNAS_GENERALES)
+            df_comparacion = filas_a_dataframe(self.datos.get('comparacion', []), COLUMNAS_COMPARACION)
             
             # Validación puede ser una lista (si es consolidado) o dict (si es individual)
             validacion_data = self.datos.get('validacion', [])
@@ -65,13 +162,10 @@ class ExportadorExcel:
                 })
             else:
                 # Caso masivo (lista de logs)
-                df_validacion = pd.DataFrame(validacion_data)
+                df_validacion = filas_a_dataframe(validacion_data, COLUMNAS_VALIDACION)
 
             # 2. Orden Columnas - HOJA CONCEPTOS
-            cols_conceptos_orden = [
-                'No. Factura', 'No. Contrato', 'Item ID', 'Referencia', 
-                'Concepto', 'Unidad', 'Cantidad', 'Tarifa', 'Valor Total Item'
-            ]
+            cols_conceptos_orden = COLUMNAS_CONCEPTOS
             
             if not df_conceptos.empty:
                 cols_existentes = [c for c in cols_conceptos_orden if c in df_conceptos.columns]
@@ -79,15 +173,7 @@ class ExportadorExcel:
                 df_conceptos = df_conceptos[cols_existentes + otras]
 
             # 3. Orden Columnas - HOJA GENERALES
-            cols_generales_orden = [
-                'Nombre Archivo', 'No. Factura', 'CUFE', 'No. Contrato',
-                'Fecha Expedición', 'Fecha Vencimiento', 'Periodo Facturación',
-                'Cliente', 'NIT Cliente', 'Dirección', 'Ciudad', 'Email', 'Teléfono',
-                'Total Facturado (Subtotal)', 'Intereses', 'Anticipo/Prepago', 'Total a Pagar', 
-                'Valor en Letras', 'Medio de Pago', 'Banco', 'Tipo Cuenta', 'No. Cuenta', 
-                'Forma de Pago', 'IPP', 'TRM', 'Observaciones', 
-                'Items Detectados', 'Estado Validación', 'Errores'
-            ]
+            cols_generales_orden = COLUMNAS_GENERALES
             
             if not df_generales.empty:
                 cols_existentes = [c for c in cols_generales_orden if c in df_generales.columns]
@@ -95,30 +181,192 @@ class ExportadorExcel:
                 df_generales = df_generales[cols_existentes + otras]
 
             # 4. Orden Columnas - HOJA COMPARACIÓN (Con Llaves Nuevas)
-            cols_comparacion_orden = [
-                'No. Factura',      # <--- Llave Primaria
-                'No. Contrato',     # <--- Llave Secundaria
-                'Tipo', 
-                'Variable', 
-                'Valor PDF', 
-                'Valor Data Lake'
-            ]
+            cols_comparacion_orden = COLUMNAS_COMPARACION
             if not df_comparacion.empty:
                 # Asegurar orden y columnas existentes
                 cols_existentes = [c for c in cols_comparacion_orden if c in df_comparacion.columns]
                 df_comparacion = df_comparacion[cols_existentes]
 
             # 5. Escribir a Excel
+            dataframes = {
+                HOJAS['conceptos']: df_conceptos,
+                HOJAS['generales']: df_generales,
+                HOJAS['comparacion']: df_comparacion,
+                HOJAS['validacion']: df_validacion,
+            }
             with pd.ExcelWriter(self.ruta_salida, engine='openpyxl') as writer:
-                df_conceptos.to_excel(writer, sheet_name='Conceptos_Vertical', index=False)
-                df_generales.to_excel(writer, sheet_name='Variables_Generales', index=False)
-                df_comparacion.to_excel(writer, sheet_name='Comparacion', index=False)
-                df_validacion.to_excel(writer, sheet_name='Log_Proceso', index=False)
+                for sheet_name, df in dataframes.items():
+                    df.to_excel(writer, sheet_name=sheet_name, index=False)
                 
-                self.ajustar_ancho_columnas(writer)
+                self.ajustar_ancho_columnas(writer, dataframes)
                 
             return self.ruta_salida
             
         except Exception as e:
             logger.error(f"Error al exportar a Excel: {e}")
-            raise
\ No newline at end of file
+            raise
+
+class ExportadorExcelStreaming:
+    def __init__(self, ruta_salida, filas_muestra=500):
+        """
+        Exportador incremental en modo write-only de openpyxl: las filas se escriben
+        a disco a medida que llegan, por lo que la memoria no crece con el lote.
+        Args:
+            ruta_salida (str): Ruta completa donde se guardará el archivo .xlsx.
+            filas_muestra (int): Filas por hoja que se retienen antes de empezar a escribir,
+                para calcular el ancho de las columnas (en write-only no se puede
+                modificar después de la primera fila).
+        """
+        from openpyxl import Workbook
+
+        self.ruta_salida = ruta_salida
+        self.filas_muestra = filas_muestra
+        self.workbook = Workbook(write_only=True)
+        self.hojas = {}
+        self.pendientes = {}
+        self.filas_escritas = {}
+        for clave, nombre_hoja in HOJAS.items():
+            self.hojas[clave] = self.workbook.create_sheet(title=nombre_hoja)
+            self.pendientes[clave] = []
+            self.filas_escritas[clave] = 0
+
+    def agregar(self, datos):
+        """
+        Agrega las filas de una factura (o de varias) a cada hoja.
+        Args:
+            datos (dict): Listas de filas por dataset ('conceptos', 'generales',
+                'comparacion' y 'validacion'): registros de procesamiento (tuplas en
+                el orden de COLUMNAS) o dicts.
+        """
+        for clave, columnas in COLUMNAS.items():
+            for fila in datos.get(clave, []):
+                self.escribir_fila(clave, fila if isinstance(fila, tuple) else tuple(fila.get(c) for c in columnas))
+
+    def escribir_fila(self, clave, valores):
+        """
+        Escribe una fila (tupla en el orden de COLUMNAS[clave]) en la hoja del dataset.
+        """
+        pendientes = self.pendientes[clave]
+        if pendientes is None:
+            self.hojas[clave].append(valores)
+        else:
+            pendientes.append(valores)
+            if len(pendientes) >= self.filas_muestra:
+                self._iniciar_hoja(clave)
+        self.filas_escritas[clave] += 1
+
+    def _iniciar_hoja(self, clave):
+        """
+        Fija el ancho de las columnas con la muestra retenida y escribe encabezado y muestra.
+        """
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+        from openpyxl.utils import get_column_letter
+
+        hoja = self.hojas[clave]
+        columnas = COLUMNAS[clave]
+        muestra = self.pendientes[clave]
+
+        for indice, columna in enumerate(columnas):
+            max_length = len(columna)
+            for valores in muestra:
+                valor = valores[indice]
+                if valor:
+                    max_length = max(max_length, len(str(valor)))
+            hoja.column_dimensions[get_column_letter(indice + 1)].width = calcular_ancho_columna(max_length)
+
+        encabezado = []
+        for columna in columnas:
+            celda = WriteOnlyCell(hoja, value=columna)
+            celda.font = Font(bold=True)
+            encabezado.append(celda)
+        hoja.append(encabezado)
+
+        for valores in muestra:
+            hoja.append(valores)
+        self.pendientes[clave] = None
+
+    def vaciar(self):
+        """
+        En write-only el libro solo es legible al cerrarlo: no hay nada que vaciar antes.
+        """
+
+    def cerrar(self):
+        """
+        Vuelca las muestras pendientes y guarda el archivo.
+        """
+        try:
+            for clave in HOJAS:
+                if self.pendientes[clave] is not None:
+                    self._iniciar_hoja(clave)
+            self.workbook.save(self.ruta_salida)
+            return self.ruta_salida
+        except Exception as e:
+            logger.error(f"Error al exportar a Excel: {e}")
+            raise
+
+    def descartar(self):
+        """
+        En write-only nada llega a la ruta de salida hasta cerrar: basta con cerrar las
+        hojas, borrar sus archivos temporales y soltar el libro.
+        """
+        for hoja in self.hojas.values():
+            if not hoja.closed:
+                hoja.close()
+            # openpyxl solo borra el archivo temporal de la hoja al guardar el libro
+            hoja._writer.cleanup()
+        self.workbook = None
+        self.hojas = {}
+
+# --- SELECCIÓN DE FORMATOS ---
+FORMATOS = ['xlsx'] + list(EXPORTADORES_COLUMNARES)
+
+class ExportadorMultiple:
+    """
+    Reenvía las filas a varios exportadores en streaming (p. ej. Parquet + copia Excel).
+    """
+    def __init__(self, exportadores):
+        self.exportadores = exportadores
+
+    def agregar(self, datos):
+        for exportador in self.exportadores:
+            exportador.agregar(datos)
+
+    def escribir_fila(self, clave, valores):
+        for exportador in self.exportadores:
+            exportador.escribir_fila(clave, valores)
+
+    def vaciar(self):
+        for exportador in self.exportadores:
+            exportador.vaciar()
+
+    def descartar(self):
+        for exportador in self.exportadores:
+            exportador.descartar()
+
+    def cerrar(self):
+        rutas = []
+        for exportador in self.exportadores:
+            resultado = exportador.cerrar()
+            rutas.extend(resultado if isinstance(resultado, list) else [resultado])
+        return rutas
+
+def crear_exportador_streaming(formatos, ruta_base):
+    """
+    Crea el exportador en streaming para los formatos pedidos.
+    Args:
+        formatos (list): Subconjunto de FORMATOS.
+        ruta_base (str): Ruta de salida sin extensión.
+    """
+    exportadores = []
+    for formato in formatos:
+        if formato == 'xlsx':
+            exportadores.append(ExportadorExcelStreaming(f"{ruta_base}.xlsx"))
+        elif formato in EXPORTADORES_COLUMNARES:
+            exportadores.append(EXPORTADORES_COLUMNARES[formato](ruta_base, COLUMNAS))
+        else:
+            raise ValueError(f"Formato de salida no soportado: {formato}")
+
+    if len(exportadores) == 1:
+        return exportadores[0]
+    return ExportadorMultiple(exportadores)
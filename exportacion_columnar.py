@@ -0,0 +1,274 @@
+"""
+Módulo para la exportación en formatos columnares (Parquet, CSV y JSON Lines).
+Genera un archivo por dataset (conceptos, generales, comparacion, validacion) con
+columnas tipadas: decimales para los montos y fechas para los campos de fecha.
+Comparte la interfaz de streaming de ExportadorExcelStreaming (agregar / escribir_fila / cerrar).
+"""
+
+import os
+import csv
+import json
+import logging
+from datetime import datetime, date
+from numeros import interpretar_valor, FORMATO_INVALIDO, FORMATO_VACIO
+from utils import parsear_fecha
+
+logger = logging.getLogger(__name__)
+
+# Tipos lógicos de columna
+TIPO_TEXTO = 'texto'
+TIPO_DECIMAL = 'decimal'
+TIPO_ENTERO = 'entero'
+TIPO_FECHA = 'fecha'
+TIPO_FECHA_HORA = 'fecha_hora'
+
+# Columnas con tipo distinto de texto, por dataset
+TIPOS_COLUMNAS = {
+    'conceptos': {
+        'Cantidad': TIPO_DECIMAL,
+        'Tarifa': TIPO_DECIMAL,
+        'Valor Total Item': TIPO_DECIMAL,
+    },
+    'generales': {
+        'Fecha Expedición': TIPO_FECHA,
+        'Fecha Vencimiento': TIPO_FECHA,
+        'Total Facturado (Subtotal)': TIPO_DECIMAL,
+        'Intereses': TIPO_DECIMAL,
+        'Anticipo/Prepago': TIPO_DECIMAL,
+        'Total a Pagar': TIPO_DECIMAL,
+        'Items Detectados': TIPO_ENTERO,
+    },
+    'comparacion': {},
+    'validacion': {
+        'Fecha Proceso': TIPO_FECHA_HORA,
+    },
+}
+
+FORMATO_FECHA_HORA = "%Y-%m-%d %H:%M:%S"
+
+def convertir_valor(valor, tipo):
+    """
+    Convierte un valor crudo al tipo lógico de su columna (None si está vacío o no es válido).
+    """
+    if valor is None or valor == '':
+        return None
+
+    if tipo == TIPO_DECIMAL:
+        if isinstance(valor, (int, float)):
+            return float(valor)
+        # Un texto que no es un número queda vacío, no en 0.0
+        interpretado = interpretar_valor(valor)
+        if interpretado.formato in (FORMATO_INVALIDO, FORMATO_VACIO):
+            return None
+        return interpretado.valor
+
+    if tipo == TIPO_ENTERO:
+        try:
+            return int(valor)
+        except (TypeError, ValueError):
+            return None
+
+    if tipo == TIPO_FECHA:
+        if isinstance(valor, datetime):
+            return valor.date()
+        if isinstance(valor, date):
+            return valor
+        return parsear_fecha(str(valor))
+
+    if tipo == TIPO_FECHA_HORA:
+        if isinstance(valor, datetime):
+            return valor
+        try:
+            return datetime.strptime(str(valor), FORMATO_FECHA_HORA)
+        except ValueError:
+            return None
+
+    return str(valor)
+
+def _serializar_json(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+class ExportadorColumnar:
+    """
+    Base de los exportadores columnares: tipa cada fila y delega la escritura al backend.
+    """
+    extension = None
+
+    def __init__(self, ruta_base, columnas):
+        """
+        Args:
+            ruta_base (str): Ruta sin extensión; se genera '<ruta_base>_<dataset>.<ext>'.
+            columnas (dict): Dataset -> lista ordenada de columnas.
+        """
+        self.ruta_base = ruta_base
+        self.columnas = columnas
+        self.tipos = {
+            clave: [TIPOS_COLUMNAS.get(clave, {}).get(c, TIPO_TEXTO) for c in cols]
+            for clave, cols in columnas.items()
+        }
+        self.rutas = {clave: f"{ruta_base}_{clave}.{self.extension}" for clave in columnas}
+        self.filas_escritas = {clave: 0 for clave in columnas}
+
+    def agregar(self, datos):
+        """
+        Agrega las filas de cada dataset: registros de procesamiento (tuplas en el
+        orden de columnas) o dicts.
+        """
+        for clave, columnas in self.columnas.items():
+            for fila in datos.get(clave, []):
+                self.escribir_fila(clave, fila if isinstance(fila, tuple) else tuple(fila.get(c) for c in columnas))
+
+    def escribir_fila(self, clave, valores):
+        """
+        Escribe una fila (tupla en el orden de columnas del dataset) ya tipada.
+        """
+        tipada = tuple(convertir_valor(v, t) for v, t in zip(valores, self.tipos[clave]))
+        self._escribir(clave, tipada)
+        self.filas_escritas[clave] += 1
+
+    def _escribir(self, clave, valores):
+        raise NotImplementedError
+
+    def vaciar(self):
+        """
+        Deja en disco lo escrito hasta ahora (para lectores que siguen el archivo).
+        """
+
+    def cerrar(self):
+        raise NotImplementedError
+
+    def descartar(self):
+        """
+        Cierra sin finalizar y borra los archivos a medio escribir.
+        """
+        self._cerrar_archivos()
+        for ruta in self.rutas.values():
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+
+    def _cerrar_archivos(self):
+        raise NotImplementedError
+
+class ExportadorCSV(ExportadorColumnar):
+    extension = 'csv'
+
+    def __init__(self, ruta_base, columnas):
+        super().__init__(ruta_base, columnas)
+        self.archivos = {}
+        self.writers = {}
+        for clave, cols in columnas.items():
+            archivo = open(self.rutas[clave], 'w', encoding='utf-8', newline='')
+            writer = csv.writer(archivo)
+            writer.writerow(cols)
+            self.archivos[clave] = archivo
+            self.writers[clave] = writer
+
+    def _escribir(self, clave, valores):
+        self.writers[clave].writerow(
+            [v.isoformat() if isinstance(v, (datetime, date)) else v for v in valores]
+        )
+
+    def vaciar(self):
+        for archivo in self.archivos.values():
+            archivo.flush()
+
+    def _cerrar_archivos(self):
+        for archivo in self.archivos.values():
+            archivo.close()
+
+    def cerrar(self):
+        self._cerrar_archivos()
+        return list(self.rutas.values())
+
+class ExportadorJSONL(ExportadorColumnar):
+    extension = 'jsonl'
+
+    def __init__(self, ruta_base, columnas):
+        super().__init__(ruta_base, columnas)
+        self.archivos = {clave: open(ruta, 'w', encoding='utf-8') for clave, ruta in self.rutas.items()}
+
+    def _escribir(self, clave, valores):
+        registro = dict(zip(self.columnas[clave], valores))
+        self.archivos[clave].write(json.dumps(registro, ensure_ascii=False, default=_serializar_json))
+        self.archivos[clave].write('\n')
+
+    def vaciar(self):
+        for archivo in self.archivos.values():
+            archivo.flush()
+
+    def _cerrar_archivos(self):
+        for archivo in self.archivos.values():
+            archivo.close()
+
+    def cerrar(self):
+        self._cerrar_archivos()
+        return list(self.rutas.values())
+
+class ExportadorParquet(ExportadorColumnar):
+    extension = 'parquet'
+
+    def __init__(self, ruta_base, columnas, filas_por_grupo=50000):
+        """
+        Las filas se acumulan por columnas hasta 'filas_por_grupo' y se escriben
+        como un row group; la memoria queda acotada por ese tamaño.
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("El formato parquet requiere el paquete 'pyarrow'") from e
+
+        super().__init__(ruta_base, columnas)
+        self.pa = pa
+        self.filas_por_grupo = filas_por_grupo
+        tipos_arrow = {
+            TIPO_TEXTO: pa.string(),
+            TIPO_DECIMAL: pa.float64(),
+            TIPO_ENTERO: pa.int64(),
+            TIPO_FECHA: pa.date32(),
+            TIPO_FECHA_HORA: pa.timestamp('s'),
+        }
+        self.esquemas = {
+            clave: pa.schema([(c, tipos_arrow[t]) for c, t in zip(cols, self.tipos[clave])])
+            for clave, cols in columnas.items()
+        }
+        self.writers = {clave: pq.ParquetWriter(self.rutas[clave], self.esquemas[clave]) for clave in columnas}
+        self.buffers = {clave: [[] for _ in cols] for clave, cols in columnas.items()}
+        self.pendientes = {clave: 0 for clave in columnas}
+
+    def _escribir(self, clave, valores):
+        buffer = self.buffers[clave]
+        for indice, valor in enumerate(valores):
+            buffer[indice].append(valor)
+        self.pendientes[clave] += 1
+        if self.pendientes[clave] >= self.filas_por_grupo:
+            self._volcar(clave)
+
+    def _volcar(self, clave):
+        if not self.pendientes[clave]:
+            return
+        esquema = self.esquemas[clave]
+        arrays = [self.pa.array(col, type=campo.type) for col, campo in zip(self.buffers[clave], esquema)]
+        self.writers[clave].write_table(self.pa.Table.from_arrays(arrays, schema=esquema))
+        self.buffers[clave] = [[] for _ in esquema]
+        self.pendientes[clave] = 0
+
+    def _cerrar_archivos(self):
+        for writer in self.writers.values():
+            writer.close()
+
+    def cerrar(self):
+        for clave in self.writers:
+            self._volcar(clave)
+        self._cerrar_archivos()
+        return list(self.rutas.values())
+
+EXPORTADORES_COLUMNARES = {
+    'csv': ExportadorCSV,
+    'jsonl': ExportadorJSONL,
+    'parquet': ExportadorParquet,
+}
@@ -6,11 +6,20 @@ Analiza las líneas de texto reconstruidas visualmente para extraer datos y tabl
 import re
 import logging
 from extractores_pdf import extraer_datos_estructurados
-from extractores_patrones import PATRONES_ENCABEZADO, PATRONES_MONTO, PATRONES_INFO_PIE, ENCABEZADOS_TABLA_ITEMS
-from utils import limpiar_moneda, limpiar_cantidad
+from extractores_patrones import ENCABEZADOS_TABLA_ITEMS, CAMPOS_REQUERIDOS, CAMPOS_CLIENTE
+from motor_patrones import crear_motor_generales
+from tabla_items import ColumnasTabla, FUERA_DE_TABLA, FIN_DE_TABLA
+from utils import limpiar_cantidad, es_numero_valido
+from numeros import interpretar_valor, FORMATO_AMBIGUO
+import perfilado
 
 logger = logging.getLogger(__name__)
 
+# Motor de patrones compilado una sola vez por proceso
+MOTOR_GENERALES = crear_motor_generales()
+
+RE_DIGITO = re.compile(r'\d')
+
 def es_linea_totales(linea):
     """
     Detecta si la línea es un pie de tabla o resumen financiero.
@@ -22,12 +31,21 @@ def es_linea_totales(linea):
     ]
     return any(k in linea_norm for k in claves)
 
-def es_numero_valido(token):
-    """Verifica si un string parece un número."""
-    if not re.search(r'\d', token):
-        return False
-    limpio = token.replace('$', '').replace(',', '').replace('.', '').replace(' ', '')
-    return limpio.isdigit()
+def es_encabezado_tabla(linea):
+    """
+    Detecta la fila de encabezado de la tabla de ítems (al menos 2 títulos conocidos).
+    """
+    linea_lower = linea.lower()
+    coincidencias = sum(1 for h in ENCABEZADOS_TABLA_ITEMS if h.lower() in linea_lower)
+    return coincidencias >= 2
+
+def marcar_ambiguo(item, campo, interpretado):
+    """
+    Anota en item['ambiguos'] los montos con FORMATO_AMBIGUO ('280.933': miles o decimales),
+    para que la validación los marque en lugar de aceptarlos en silencio.
+    """
+    if interpretado.formato == FORMATO_AMBIGUO:
+        item.setdefault('ambiguos', []).append(campo)
 
 def parsear_linea_item(linea):
     """
@@ -74,9 +92,10 @@ def parsear_linea_item(linea):
         for i in range(3):
             if idx_cursor < 0: break
             token = palabras_validas[idx_cursor]
-            val = limpiar_moneda(token)
-            if val > 0 and es_numero_valido(token):
-                item['total'] = val
+            interpretado = interpretar_valor(token)
+            if interpretado.valor > 0 and es_numero_valido(token):
+                item['total'] = interpretado.valor
+                marcar_ambiguo(item, 'total', interpretado)
                 encontrado_total = True
                 idx_cursor -= 1 
                 break
@@ -87,7 +106,9 @@ def parsear_linea_item(linea):
         if idx_cursor >= 0:
             token = palabras_validas[idx_cursor]
             if es_numero_valido(token):
-                item['tarifa'] = limpiar_moneda(token)
+                interpretado = interpretar_valor(token)
+                item['tarifa'] = interpretado.valor
+                marcar_ambiguo(item, 'tarifa', interpretado)
                 idx_cursor -= 1
 
         if idx_cursor >= 0:
@@ -131,88 +152,118 @@ def parsear_linea_item(linea):
     except Exception:
         return None
 
-def extraer_datos_factura(ruta_pdf):
+def extraer_items(lineas):
+    """
+    Extrae los ítems de la tabla. Si las líneas traen sus celdas (extractores_pdf.Fila),
+    las columnas se ubican una vez desde el encabezado y cada fila se interpreta por
+    posición; si eso no es posible se usa parsear_linea_item sobre el texto.
+    """
+    items = []
+    en_tabla = False
+    columnas = None
+    
+    for linea in lineas:
+        # El encabezado abre la tabla (o la retoma si se repite en otra página;
+        # dentro de la tabla solo cuenta sin dígitos, para no confundirlo con un ítem)
+        if es_encabezado_tabla(linea) and not (en_tabla and RE_DIGITO.search(linea)):
+            en_tabla = True
+            columnas = ColumnasTabla.desde_encabezado(linea)
+            continue
+        
+        if not en_tabla:
+            continue
+        
+        if es_linea_totales(linea):
+            en_tabla = False
+            continue
+        
+        item = None
+        if columnas is not None:
+            item = columnas.parsear_fila(linea)
+            if item is FUERA_DE_TABLA:
+                continue
+            if item is FIN_DE_TABLA:
+                en_tabla = False
+                continue
+        
+        if item is None:
+            item = parsear_linea_item(linea)
+        if item:
+            items.append(item)
+    
+    return items
+
+def crear_condicion_adaptativa():
+    """
+    Retorna la condición de parada del modo adaptativo: se deja de leer páginas cuando
+    los CAMPOS_REQUERIDOS están resueltos y la tabla de ítems ya se cerró (fila de totales).
+    La condición guarda su estado entre llamadas y solo recorre las páginas nuevas.
+    """
+    # Cada página se busca por separado: vale porque ningún campo requerido depende de
+    # la sección del cliente, que se activa en una página y sigue en las siguientes
+    if set(CAMPOS_REQUERIDOS) & set(CAMPOS_CLIENTE):
+        raise ValueError("El modo adaptativo no admite campos del cliente en CAMPOS_REQUERIDOS")
+    
+    faltantes = set(CAMPOS_REQUERIDOS)
+    vistas = set()
+    estado = {'en_tabla': False, 'tabla_cerrada': False}
+    
+    def condicion(datos_paginas):
+        for p in sorted(datos_paginas.keys() - vistas):
+            vistas.add(p)
+            lineas = datos_paginas[p]
+            
+            if not estado['tabla_cerrada']:
+                for linea in lineas:
+                    if not estado['en_tabla']:
+                        estado['en_tabla'] = es_encabezado_tabla(linea)
+                    elif es_linea_totales(linea):
+                        estado['tabla_cerrada'] = True
+                        break
+            
+            if faltantes:
+                faltantes.difference_update(MOTOR_GENERALES.extraer(lineas))
+        
+        return estado['tabla_cerrada'] and not faltantes
+    
+    return condicion
+
+def extraer_datos_factura(ruta_pdf, opciones=None):
     """
     Proceso principal de extracción.
+    Args:
+        opciones (dict): Límites de lectura del PDF (opcional):
+            'max_paginas' (int), 'paginas' (lista base 1), 'omitir_figuras' (bool) y
+            'adaptativo' (bool, detiene la lectura al encontrar los datos requeridos) y
+            'backend' (str, backend de texto de extractores_pdf; por defecto 'pdfminer').
     """
-    datos_paginas = extraer_datos_estructurados(ruta_pdf)
+    opciones = opciones or {}
+    condicion_parada = crear_condicion_adaptativa() if opciones.get('adaptativo') else None
+    datos_paginas = extraer_datos_estructurados(
+        ruta_pdf,
+        max_paginas=opciones.get('max_paginas') or 0,
+        paginas=opciones.get('paginas'),
+        omitir_figuras=opciones.get('omitir_figuras', False),
+        condicion_parada=condicion_parada,
+        backend=opciones.get('backend', 'pdfminer'),
+        columnas=True,
+    )
     todas_lineas = []
     for p in sorted(datos_paginas.keys()):
         todas_lineas.extend(datos_paginas[p])
     
     datos = {'datos_generales': {}, 'items': []}
     
-    # --- CONFIGURACIÓN DE LÓGICA DE CLIENTE ---
-    # Campos que son ESPECÍFICOS del cliente y se repiten para el emisor.
-    KEYS_CLIENTE = [
-        'nit_cliente', 'direccion_cliente', 'ciudad', 
-        'telefono_cliente', 'email_cliente', 'cliente_nombre'
-    ]
-    
-    # Palabras clave que indican que hemos llegado a la sección del cliente
-    MARCADORES_CLIENTE = ['señores', 'datos del cliente', 'cliente:', 'adquirente']
-    
-    seccion_cliente_activa = False
-
-    # --- RECORRIDO DE LÍNEAS PARA DATOS GENERALES ---
-    for linea in todas_lineas:
-        linea_lower = linea.lower()
-        
-        # 1. DETECTAR SI ENTRAMOS A LA SECCIÓN DEL CLIENTE
-        # Si la línea contiene "Señores" o "Datos del cliente", activamos la bandera.
-        if not seccion_cliente_activa:
-            if any(m in linea_lower for m in MARCADORES_CLIENTE):
-                seccion_cliente_activa = True
-        
-        # 2. HEADER (Patrones de Cabecera)
-        for key, patron in PATRONES_ENCABEZADO.items():
-            # SI el campo es del cliente y NO estamos en la sección cliente -> SALTAR (Ignora NIT emisor)
-            if key in KEYS_CLIENTE and not seccion_cliente_activa:
-                continue
-                
-            # Si ya tenemos el dato, no lo sobrescribimos (opcional, pero seguro si confiamos en la sección)
-            if key not in datos['datos_generales']:
-                match = patron.search(linea)
-                if match:
-                    if len(match.groups()) > 1:
-                        val = f"{match.group(1)} al {match.group(2)}"
-                    else:
-                        val = match.group(1)
-                    datos['datos_generales'][key] = val.strip()
-        
-        # 3. MONTOS FINANCIEROS
-        for key, patron in PATRONES_MONTO.items():
-            if key not in datos['datos_generales']:
-                match = patron.search(linea)
-                if match:
-                    resto = linea[match.end():]
-                    monto = limpiar_moneda(resto)
-                    datos['datos_generales'][key] = monto
-
-        # 4. INFO PIE DE PÁGINA
-        for key, patron in PATRONES_INFO_PIE.items():
-            if key not in datos['datos_generales']:
-                match = patron.search(linea)
-                if match:
-                    val = match.group(1).strip()
-                    datos['datos_generales'][key] = val
+    # --- DATOS GENERALES (Encabezado, Montos y Pie en una sola pasada) ---
+    with perfilado.etapa(perfilado.ETAPA_ENCABEZADO):
+        ambiguos = []
+        datos['datos_generales'] = MOTOR_GENERALES.extraer(todas_lineas, ambiguos)
+        if ambiguos:
+            datos['montos_ambiguos'] = ambiguos
 
     # --- EXTRACCIÓN DE TABLA DE ÍTEMS ---
-    en_tabla = False
-    for linea in todas_lineas:
-        if not en_tabla:
-            coincidencias = sum(1 for h in ENCABEZADOS_TABLA_ITEMS if h.lower() in linea.lower())
-            if coincidencias >= 2:
-                en_tabla = True
-                continue
-        
-        if en_tabla:
-            if es_linea_totales(linea):
-                en_tabla = False
-                continue 
-            
-            item = parsear_linea_item(linea)
-            if item:
-                datos['items'].append(item)
+    with perfilado.etapa(perfilado.ETAPA_ITEMS):
+        datos['items'] = extraer_items(todas_lineas)
 
+    perfilado.contar('lineas', len(todas_lineas))
     return datos
\ No newline at end of file
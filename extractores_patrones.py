@@ -48,7 +48,82 @@ PATRONES_INFO_PIE = {
     
 }
 
+# --- PALABRAS CLAVE PARA EL PRE-FILTRO DEL MOTOR DE PATRONES ---
+# Para cada campo, literales (en minúscula) de los cuales al menos uno DEBE aparecer
+# en la línea para que su regex pueda coincidir. Si se modifica un patrón, revisar su clave.
+CLAVES_PATRONES = {
+    # Encabezado
+    'numero_factura': ('no.', 'número'),
+    'fecha_expedicion': ('expedici',),
+    'fecha_vencimiento': ('vencimiento',),
+    'periodo_facturacion': ('periodo',),
+    'cufe': ('cufe',),
+    'cliente_nombre': ('señores',),
+    'nit_cliente': ('nit',),
+    'contrato': ('contrato',),
+    'ciudad': ('ciudad',),
+    'direccion_cliente': ('direcci',),
+    'email_cliente': ('email',),
+    'telefono_cliente': ('fono',),
+    # Montos
+    'total_pagar': ('pagar',),
+    'total_facturado': ('facturado',),
+    'anticipo': ('anticipo',),
+    'intereses': ('financieros',),
+    # Pie de página
+    'valor_letras': ('son',),
+    'medio_pago': ('medio',),
+    'banco': ('entidad',),
+    'tipo_cuenta': ('cuenta',),
+    'num_cuenta': ('mero',),
+    'forma_pago': ('forma',),
+    'ipp': ('provisional',),
+    'trm': ('trm',),
+}
+
+# --- LÓGICA DE CLIENTE ---
+# Campos que son ESPECÍFICOS del cliente y se repiten para el emisor.
+CAMPOS_CLIENTE = [
+    'nit_cliente', 'direccion_cliente', 'ciudad',
+    'telefono_cliente', 'email_cliente', 'cliente_nombre'
+]
+
+# Palabras clave que indican que hemos llegado a la sección del cliente
+MARCADORES_CLIENTE = ['señores', 'datos del cliente', 'cliente:', 'adquirente']
+
+# --- MODO ADAPTATIVO ---
+# Campos que deben estar resueltos (junto con el cierre de la tabla de ítems)
+# para dejar de leer páginas.
+CAMPOS_REQUERIDOS = [
+    'numero_factura', 'fecha_expedicion', 'cufe', 'contrato',
+    'total_facturado', 'total_pagar'
+]
+
 # Configuración para detección de tablas
 ENCABEZADOS_TABLA_ITEMS = [
     'Item', 'Concepto', 'Total', 'Descripción', 'Referencia'
-]
\ No newline at end of file
+]
+# Títulos de columna de la tabla de ítems (en minúsculas) -> campo del ítem.
+# Los títulos de dos palabras se buscan antes que los de una.
+COLUMNAS_TABLA_ITEMS = {
+    'item': 'item',
+    'ítem': 'item',
+    'ref': 'referencia',
+    'referencia': 'referencia',
+    'código': 'referencia',
+    'codigo': 'referencia',
+    'concepto': 'concepto',
+    'descripción': 'concepto',
+    'descripcion': 'concepto',
+    'unidad': 'unidad',
+    'und': 'unidad',
+    'cantidad': 'cantidad',
+    'cant': 'cantidad',
+    'tarifa': 'tarifa',
+    'precio': 'tarifa',
+    'valor unitario': 'tarifa',
+    'vr unitario': 'tarifa',
+    'total': 'total',
+    'valor total': 'total',
+    'vr total': 'total',
+}
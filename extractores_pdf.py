@@ -1,13 +1,20 @@
 """
 Módulo para conversión de archivos PDF a CSV.
 Utiliza ordenamiento manual de líneas de texto (LTTextLine) para reconstruir filas.
+El texto con coordenadas se obtiene de un backend intercambiable (ver BACKENDS).
 """
 
 import os
 import csv
 import logging
 from pdfminer.high_level import extract_pages
-from pdfminer.layout import LTTextBox, LTTextLine, LAParams
+from pdfminer.layout import LTTextBox, LTTextLine, LTChar, LTFigure, LAParams
+from pdfminer.converter import PDFLayoutAnalyzer
+from pdfminer.pdfdevice import PDFDevice
+from pdfminer.pdffont import PDFUnicodeNotDefined
+from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+from pdfminer.pdfpage import PDFPage
+import perfilado
 
 logger = logging.getLogger(__name__)
 
@@ -57,62 +64,356 @@ def obtener_lineas_planas(layout_object):
             lineas.extend(obtener_lineas_planas(child))
     return lineas
 
-def extraer_datos_estructurados(ruta_pdf):
+# --- BACKENDS DE TEXTO ---
+# Cada backend entrega, por página, una lista de fragmentos (texto, x0, x1, y0, y1)
+# en coordenadas PDF (origen abajo a la izquierda). La agrupación en filas es común.
+
+# Parámetros del agrupador de caracteres del backend 'rapido' (equivalentes a LAParams)
+MARGEN_CARACTER = 2.0   # Hueco máximo entre caracteres de un mismo fragmento (x ancho)
+MARGEN_PALABRA = 0.1    # Hueco a partir del cual se inserta un espacio (x ancho)
+
+def _numeros_pagina(paginas):
     """
-    Extrae texto agrupando líneas visualmente por su coordenada Y.
+    Normaliza la lista de páginas (base 1) a una lista ordenada sin duplicados.
     """
-    datos_por_pagina = {}
+    if not paginas:
+        return None
+    return sorted({int(p) for p in paginas if int(p) >= 1})
+
+def _seleccion_paginas(paginas, max_paginas):
+    """
+    Páginas a leer (base 1) y el 'maxpages' de pdfminer. El límite se aplica después de
+    la selección, igual en todos los backends: con paginas=[3, 4] y max_paginas=1 se lee
+    la página 3 (pdfminer cuenta 'maxpages' desde el inicio del documento).
+    Returns:
+        tuple: (números de página o None = todas, maxpages para pdfminer; 0 = sin límite).
+    """
+    numeros_pagina = _numeros_pagina(paginas)
+    if numeros_pagina is None:
+        return None, max_paginas or 0
+    if max_paginas:
+        numeros_pagina = numeros_pagina[:max_paginas]
+    return numeros_pagina, numeros_pagina[-1] if numeros_pagina else 0
+
+def iterar_paginas_pdfminer(ruta_pdf, max_paginas=0, paginas=None, omitir_figuras=False):
+    """
+    Backend por defecto: análisis de layout completo de pdfminer (LAParams).
+    """
+    laparams = LAParams(all_texts=not omitir_figuras, boxes_flow=None)
+    numeros_pagina, maxpages = _seleccion_paginas(paginas, max_paginas)
+    if numeros_pagina == []:
+        return
+    page_numbers = [p - 1 for p in numeros_pagina] if numeros_pagina else None
     
-    try:
-        laparams = LAParams(all_texts=True, boxes_flow=None)
+    paginas_layout = extract_pages(ruta_pdf, laparams=laparams, maxpages=maxpages, page_numbers=page_numbers)
+    
+    for i, page_layout in enumerate(paginas_layout):
+        num_pag = numeros_pagina[i] if numeros_pagina else i + 1
+        
+        todas_las_lineas = []
+        for element in page_layout:
+            todas_las_lineas.extend(obtener_lineas_planas(element))
         
-        for i, page_layout in enumerate(extract_pages(ruta_pdf, laparams=laparams)):
-            num_pag = i + 1
+        fragmentos = [(l.get_text().strip(), l.x0, l.x1, l.y0, l.y1) for l in todas_las_lineas]
+        yield num_pag, fragmentos
+
+def _caracteres_planos(layout_object, omitir_figuras):
+    """
+    Recorre un LTPage sin análisis de layout y retorna sus LTChar en orden de contenido.
+    """
+    caracteres = []
+    for child in layout_object:
+        if isinstance(child, LTChar):
+            caracteres.append(child)
+        elif isinstance(child, LTFigure):
+            if not omitir_figuras:
+                caracteres.extend(_caracteres_planos(child, omitir_figuras))
+    return caracteres
+
+def _agrupar_caracteres(caracteres):
+    """
+    Une caracteres consecutivos de la misma línea base en fragmentos de texto.
+    """
+    fragmentos = []
+    texto = []
+    x0 = x1 = y0 = y1 = None
+    anterior = None
+    
+    for c in caracteres:
+        if anterior is not None:
+            alto = min(anterior.height, c.height) or 1.0
+            ancho = max(anterior.width, c.width, alto) or 1.0
+            solape_v = min(anterior.y1, c.y1) - max(anterior.y0, c.y0)
+            hueco = c.x0 - anterior.x1
             
-            # 1. Obtener todas las líneas
-            todas_las_lineas = []
-            for element in page_layout:
-                todas_las_lineas.extend(obtener_lineas_planas(element))
+            if solape_v > alto * 0.5 and -ancho < hueco < ancho * MARGEN_CARACTER:
+                if hueco > ancho * MARGEN_PALABRA and texto and texto[-1] != ' ':
+                    texto.append(' ')
+                texto.append(c.get_text())
+                x0, x1 = min(x0, c.x0), max(x1, c.x1)
+                y0, y1 = min(y0, c.y0), max(y1, c.y1)
+                anterior = c
+                continue
             
-            if not todas_las_lineas:
-                datos_por_pagina[num_pag] = []
+            fragmentos.append(("".join(texto).strip(), x0, x1, y0, y1))
+        
+        texto = [c.get_text()]
+        x0, x1, y0, y1 = c.x0, c.x1, c.y0, c.y1
+        anterior = c
+    
+    if anterior is not None:
+        fragmentos.append(("".join(texto).strip(), x0, x1, y0, y1))
+    return fragmentos
+
+def iterar_paginas_rapido(ruta_pdf, max_paginas=0, paginas=None, omitir_figuras=False):
+    """
+    Backend ligero: usa el intérprete de bajo nivel de pdfminer sin LAParams
+    (sin agrupar cajas ni líneas) y arma los fragmentos uniendo caracteres contiguos.
+    """
+    numeros_pagina, maxpages = _seleccion_paginas(paginas, max_paginas)
+    if numeros_pagina == []:
+        return
+    page_numbers = {p - 1 for p in numeros_pagina} if numeros_pagina else None
+    
+    recursos = PDFResourceManager()
+    dispositivo = _DispositivoPaginas(recursos)
+    interprete = PDFPageInterpreter(recursos, dispositivo)
+    
+    with open(ruta_pdf, 'rb') as archivo:
+        for indice, pagina in enumerate(PDFPage.get_pages(archivo, page_numbers, maxpages=maxpages)):
+            interprete.process_page(pagina)
+            num_pag = numeros_pagina[indice] if numeros_pagina else indice + 1
+            caracteres = _caracteres_planos(dispositivo.pagina, omitir_figuras)
+            yield num_pag, _agrupar_caracteres(caracteres)
+
+class _DispositivoPaginas(PDFLayoutAnalyzer):
+    """
+    Dispositivo de pdfminer que conserva el LTPage crudo (sin análisis de layout).
+    """
+    def __init__(self, recursos):
+        super().__init__(recursos, pageno=1, laparams=None)
+        self.pagina = None
+    
+    def receive_layout(self, ltpage):
+        self.pagina = ltpage
+
+class _DispositivoTexto(PDFDevice):
+    """
+    Dispositivo de pdfminer que solo decodifica el texto de los operadores Tj/TJ,
+    sin calcular posiciones ni crear LTChar.
+    """
+    def __init__(self, recursos):
+        super().__init__(recursos)
+        self.partes = []
+
+    def render_string(self, textstate, seq, ncs, graphicstate):
+        fuente = textstate.font
+        for elemento in seq:
+            if not isinstance(elemento, bytes):
                 continue
+            for cid in fuente.decode(elemento):
+                try:
+                    self.partes.append(fuente.to_unichr(cid))
+                except PDFUnicodeNotDefined:
+                    pass
 
-            # 2. Ordenar por posición vertical
-            todas_las_lineas.sort(key=lambda l: (l.y0 + l.y1) / 2, reverse=True)
-            
-            # 3. Agrupar líneas (Tolerancia ajustada a 4.0 para evitar basura vertical)
-            filas_texto = []
-            if todas_las_lineas:
-                grupo_actual = [todas_las_lineas[0]]
-                y_referencia = (todas_las_lineas[0].y0 + todas_las_lineas[0].y1) / 2
-                tolerancia_y = 4.0 # Más estricto
-                
-                for linea in todas_las_lineas[1:]:
-                    y_centro = (linea.y0 + linea.y1) / 2
-                    
-                    if abs(y_centro - y_referencia) < tolerancia_y:
-                        grupo_actual.append(linea)
-                    else:
-                        # Procesar grupo anterior
-                        grupo_actual.sort(key=lambda l: l.x0)
-                        texto_fila = " ".join([l.get_text().strip() for l in grupo_actual if l.get_text().strip()])
-                        if texto_fila:
-                            filas_texto.append(texto_fila)
-                        
-                        grupo_actual = [linea]
-                        y_referencia = y_centro
-                
-                # Último grupo
-                grupo_actual.sort(key=lambda l: l.x0)
-                texto_fila = " ".join([l.get_text().strip() for l in grupo_actual if l.get_text().strip()])
-                if texto_fila:
-                    filas_texto.append(texto_fila)
-            
-            datos_por_pagina[num_pag] = filas_texto
+def texto_crudo_primera_pagina(documento):
+    """
+    Texto de la página 1 de un PDFDocument ya abierto, sin análisis de layout ni
+    posiciones (caracteres en orden de contenido). Lo usa el triaje previo.
+    """
+    recursos = PDFResourceManager()
+    dispositivo = _DispositivoTexto(recursos)
+    interprete = PDFPageInterpreter(recursos, dispositivo)
+    for pagina in PDFPage.create_pages(documento):
+        interprete.process_page(pagina)
+        break
+    return "".join(dispositivo.partes)
+
+def iterar_paginas_pymupdf(ruta_pdf, max_paginas=0, paginas=None, omitir_figuras=False):
+    """
+    Backend opcional basado en PyMuPDF (si está instalado). Convierte las líneas de
+    'get_text("dict")' a coordenadas PDF. 'omitir_figuras' no aplica.
+    """
+    import fitz
+    
+    numeros_pagina, _ = _seleccion_paginas(paginas, max_paginas)
+    with fitz.open(ruta_pdf) as documento:
+        if numeros_pagina is None:
+            numeros_pagina = list(range(1, documento.page_count + 1))[:max_paginas or None]
+        seleccion = [p for p in numeros_pagina if p <= documento.page_count]
+        
+        for num_pag in seleccion:
+            pagina = documento[num_pag - 1]
+            alto_pagina = pagina.rect.height
+            fragmentos = []
+            for bloque in pagina.get_text("dict").get("blocks", []):
+                for linea in bloque.get("lines", []):
+                    texto = "".join(span.get("text", "") for span in linea.get("spans", [])).strip()
+                    bx0, by0, bx1, by1 = linea["bbox"]
+                    fragmentos.append((texto, bx0, bx1, alto_pagina - by1, alto_pagina - by0))
+            yield num_pag, fragmentos
+
+BACKENDS = {
+    'pdfminer': iterar_paginas_pdfminer,
+    'rapido': iterar_paginas_rapido,
+    'pymupdf': iterar_paginas_pymupdf,
+}
+
+def backends_disponibles():
+    """
+    Retorna los nombres de backend utilizables en este entorno.
+    """
+    disponibles = ['pdfminer', 'rapido']
+    try:
+        import fitz  # noqa: F401
+        disponibles.append('pymupdf')
+    except ImportError:
+        pass
+    return disponibles
+
+# --- AGRUPACIÓN EN FILAS ---
+
+# Tolerancia vertical adaptativa: fracción de la altura típica de fuente de la página
+FACTOR_TOLERANCIA_Y = 0.45
+TOLERANCIA_Y_DEFECTO = 4.0  # Sin alturas utilizables (p. ej. fragmentos degenerados)
+TOLERANCIA_Y_MINIMA = 2.0
+TOLERANCIA_Y_MAXIMA = 8.0
+
+class Fila(str):
+    """
+    Texto de una fila visual que además conserva sus celdas (texto, x0, x1) de
+    izquierda a derecha y su extensión vertical. Al ser un str, el resto del
+    pipeline (patrones, ítems, caché) la trata igual que una línea de texto.
+    """
+    def __new__(cls, texto, celdas=(), y0=0.0, y1=0.0):
+        fila = super().__new__(cls, texto)
+        fila.celdas = celdas
+        fila.y0 = y0
+        fila.y1 = y1
+        return fila
+
+def calcular_tolerancia_y(alturas):
+    """
+    Tolerancia de agrupación a partir de la mediana de altura de los fragmentos.
+    """
+    alturas = sorted(alturas)
+    mediana = alturas[len(alturas) // 2] if alturas else 0
+    if mediana <= 0:
+        return TOLERANCIA_Y_DEFECTO
+    return min(max(mediana * FACTOR_TOLERANCIA_Y, TOLERANCIA_Y_MINIMA), TOLERANCIA_Y_MAXIMA)
+
+def agrupar_filas(fragmentos, columnas=False, tolerancia_y=None):
+    """
+    Agrupa fragmentos (texto, x0, x1, y0, y1) en filas visuales por su coordenada Y
+    y retorna el texto de cada fila, de arriba hacia abajo.
+    Recorriendo los centros verticales de arriba hacia abajo, cada fragmento se une a
+    la fila en curso si está a menos de la tolerancia de su centro medio; el centro se
+    actualiza con cada fragmento, así la fila no deriva en tablas densas.
+    Args:
+        columnas (bool): Retornar objetos Fila (str con sus celdas y coordenadas).
+        tolerancia_y (float): Tolerancia fija; None = adaptativa según la altura de fuente.
+    """
+    if not fragmentos:
+        return []
+    
+    # 1. Centro vertical de cada fragmento (calculado una sola vez)
+    centros = [(f[3] + f[4]) * 0.5 for f in fragmentos]
+    if tolerancia_y is None:
+        tolerancia_y = calcular_tolerancia_y([f[4] - f[3] for f in fragmentos])
+    
+    # 2. Agrupar índices en una pasada sobre los centros ordenados
+    filas = []
+    miembros = None
+    referencia = suma = 0.0
+    for indice in sorted(range(len(centros)), key=centros.__getitem__, reverse=True):
+        centro = centros[indice]
+        if miembros is not None and referencia - centro < tolerancia_y:
+            miembros.append(indice)
+            suma += centro
+            referencia = suma / len(miembros)
+        else:
+            miembros = [indice]
+            referencia = suma = centro
+            filas.append(miembros)
+    
+    # 3. Unir cada fila de izquierda a derecha
+    resultado = []
+    for miembros in filas:
+        if len(miembros) > 1:
+            fila = sorted([fragmentos[i] for i in miembros], key=lambda f: f[1])
+        else:
+            fila = [fragmentos[miembros[0]]]
+        
+        texto_fila = " ".join([f[0] for f in fila if f[0]])
+        if not texto_fila:
+            continue
+        
+        if columnas:
+            celdas = [(f[0], f[1], f[2]) for f in fila if f[0]]
+            y0 = min(f[3] for f in fila)
+            y1 = max(f[4] for f in fila)
+            resultado.append(Fila(texto_fila, celdas, y0, y1))
+        else:
+            resultado.append(texto_fila)
+    
+    return resultado
+
+def extraer_datos_estructurados(ruta_pdf, max_paginas=0, paginas=None, omitir_figuras=False,
+                                condicion_parada=None, backend='pdfminer', columnas=False):
+    """
+    Extrae texto agrupando líneas visualmente por su coordenada Y.
+    Args:
+        max_paginas (int): Máximo de páginas a analizar (0 = todas).
+        paginas (iterable): Números de página (base 1) a analizar; None = todas.
+        omitir_figuras (bool): No analizar el texto dentro de figuras (LTFigure).
+        condicion_parada (callable): Se llama con el dict parcial {página: [líneas]}
+            después de cada página; si retorna True no se leen más páginas.
+        backend (str): Backend de texto (ver BACKENDS).
+        columnas (bool): Las líneas son objetos Fila, con sus celdas y coordenadas.
+    """
+    datos_por_pagina = {}
+    
+    try:
+        iterar_paginas = BACKENDS[backend]
+        
+        paginas_leidas = perfilado.medir_iterador(
+            perfilado.ETAPA_LECTURA, iterar_paginas(ruta_pdf, max_paginas, paginas, omitir_figuras)
+        )
+        for num_pag, fragmentos in paginas_leidas:
+            with perfilado.etapa(perfilado.ETAPA_AGRUPACION):
+                datos_por_pagina[num_pag] = agrupar_filas(fragmentos, columnas)
             
+            if condicion_parada is not None:
+                with perfilado.etapa(perfilado.ETAPA_ADAPTATIVA):
+                    detener = condicion_parada(datos_por_pagina)
+                if detener:
+                    logger.debug(f"Lectura detenida en la página {num_pag}: datos requeridos encontrados")
+                    break
+        
+        perfilado.contar('paginas', len(datos_por_pagina))
         return datos_por_pagina
 
     except Exception as e:
         logger.error(f"Error crítico en extracción visual: {e}")
-        return {}
\ No newline at end of file
+        return {}
+
+def comparar_backends(ruta_pdf, backend_a='pdfminer', backend_b='rapido', **kwargs):
+    """
+    Compara las filas producidas por dos backends sobre el mismo PDF (paridad).
+    Returns:
+        dict: 'identicos' (bool) y 'diferencias': lista de (página, solo_en_a, solo_en_b).
+    """
+    datos_a = extraer_datos_estructurados(ruta_pdf, backend=backend_a, **kwargs)
+    datos_b = extraer_datos_estructurados(ruta_pdf, backend=backend_b, **kwargs)
+    
+    diferencias = []
+    for num_pag in sorted(set(datos_a) | set(datos_b)):
+        filas_a = datos_a.get(num_pag, [])
+        filas_b = datos_b.get(num_pag, [])
+        if filas_a != filas_b:
+            solo_a = [f for f in filas_a if f not in filas_b]
+            solo_b = [f for f in filas_b if f not in filas_a]
+            diferencias.append((num_pag, solo_a, solo_b))
+    
+    return {'identicos': not diferencias, 'diferencias': diferencias}
@@ -0,0 +1,185 @@
+"""
+Módulo de fusión de consolidados por shard.
+Cada máquina de una corrida distribuida (--shard i/N) genera su propio consolidado;
+este módulo los combina en streaming en un único consolidado, leyendo de cada shard
+la salida (xlsx, parquet, csv o jsonl) del mismo formato que se va a escribir.
+"""
+
+import os
+import re
+import csv
+import json
+import logging
+from exportacion import COLUMNAS, crear_exportador_streaming
+from exportacion_columnar import TIPOS_COLUMNAS, TIPO_TEXTO, convertir_valor
+import incremental
+
+logger = logging.getLogger(__name__)
+
+# Consolidado_Gecelca_<fecha>_<hora>[_shard<i>de<N>]
+RE_CONSOLIDADO = re.compile(r'^Consolidado_Gecelca_\d{8}_\d{6}(?:_shard(\d+)de(\d+))?$')
+
+# Orden de preferencia de las fuentes cuando hay varias salidas del mismo consolidado
+PREFERENCIA_FORMATOS = ('parquet', 'csv', 'jsonl', 'xlsx')
+
+def _base_y_formato(ruta):
+    """
+    Retorna (ruta_base, formato) de un archivo de salida de consolidado, o None.
+    """
+    raiz, extension = os.path.splitext(ruta)
+    formato = extension.lower().lstrip('.')
+    if formato == 'xlsx':
+        return raiz, formato
+    if formato in PREFERENCIA_FORMATOS:
+        for clave in COLUMNAS:
+            if raiz.endswith(f"_{clave}"):
+                return raiz[:-len(clave) - 1], formato
+    return None
+
+def _formatos_completos(ruta_base, formatos):
+    """Formatos para los que existen todos los archivos del consolidado."""
+    completos = set()
+    for formato in formatos:
+        if formato == 'xlsx':
+            completos.add(formato)
+        elif all(os.path.exists(f"{ruta_base}_{clave}.{formato}") for clave in COLUMNAS):
+            completos.add(formato)
+    return completos
+
+def localizar_consolidados(entradas):
+    """
+    Resuelve las entradas (archivos de salida o directorios de salida de cada shard)
+    a los consolidados que contienen. En un directorio se toma el consolidado más
+    reciente de cada shard.
+    Returns:
+        list: [(ruta_base, formatos completos)] ordenada por ruta.
+    """
+    bases = {}
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            recientes = {}
+            for nombre in sorted(os.listdir(entrada)):
+                base_formato = _base_y_formato(os.path.join(entrada, nombre))
+                if base_formato is None:
+                    continue
+                coincidencia = RE_CONSOLIDADO.match(os.path.basename(base_formato[0]))
+                if coincidencia is None:
+                    continue
+                # El nombre empieza con la fecha: el mayor es el más reciente
+                shard = coincidencia.groups()
+                if shard not in recientes or base_formato[0] > recientes[shard][0]:
+                    recientes[shard] = (base_formato[0], set())
+                if recientes[shard][0] == base_formato[0]:
+                    recientes[shard][1].add(base_formato[1])
+            for ruta_base, encontrados in recientes.values():
+                bases.setdefault(ruta_base, set()).update(encontrados)
+        else:
+            base_formato = _base_y_formato(entrada)
+            if base_formato is None or not os.path.exists(entrada):
+                logger.warning(f"Se ignora {entrada}: no es una salida de consolidado")
+                continue
+            bases.setdefault(base_formato[0], set()).add(base_formato[1])
+
+    consolidados = []
+    for ruta_base in sorted(bases):
+        completos = _formatos_completos(ruta_base, bases[ruta_base])
+        if not completos:
+            logger.warning(f"Se ignora {ruta_base}: faltan archivos de algún dataset")
+            continue
+        consolidados.append((ruta_base, completos))
+    return consolidados
+
+def elegir_formato(completos, formato_salida):
+    """
+    Formato de lectura de un consolidado: el mismo que se va a escribir si existe
+    (la copia es exacta), si no el primero según PREFERENCIA_FORMATOS.
+    """
+    if formato_salida in completos:
+        return formato_salida
+    return next(f for f in PREFERENCIA_FORMATOS if f in completos)
+
+def verificar_shards(consolidados):
+    """
+    Advierte si las fuentes son shards de corridas distintas o si falta alguno.
+    """
+    shards = set()
+    for ruta_base, _ in consolidados:
+        coincidencia = RE_CONSOLIDADO.match(os.path.basename(ruta_base))
+        if coincidencia and coincidencia.group(1):
+            shards.add((int(coincidencia.group(1)), int(coincidencia.group(2))))
+    totales = {total for _, total in shards}
+    if len(totales) > 1:
+        logger.warning(f"Se fusionan shards de particiones distintas: {sorted(shards)}")
+    elif totales:
+        total = totales.pop()
+        faltantes = sorted(set(range(1, total + 1)) - {indice for indice, _ in shards})
+        if faltantes:
+            logger.warning(f"Faltan los shards {', '.join(f'{i}/{total}' for i in faltantes)}")
+
+def _tipar(clave, registro):
+    """Tupla en el orden de COLUMNAS[clave] a partir de un dict leído de CSV/JSONL."""
+    tipos = TIPOS_COLUMNAS.get(clave, {})
+    return tuple(convertir_valor(registro.get(c), tipos.get(c, TIPO_TEXTO)) for c in COLUMNAS[clave])
+
+def leer_dataset(ruta_base, formato, clave):
+    """
+    Genera las filas de un dataset de un consolidado como tuplas en el orden de
+    COLUMNAS[clave] (las columnas que no existan quedan en None).
+    """
+    if formato == 'xlsx':
+        from openpyxl import load_workbook
+        workbook = load_workbook(f"{ruta_base}.xlsx", read_only=True)
+        try:
+            yield from incremental.leer_hoja(workbook, clave)
+        finally:
+            workbook.close()
+        return
+
+    ruta = f"{ruta_base}_{clave}.{formato}"
+    if formato == 'parquet':
+        import pyarrow.parquet as pq
+        archivo = pq.ParquetFile(ruta)
+        for lote in archivo.iter_batches():
+            for registro in lote.to_pylist():
+                yield tuple(registro.get(c) for c in COLUMNAS[clave])
+    elif formato == 'csv':
+        with open(ruta, 'r', encoding='utf-8', newline='') as f:
+            for registro in csv.DictReader(f):
+                yield _tipar(clave, registro)
+    elif formato == 'jsonl':
+        with open(ruta, 'r', encoding='utf-8') as f:
+            for linea in f:
+                if linea.strip():
+                    yield _tipar(clave, json.loads(linea))
+
+def fusionar_consolidados(entradas, ruta_base, formatos=('xlsx',)):
+    """
+    Combina en streaming los consolidados de las entradas en uno solo.
+    Cada formato de salida se escribe en su propia pasada, leyendo de cada shard
+    la salida del mismo formato cuando existe.
+    Returns:
+        list: Rutas generadas ([] si no hay nada que fusionar).
+    """
+    consolidados = localizar_consolidados(entradas)
+    if not consolidados:
+        logger.error("No se encontraron consolidados para fusionar")
+        return []
+    verificar_shards(consolidados)
+
+    rutas = []
+    for formato_salida in formatos:
+        exportador = crear_exportador_streaming((formato_salida,), ruta_base)
+        facturas = 0
+        for origen, completos in consolidados:
+            formato = elegir_formato(completos, formato_salida)
+            logger.info(f"Fusionando {os.path.basename(origen)} ({formato} -> {formato_salida})")
+            for clave in COLUMNAS:
+                for fila in leer_dataset(origen, formato, clave):
+                    exportador.escribir_fila(clave, fila)
+                    if clave == 'generales':
+                        facturas += 1
+        generadas = exportador.cerrar()
+        rutas.extend(generadas if isinstance(generadas, list) else [generadas])
+
+    logger.info(f"Fusión de {len(consolidados)} consolidados ({facturas} facturas): {', '.join(rutas)}")
+    return rutas
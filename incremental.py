@@ -0,0 +1,177 @@
+"""
+Módulo de consolidación incremental.
+Mantiene un manifiesto de los PDFs ya consolidados (nombre, tamaño, mtime y hash)
+para procesar únicamente los archivos nuevos o modificados y copiar en streaming
+las filas vigentes del consolidado anterior.
+"""
+
+import os
+import json
+import logging
+from exportacion import HOJAS, COLUMNAS
+from utils import calcular_hash_archivo
+
+logger = logging.getLogger(__name__)
+
+NOMBRE_MANIFIESTO = "manifiesto_consolidado.json"
+
+def firmar_archivo(ruta):
+    """
+    Retorna la firma (tamaño, mtime, hash) de un archivo para el manifiesto.
+    """
+    st = os.stat(ruta)
+    return {'tamano': st.st_size, 'mtime': st.st_mtime, 'hash': calcular_hash_archivo(ruta)}
+
+class Manifiesto:
+    def __init__(self, ruta):
+        """
+        Inicializa un manifiesto vacío asociado a la ruta indicada.
+        """
+        self.ruta = ruta
+        self.archivos = {}
+        self.consolidado = None
+
+    @classmethod
+    def cargar(cls, ruta):
+        """
+        Lee el manifiesto desde disco; si no existe o está corrupto retorna uno vacío.
+        """
+        manifiesto = cls(ruta)
+        if not os.path.exists(ruta):
+            return manifiesto
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                contenido = json.load(f)
+            manifiesto.archivos = contenido.get('archivos', {})
+            manifiesto.consolidado = contenido.get('consolidado')
+        except (OSError, ValueError) as e:
+            logger.warning(f"Manifiesto ilegible ({ruta}), se hará una consolidación completa: {e}")
+        return manifiesto
+
+    def guardar(self):
+        """
+        Escribe el manifiesto de forma atómica.
+        """
+        ruta_tmp = f"{self.ruta}.tmp"
+        with open(ruta_tmp, 'w', encoding='utf-8') as f:
+            json.dump({'consolidado': self.consolidado, 'archivos': self.archivos}, f, ensure_ascii=False, indent=1)
+        os.replace(ruta_tmp, self.ruta)
+
+    def consolidado_disponible(self):
+        return bool(self.consolidado) and os.path.exists(self.consolidado)
+
+    def clasificar(self, directorio, archivos):
+        """
+        Separa los archivos en pendientes (nuevos o modificados) y sin cambios.
+        El hash solo se calcula cuando tamaño o mtime no coinciden con el manifiesto.
+        Returns:
+            tuple: (pendientes, sin_cambios, firmas) donde firmas mapea nombre -> dict.
+        """
+        pendientes = []
+        sin_cambios = []
+        firmas = {}
+
+        # 'archivos' puede ser un iterador perezoso (escaneo.iterar_pdfs)
+        for archivo in archivos:
+            ruta = os.path.join(directorio, archivo)
+            st = os.stat(ruta)
+            previo = self.archivos.get(archivo)
+
+            if previo and previo.get('tamano') == st.st_size and previo.get('mtime') == st.st_mtime:
+                sin_cambios.append(archivo)
+                continue
+
+            firmas[archivo] = firmar_archivo(ruta)
+
+            if previo and previo.get('hash') == firmas[archivo]['hash']:
+                # Solo cambió la fecha: se actualiza la firma sin reprocesar
+                self.archivos[archivo] = firmas[archivo]
+                sin_cambios.append(archivo)
+            else:
+                pendientes.append(archivo)
+
+        return pendientes, sin_cambios, firmas
+
+    def registrar(self, archivo, firma):
+        self.archivos[archivo] = firma
+
+def leer_hoja(workbook, clave):
+    """
+    Genera las filas de una hoja del consolidado anterior como tuplas en el orden
+    actual de COLUMNAS[clave] (las columnas que no existan quedan en None).
+    """
+    nombre_hoja = HOJAS[clave]
+    if nombre_hoja not in workbook.sheetnames:
+        return
+    filas = workbook[nombre_hoja].iter_rows(values_only=True)
+    encabezado = next(filas, None)
+    if not encabezado:
+        return
+    posiciones = {nombre: i for i, nombre in enumerate(encabezado)}
+    indices = [posiciones.get(columna) for columna in COLUMNAS[clave]]
+    for fila in filas:
+        if fila is None or all(v is None for v in fila):
+            continue
+        yield tuple(fila[i] if i is not None and i < len(fila) else None for i in indices)
+
+def _texto(valor):
+    return '' if valor is None else str(valor)
+
+def copiar_consolidado_anterior(ruta_anterior, exportador, archivos_reemplazados):
+    """
+    Copia en streaming las filas del consolidado anterior al exportador, descartando
+    las que pertenecen a archivos que se van a reprocesar (por 'Nombre Archivo': dos
+    PDFs distintos pueden traer el mismo número de factura).
+    Returns:
+        int: Número de facturas conservadas del consolidado anterior.
+    """
+    # Las filas guardan la ruta relativa a la entrada, igual que el manifiesto
+    reemplazados = set(archivos_reemplazados)
+    # 'Nombre Archivo' se guarda siempre con extensión '.pdf' en minúscula
+    nombres_generales = {f"{os.path.splitext(a)[0]}.pdf" for a in reemplazados}
+
+    idx_gen_nombre = COLUMNAS['generales'].index('Nombre Archivo')
+    idx_gen_factura = COLUMNAS['generales'].index('No. Factura')
+    idx_gen_contrato = COLUMNAS['generales'].index('No. Contrato')
+    idx_log_archivo = COLUMNAS['validacion'].index('Archivo')
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(ruta_anterior, read_only=True)
+    try:
+        # 1. Llaves (factura, contrato) de los archivos reprocesados, según la hoja general;
+        #    solo para las filas de consolidados anteriores a 'Nombre Archivo' en cada hoja
+        llaves_reemplazadas = set()
+        if nombres_generales:
+            for fila in leer_hoja(workbook, 'generales'):
+                if fila[idx_gen_nombre] in nombres_generales:
+                    llaves_reemplazadas.add((_texto(fila[idx_gen_factura]), _texto(fila[idx_gen_contrato])))
+
+        # 2. Copiar las hojas de datos
+        conservadas = 0
+        for fila in leer_hoja(workbook, 'generales'):
+            if fila[idx_gen_nombre] not in nombres_generales:
+                exportador.escribir_fila('generales', fila)
+                conservadas += 1
+
+        for clave in ('conceptos', 'comparacion'):
+            idx_nombre = COLUMNAS[clave].index('Nombre Archivo')
+            idx_factura = COLUMNAS[clave].index('No. Factura')
+            idx_contrato = COLUMNAS[clave].index('No. Contrato')
+            for fila in leer_hoja(workbook, clave):
+                if fila[idx_nombre]:
+                    reemplazada = fila[idx_nombre] in nombres_generales
+                else:
+                    reemplazada = (_texto(fila[idx_factura]), _texto(fila[idx_contrato])) in llaves_reemplazadas
+                if not reemplazada:
+                    exportador.escribir_fila(clave, fila)
+
+        # 3. Log de proceso: se descartan las entradas de los archivos reprocesados
+        for fila in leer_hoja(workbook, 'validacion'):
+            if fila[idx_log_archivo] not in reemplazados:
+                exportador.escribir_fila('validacion', fila)
+    finally:
+        workbook.close()
+
+    logger.info(f"Incremental: {conservadas} facturas conservadas del consolidado anterior")
+    return conservadas
@@ -0,0 +1,148 @@
+"""
+Índice persistente de facturas ya procesadas, para detectar duplicados entre lotes.
+Una tabla SQLite con una fila por PDF: hash del contenido, ruta, CUFE y
+(No. Factura, No. Contrato). Se consulta antes de extraer (por hash, la copia
+exacta de un PDF conocido no se vuelve a leer) y después de extraer (por CUFE o
+número, el mismo documento con otro contenido binario). Cada consulta es una
+búsqueda en un índice B-tree: el costo no depende de cuántas facturas haya y el
+índice nunca se carga en memoria.
+Una ruta nunca es duplicado de sí misma: reprocesar el mismo archivo lo actualiza.
+"""
+
+import time
+import sqlite3
+import logging
+from exportacion import COLUMNAS
+
+logger = logging.getLogger(__name__)
+
+VERSION_ESQUEMA = 1
+OPERACIONES_POR_TRANSACCION = 500
+
+_POSICIONES_LLAVES = [COLUMNAS['generales'].index(c) for c in ('CUFE', 'No. Factura', 'No. Contrato')]
+
+def llaves_factura(fila_general):
+    """
+    (CUFE, No. Factura, No. Contrato) de una fila de 'generales' (registro o tupla
+    en el orden de COLUMNAS), como texto sin espacios ('' si falta).
+    """
+    return tuple('' if fila_general[i] is None else str(fila_general[i]).strip() for i in _POSICIONES_LLAVES)
+
+class IndiceDuplicados:
+    """
+    Las escrituras se confirman en una sola transacción cada
+    'operaciones_por_transaccion' registros (o al llamar vaciar / cerrar).
+    """
+    def __init__(self, ruta, operaciones_por_transaccion=OPERACIONES_POR_TRANSACCION):
+        self.ruta = ruta
+        self.operaciones_por_transaccion = max(1, int(operaciones_por_transaccion))
+        self.pendientes = 0
+        self.conexion = sqlite3.connect(ruta)
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.execute("PRAGMA synchronous=NORMAL")
+        self._crear_esquema()
+
+    def _crear_esquema(self):
+        version = self.conexion.execute("PRAGMA user_version").fetchone()[0]
+        if version > VERSION_ESQUEMA:
+            raise ValueError(f"{self.ruta} usa un esquema más nuevo ({version}) que este programa ({VERSION_ESQUEMA})")
+        with self.conexion:
+            self.conexion.execute(
+                "CREATE TABLE IF NOT EXISTS pdfs_indexados ("
+                "hash_pdf TEXT PRIMARY KEY, ruta TEXT NOT NULL, cufe TEXT, "
+                "no_factura TEXT, no_contrato TEXT, registrado TEXT NOT NULL)"
+            )
+            self.conexion.execute("CREATE INDEX IF NOT EXISTS idx_pdfs_indexados_cufe ON pdfs_indexados (cufe)")
+            self.conexion.execute(
+                "CREATE INDEX IF NOT EXISTS idx_pdfs_indexados_factura ON pdfs_indexados (no_factura, no_contrato)"
+            )
+            self.conexion.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
+
+    # --- CONSULTA ---
+
+    def reservar(self, hash_pdf, ruta):
+        """
+        Consulta previa a la extracción. Si el contenido ya está registrado con otra
+        ruta retorna esa ruta (duplicado); si no, lo registra a nombre de 'ruta' (sin
+        CUFE todavía) para que las copias siguientes del mismo lote también se detecten.
+        """
+        fila = self.conexion.execute("SELECT ruta FROM pdfs_indexados WHERE hash_pdf = ?", (hash_pdf,)).fetchone()
+        if fila is not None:
+            return fila[0] if fila[0] != ruta else None
+        self.conexion.execute(
+            "INSERT INTO pdfs_indexados (hash_pdf, ruta, registrado) VALUES (?, ?, ?)",
+            (hash_pdf, ruta, time.strftime("%Y-%m-%d %H:%M:%S")),
+        )
+        self._contar()
+        return None
+
+    def buscar_factura(self, ruta, cufe=None, no_factura=None, no_contrato=None):
+        """
+        Consulta posterior a la extracción: otra ruta ya registrada con la misma CUFE
+        o el mismo (No. Factura, No. Contrato).
+        Returns:
+            tuple: (ruta original, llave que coincidió) o None.
+        """
+        if cufe:
+            fila = self.conexion.execute(
+                "SELECT ruta FROM pdfs_indexados WHERE cufe = ? AND ruta <> ? LIMIT 1", (cufe, ruta)
+            ).fetchone()
+            if fila is not None:
+                return fila[0], 'CUFE'
+        if no_factura:
+            fila = self.conexion.execute(
+                "SELECT ruta FROM pdfs_indexados WHERE no_factura = ? AND no_contrato IS ? AND ruta <> ? LIMIT 1",
+                (no_factura, no_contrato or None, ruta),
+            ).fetchone()
+            if fila is not None:
+                return fila[0], 'No. Factura'
+        return None
+
+    def contar(self):
+        return self.conexion.execute("SELECT COUNT(*) FROM pdfs_indexados").fetchone()[0]
+
+    # --- ESCRITURA ---
+
+    def registrar(self, hash_pdf, ruta, cufe=None, no_factura=None, no_contrato=None):
+        """
+        Registra (o actualiza) una factura extraída. Si el hash ya pertenece a otra
+        ruta se conserva la original.
+        """
+        self.conexion.execute(
+            "INSERT INTO pdfs_indexados (hash_pdf, ruta, cufe, no_factura, no_contrato, registrado) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (hash_pdf) DO UPDATE SET cufe = excluded.cufe, no_factura = excluded.no_factura, "
+            "no_contrato = excluded.no_contrato, registrado = excluded.registrado "
+            "WHERE pdfs_indexados.ruta = excluded.ruta",
+            (hash_pdf, ruta, cufe or None, no_factura or None, no_contrato or None,
+             time.strftime("%Y-%m-%d %H:%M:%S")),
+        )
+        self._contar()
+
+    def liberar(self, hash_pdf, ruta):
+        """
+        Quita la reserva de un PDF que no se pudo extraer (sus copias no deben
+        descartarse como duplicados de un archivo sin datos).
+        """
+        self.conexion.execute(
+            "DELETE FROM pdfs_indexados WHERE hash_pdf = ? AND ruta = ? AND cufe IS NULL AND no_factura IS NULL",
+            (hash_pdf, ruta),
+        )
+        self._contar()
+
+    def _contar(self):
+        self.pendientes += 1
+        if self.pendientes >= self.operaciones_por_transaccion:
+            self.vaciar()
+
+    def vaciar(self):
+        """Confirma las escrituras pendientes."""
+        self.conexion.commit()
+        self.pendientes = 0
+
+    def cerrar(self):
+        try:
+            self.vaciar()
+        finally:
+            self.conexion.close()
+        return self.ruta
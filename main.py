@@ -7,14 +7,23 @@ Genera un archivo consolidado (Append) con la información de todos los PDFs pro
 
 import os
 import argparse
+import itertools
 import logging
 import time
 
 # Importar módulos del proyecto
+# (servicio y api se importan solo en su modo; pandas y openpyxl, solo al exportar xlsx/parquet)
 import extractores_pdf
 import extractores
 import procesamiento
 import exportacion
+import ejecucion
+import cache_extraccion
+import incremental
+import escaneo
+import diario
+import perfilado
+import triaje
 import utils
 
 # Configuración de logging
@@ -29,11 +38,25 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-def procesar_pdf_a_datos(ruta_pdf):
+def normalizar_nombre(ruta):
+    """
+    Nombre con que se anota un PDF en 'Nombre Archivo': la ruta (relativa) con '/'
+    y la extensión '.pdf' en minúscula. Ej: 'a/F1.PDF' -> 'a/F1.pdf'
+    """
+    return f"{os.path.splitext(ruta.replace(os.sep, '/'))[0]}.pdf"
+
+def procesar_pdf_a_datos(ruta_pdf, cache=None, opciones=None, perfil=False, hash_pdf=None, nombre_archivo=None):
     """
     Ejecuta el pipeline de extracción para un solo PDF y retorna los datos estructurados
     (sin exportar a Excel todavía).
+    Si se recibe una CacheExtraccion, un PDF ya conocido no vuelve a pasar por pdfminer.
+    'opciones' limita la lectura del PDF (ver extractores.extraer_datos_factura).
+    Con perfil=True los datos incluyen 'perfil': tiempos por etapa y conteos (ver perfilado).
+    'hash_pdf' evita releer el archivo si el hash ya se calculó (p. ej. en el triaje).
+    'nombre_archivo' es el nombre que se anota en las filas (en un directorio, la ruta
+    relativa a la entrada); por defecto, el nombre del PDF.
     """
+    registro = perfilado.iniciar() if perfil else None
     try:
         nombre_base = utils.obtener_nombre_archivo_sin_extension(ruta_pdf)
         logger.info(f"--- Leyendo: {nombre_base} ---")
@@ -41,27 +64,329 @@ def procesar_pdf_a_datos(ruta_pdf):
         # 1. Reconstrucción Visual (PDF -> CSV interno)
         # extractores_pdf.convertir_pdf_a_csv(ruta_pdf) # Descomentar si se quiere depurar el CSV
         
-        # 2. Extracción de Datos Crudos
-        datos_crudos = extractores.extraer_datos_factura(ruta_pdf)
+        # 2. Extracción de Datos Crudos (con caché por contenido)
+        hash_pdf = hash_pdf or utils.calcular_hash_archivo(ruta_pdf)
+        datos_crudos = None
+        if cache is not None:
+            llave = cache_extraccion.calcular_llave(hash_pdf, opciones)
+            datos_crudos = cache.obtener(llave)
+            if datos_crudos is not None:
+                logger.info(f"Caché: reutilizando extracción de {nombre_base}")
+                perfilado.contar('cache')
+        
+        if datos_crudos is None:
+            datos_crudos = extractores.extraer_datos_factura(ruta_pdf, opciones)
+            if cache is not None and (datos_crudos.get('datos_generales') or datos_crudos.get('items')):
+                cache.guardar(llave, datos_crudos)
+        perfilado.contar('items', len(datos_crudos.get('items', [])))
         
         # Inyectar nombre de archivo
         if 'datos_generales' not in datos_crudos:
             datos_crudos['datos_generales'] = {}
-        datos_crudos['datos_generales']['nombre_archivo'] = f"{nombre_base}.pdf"
+        datos_crudos['datos_generales']['nombre_archivo'] = normalizar_nombre(nombre_archivo or os.path.basename(ruta_pdf))
         
         # 3. Procesamiento y Estructuración
-        processor = procesamiento.FacturaProcessor(datos_crudos)
-        datos_finales = processor.obtener_datos_procesados()
+        with perfilado.etapa(perfilado.ETAPA_PROCESAMIENTO):
+            processor = procesamiento.FacturaProcessor(datos_crudos)
+            datos_finales = processor.obtener_datos_procesados()
+        datos_finales['hash_pdf'] = hash_pdf
+        
+        if registro is not None:
+            datos_finales['perfil'] = registro.cerrar()
         
         return datos_finales
 
     except Exception as e:
         logger.error(f"Error crítico en {ruta_pdf}: {e}", exc_info=True)
         return None
+    
+    finally:
+        if registro is not None:
+            perfilado.finalizar()
+
+def procesar_pdf_con_triaje(ruta_pdf, cache=None, opciones=None, perfil=False, hash_pdf=None, nombre_archivo=None,
+                            duplicado_de=None, clasificar=True):
+    """
+    Triaje previo (ver triaje.py): solo las facturas pasan a procesar_pdf_a_datos.
+    Para los demás PDFs retorna {'triaje': ResultadoTriaje} sin leer el layout.
+    'duplicado_de' es el archivo con el mismo hash ya visto (en el lote o en el índice
+    de duplicados). Con clasificar=False solo se descartan los duplicados.
+    """
+    if duplicado_de:
+        return {'triaje': triaje.duplicado(duplicado_de)}
+    if not clasificar:
+        return procesar_pdf_a_datos(ruta_pdf, cache, opciones, perfil, hash_pdf, nombre_archivo)
+    resultado = triaje.clasificar(ruta_pdf)
+    if resultado.clase != triaje.CLASE_FACTURA:
+        logger.info(f"Triaje: {os.path.basename(ruta_pdf)} -> {resultado.clase} ({resultado.motivo})")
+        return {'triaje': resultado}
+    return procesar_pdf_a_datos(ruta_pdf, cache, opciones, perfil, hash_pdf, nombre_archivo)
+
+def registrar_en_indice(indice, ruta_pdf, datos):
+    """
+    Consulta posterior a la extracción: si la factura ya está en el índice con otra
+    ruta (misma CUFE o No. Factura) retorna el ResultadoTriaje DUPLICADO; si no, la
+    registra y retorna None.
+    """
+    import indice_duplicados
+    if not datos.get('generales'):
+        return None
+    cufe, no_factura, no_contrato = indice_duplicados.llaves_factura(datos['generales'][0])
+    coincidencia = indice.buscar_factura(ruta_pdf, cufe, no_factura, no_contrato)
+    if coincidencia is not None:
+        original, llave = coincidencia
+        return triaje.ResultadoTriaje(triaje.CLASE_DUPLICADO, f"Misma {llave} que {original}")
+    if datos.get('hash_pdf'):
+        indice.registrar(datos['hash_pdf'], ruta_pdf, cufe, no_factura, no_contrato)
+    return None
+
+def crear_cache(directorio_salida, usar_cache=True, directorio_cache=None, tamano_maximo_mb=None):
+    """
+    Crea y prepara la caché de extracción (o None si está deshabilitada).
+    """
+    if not usar_cache:
+        return None
+    
+    if not directorio_cache:
+        directorio_cache = os.path.join(directorio_salida, ".cache_extraccion")
+    
+    tamano_maximo = cache_extraccion.TAMANO_MAXIMO_DEFECTO
+    if tamano_maximo_mb:
+        tamano_maximo = int(tamano_maximo_mb * 1024 * 1024)
+    
+    try:
+        cache = cache_extraccion.CacheExtraccion(directorio_cache, tamano_maximo)
+        cache.preparar()
+        return cache
+    except OSError as e:
+        logger.warning(f"Caché deshabilitada, no se pudo preparar {directorio_cache}: {e}")
+        return None
+
+def crear_entrada_log(archivo, validacion):
+    """
+    Construye la fila del Log_Proceso a partir del resumen de validación de una factura.
+    """
+    return {
+        'Fecha Proceso': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'Archivo': archivo,
+        'No. Factura': validacion.get('factura', 'N/A'),
+        'Es Válida': "SÍ" if validacion.get('es_valida') else "NO",
+        'Errores': "; ".join(validacion.get('errores', [])) if validacion.get('errores') else "Ninguno"
+    }
+
+def construir_filas(archivo, estado, datos):
+    """
+    Filas a exportar para el resultado de un PDF: sus datasets y la entrada del
+    Log_Proceso, o solo una fila 'ERROR CRÍTICO' si el PDF no se pudo procesar.
+    'hash_pdf' (si se conoce) es la llave del almacén SQLite; los exportadores lo ignoran.
+    Un PDF descartado por el triaje solo deja su entrada OMITIDO en el Log_Proceso.
+    """
+    if estado == ejecucion.ESTADO_OK and datos and 'triaje' in datos:
+        return {'validacion': [{
+            'Fecha Proceso': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'Archivo': archivo,
+            'Es Válida': "OMITIDO",
+            'Errores': f"Triaje {datos['triaje'].clase}: {datos['triaje'].motivo}"
+        }]}
+    
+    if estado == ejecucion.ESTADO_OK and datos:
+        return {
+            'conceptos': datos['conceptos'],
+            'generales': datos['generales'],
+            'comparacion': datos['comparacion'],
+            'validacion': [crear_entrada_log(archivo, datos['validacion'])],
+            'hash_pdf': datos.get('hash_pdf'),
+        }
+    
+    detalle = "Fallo en lectura del archivo"
+    if estado != ejecucion.ESTADO_OK:
+        detalle = f"{detalle} ({estado}: {datos})"
+    return {'validacion': [{
+        'Fecha Proceso': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'Archivo': archivo,
+        # CAIDA / TIMEOUT / MEMORIA: el trabajador murió o el PDF superó un límite del pool
+        'Es Válida': estado if estado in ejecucion.ESTADOS_POOL else "ERROR CRÍTICO",
+        'Errores': detalle
+    }]}
+
+def abrir_almacen(ruta):
+    """
+    Abre (o crea) el almacén SQLite de resultados; None si no se puede abrir.
+    """
+    import almacen_resultados
+    try:
+        return almacen_resultados.AlmacenResultados(ruta)
+    except Exception as e:
+        logger.error(f"No se pudo abrir el almacén SQLite {ruta}: {e}")
+        return None
+
+def cerrar_almacen(almacen):
+    if almacen is None:
+        return
+    try:
+        ruta = almacen.cerrar()
+        logger.info(f"Almacén SQLite actualizado ({almacen.facturas_guardadas} facturas): {ruta}")
+    except Exception as e:
+        logger.error(f"Error al cerrar el almacén SQLite: {e}")
+
+def abrir_indice(ruta):
+    """
+    Abre (o crea) el índice de duplicados entre lotes; None si no se puede abrir.
+    """
+    import indice_duplicados
+    try:
+        return indice_duplicados.IndiceDuplicados(ruta)
+    except Exception as e:
+        logger.error(f"No se pudo abrir el índice de duplicados {ruta}: {e}")
+        return None
+
+def cerrar_indice(indice):
+    if indice is None:
+        return
+    try:
+        total = indice.contar()
+        ruta = indice.cerrar()
+        logger.info(f"Índice de duplicados actualizado ({total} PDFs): {ruta}")
+    except Exception as e:
+        logger.error(f"Error al cerrar el índice de duplicados: {e}")
+
+def exportar_desde_almacen(ruta_bd, directorio_salida=None, formatos=('xlsx',), filtros=None):
+    """
+    Genera el consolidado a partir de una consulta al almacén SQLite, sin releer PDFs.
+    """
+    if not os.path.exists(ruta_bd):
+        logger.error(f"La base SQLite no existe: {ruta_bd}")
+        return
+    if not directorio_salida:
+        directorio_salida = os.path.dirname(os.path.abspath(ruta_bd))
+    utils.crear_directorio_si_no_existe(directorio_salida)
+    
+    almacen = abrir_almacen(ruta_bd)
+    if almacen is None:
+        return
+    filtros = {k: v for k, v in (filtros or {}).items() if v}
+    try:
+        facturas = almacen.contar_facturas(**filtros)
+        if facturas == 0:
+            logger.warning(f"Ninguna factura cumple la consulta {filtros or '(sin filtros)'}")
+            return
+        ruta_base = os.path.join(directorio_salida, f"Consulta_Gecelca_{time.strftime('%Y%m%d_%H%M%S')}")
+        rutas = almacen.exportar_consulta(formatos, ruta_base, **filtros)
+        logger.info(f"Consulta {filtros or '(sin filtros)'}: {facturas} facturas -> {', '.join(rutas)}")
+    except ValueError as e:
+        logger.error(str(e))
+    finally:
+        almacen.cerrar()
+
+def fusionar_shards(entradas, directorio_salida=None, formatos=('xlsx',)):
+    """
+    Combina los consolidados de varios shards (--shard i/N) en uno solo.
+    """
+    import fusion
+    faltantes = [e for e in entradas if not os.path.exists(e)]
+    if faltantes:
+        logger.error(f"No existen: {', '.join(faltantes)}")
+        return []
+    if not directorio_salida:
+        primera = os.path.abspath(entradas[0])
+        directorio_salida = primera if os.path.isdir(primera) else os.path.dirname(primera)
+    utils.crear_directorio_si_no_existe(directorio_salida)
+    
+    ruta_base = os.path.join(directorio_salida, f"Consolidado_Gecelca_{time.strftime('%Y%m%d_%H%M%S')}_fusion")
+    return fusion.fusionar_consolidados(entradas, ruta_base, formatos)
 
-def procesar_directorio_consolidado(directorio_entrada, directorio_salida=None):
+def elegir_fuente_comparacion(rutas):
+    """
+    De las salidas de un consolidado, la más rápida de leer con la hoja de comparación.
+    """
+    for sufijo in ('_comparacion.parquet', '_comparacion.csv', '_comparacion.jsonl', '.xlsx'):
+        for ruta in rutas:
+            if ruta.endswith(sufijo):
+                return ruta
+    return None
+
+def conciliar_con_data_lake(fuente, ruta_extracto, directorio_salida=None, formatos=('xlsx',),
+                            tolerancia_absoluta=None, tolerancia_relativa=None):
+    """
+    Concilia las filas de comparación de 'fuente' contra el extracto del Data Lake
+    y escribe Conciliacion_<fecha> con el detalle y los resúmenes de discrepancias.
+    """
+    import conciliacion
+    
+    if not os.path.exists(ruta_extracto):
+        logger.error(f"El extracto del Data Lake no existe: {ruta_extracto}")
+        return
+    if not directorio_salida:
+        directorio_salida = os.path.dirname(os.path.abspath(fuente))
+    utils.crear_directorio_si_no_existe(directorio_salida)
+    
+    ruta_base = os.path.join(directorio_salida, f"Conciliacion_{time.strftime('%Y%m%d_%H%M%S')}")
+    inicio = time.time()
+    try:
+        rutas, conteo = conciliacion.conciliar_archivos(
+            fuente, ruta_extracto, ruta_base, formatos,
+            valor_o_defecto(tolerancia_absoluta, conciliacion.TOLERANCIA_ABSOLUTA_DEFECTO),
+            valor_o_defecto(tolerancia_relativa, conciliacion.TOLERANCIA_RELATIVA_DEFECTO),
+        )
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Error en la conciliación de {fuente}: {e}")
+        return
+    
+    resumen = ", ".join(f"{estado}: {n}" for estado, n in conteo.items())
+    logger.info(f"Conciliación ({time.time() - inicio:.2f}s) -> {resumen}")
+    logger.info(f"Conciliación guardada en: {', '.join(rutas)}")
+
+def escribir_perfil(reporte, directorio_salida, top_cprofile=0, rutas_pdf=None, opciones=None):
+    """
+    Escribe el perfil por archivo (CSV/JSON con resumen p50/p95/max) y, si se pide,
+    vuelve a ejecutar bajo cProfile los 'top_cprofile' archivos más lentos.
+    """
+    ruta_base = os.path.join(directorio_salida, f"Perfil_{time.strftime('%Y%m%d_%H%M%S')}")
+    try:
+        rutas = reporte.escribir(ruta_base)
+        reporte.registrar_resumen_en_log()
+        logger.info(f"Perfil guardado en: {', '.join(rutas)}")
+    except OSError as e:
+        logger.error(f"No se pudo escribir el perfil: {e}")
+        return
+    
+    if top_cprofile and rutas_pdf:
+        directorio_prof = f"{ruta_base}_cprofile"
+        utils.crear_directorio_si_no_existe(directorio_prof)
+        for archivo in reporte.mas_lentos(top_cprofile):
+            # 'archivo' es la ruta relativa a la entrada: los subdirectorios pasan al nombre
+            ruta_prof = os.path.join(directorio_prof, f"{os.path.splitext(archivo)[0].replace('/', '_')}.prof")
+            # Sin caché: se perfila la extracción real
+            perfilado.perfilar_con_cprofile(procesar_pdf_a_datos, (rutas_pdf[archivo], None, opciones), ruta_prof)
+            logger.info(f"cProfile de {archivo}: {ruta_prof}")
+
+def procesar_directorio_consolidado(directorio_entrada, directorio_salida=None, workers=1, cache=None,
+                                    modo_incremental=False, formatos=('xlsx',), opciones=None,
+                                    perfil=False, top_cprofile=0, almacen=None, recursivo=False,
+                                    incluir=None, excluir=None, shard=None, reanudar=False,
+                                    limite_segundos=None, limite_memoria_mb=None, triaje_previo=False,
+                                    indice=None):
     """
     Procesa todos los PDFs y genera UN SOLO Excel consolidado.
+    Con workers > 1 los PDFs se reparten en un pool de procesos; los resultados
+    se escriben en el orden original de los archivos.
+    En modo incremental solo se procesan los PDFs nuevos o modificados según el
+    manifiesto, y sus filas se fusionan con el consolidado anterior.
+    Las filas se escriben a medida que termina cada factura (memoria constante), en
+    Excel y/o en los formatos columnares indicados en 'formatos'.
+    Con perfil=True se escribe un reporte de tiempos por etapa y por archivo.
+    Con un AlmacenResultados, cada factura también se guarda (upsert) en SQLite.
+    Los PDFs se listan en streaming (escaneo.iterar_pdfs): con recursivo=True se
+    recorren los subdirectorios, 'incluir'/'excluir' son globs y con shard=(i, N)
+    solo se procesa la porción i de N del archivo.
+    Cada factura terminada se anota en un diario de solo anexado; con reanudar=True
+    una corrida interrumpida continúa desde su último punto de control.
+    Con limite_segundos / limite_memoria_mb cada PDF se lee en un trabajador
+    supervisado que se reinicia si el archivo supera el límite (TIMEOUT / MEMORIA).
+    Con triaje_previo=True solo las facturas pasan por la extracción completa; las
+    copias repetidas (mismo hash en el lote) y los demás PDFs se anotan como OMITIDO.
+    Con un IndiceDuplicados, las facturas ya vistas en lotes anteriores (por hash antes
+    de extraer, por CUFE o No. Factura después) también se anotan como OMITIDO.
     """
     if not os.path.exists(directorio_entrada):
         logger.error(f"El directorio no existe: {directorio_entrada}")
@@ -72,83 +397,219 @@ def procesar_directorio_consolidado(directorio_entrada, directorio_salida=None):
     
     utils.crear_directorio_si_no_existe(directorio_salida)
 
-    archivos = [f for f in os.listdir(directorio_entrada) if f.lower().endswith('.pdf')]
-    total = len(archivos)
-    
-    if total == 0:
+    # Rutas relativas a directorio_entrada; se generan a medida que se procesan
+    archivos = escaneo.iterar_pdfs(directorio_entrada, recursivo, incluir, excluir, shard)
+    primero = next(archivos, None)
+    if primero is None:
         logger.warning("No se encontraron archivos PDF.")
         return
+    archivos = itertools.chain([primero], archivos)
+    total = None
+
+    # --- MODO INCREMENTAL: filtrar contra el manifiesto ---
+    manifiesto = None
+    firmas = {}
+    if modo_incremental and 'xlsx' not in formatos:
+        logger.error("El modo incremental requiere el formato xlsx (el consolidado Excel es la base de la fusión)")
+        return
+    
+    if modo_incremental:
+        # Cada shard lleva su propio manifiesto (pueden compartir el directorio de salida)
+        nombre_manifiesto = incremental.NOMBRE_MANIFIESTO
+        if shard:
+            nombre_manifiesto = f"{os.path.splitext(nombre_manifiesto)[0]}{escaneo.sufijo_shard(shard)}.json"
+        manifiesto = incremental.Manifiesto.cargar(os.path.join(directorio_salida, nombre_manifiesto))
+        if manifiesto.consolidado_disponible():
+            archivos, sin_cambios, firmas = manifiesto.clasificar(directorio_entrada, archivos)
+            logger.info(f"Incremental: {len(archivos)} nuevos/modificados, {len(sin_cambios)} sin cambios")
+        else:
+            logger.info("Incremental: no hay consolidado previo, se procesarán todos los archivos")
+            manifiesto.archivos = {}
+            archivos = list(archivos)
+        
+        total = len(archivos)
+        if total == 0:
+            manifiesto.guardar()
+            logger.info(f"No hay archivos nuevos. El consolidado vigente es: {manifiesto.consolidado}")
+            return
+
+    # --- DIARIO: punto de control de la corrida y reanudación ---
+    sufijo = escaneo.sufijo_shard(shard)
+    diario_corrida = diario.DiarioConsolidacion(diario.ruta_diario(directorio_salida, sufijo))
+    encabezado = {'entrada': os.path.abspath(directorio_entrada), 'shard': list(shard) if shard else None}
+    reanudando = False
+    if reanudar:
+        if not diario_corrida.cargar():
+            logger.info("No hay una corrida interrumpida que reanudar; se inicia una nueva")
+        elif any(diario_corrida.encabezado.get(k) != v for k, v in encabezado.items()):
+            logger.error(f"El diario {diario_corrida.ruta} es de otra corrida "
+                         f"({diario_corrida.encabezado.get('entrada')}, shard {diario_corrida.encabezado.get('shard')})")
+            return
+        else:
+            reanudando = True
+            logger.info(f"Reanudando: {len(diario_corrida.completados)} archivos ya procesados según el diario")
+    elif os.path.exists(diario_corrida.ruta):
+        logger.warning(f"Se descarta el diario de una corrida interrumpida (use --reanudar para continuarla): "
+                       f"{diario_corrida.ruta}")
+    
+    reemplazados = archivos
+    if reanudando:
+        completados = diario_corrida.completados
+        if total is None:
+            archivos = (a for a in archivos if a not in completados)
+        else:
+            archivos = [a for a in archivos if a not in completados]
+            total = len(archivos)
 
-    logger.info(f"Iniciando consolidación de {total} archivos...")
+    descripcion_shard = f", shard {shard[0]}/{shard[1]}" if shard else ""
+    if total is None:
+        logger.info(f"Iniciando consolidación en streaming (workers: {workers}{descripcion_shard})...")
+    else:
+        logger.info(f"Iniciando consolidación de {total} archivos (workers: {workers}{descripcion_shard})...")
     start_time = time.time()
     
-    # --- ACUMULADORES (Listas Maestras) ---
-    acumulado_conceptos = []
-    acumulado_generales = []
-    acumulado_comparacion = []
-    acumulado_validacion = []
+    # --- EXPORTADOR EN STREAMING (las filas se escriben al terminar cada factura) ---
+    # (al reanudar se reescribe el consolidado que la corrida interrumpida dejó a medias)
+    if reanudando:
+        ruta_base = diario_corrida.encabezado['ruta_base']
+    else:
+        nombre_consolidado = f"Consolidado_Gecelca_{time.strftime('%Y%m%d_%H%M%S')}{sufijo}"
+        ruta_base = os.path.join(directorio_salida, nombre_consolidado)
+    ruta_excel = f"{ruta_base}.xlsx"
+    exportador = exportacion.crear_exportador_streaming(formatos, ruta_base)
+    
+    if manifiesto is not None and manifiesto.consolidado_disponible():
+        incremental.copiar_consolidado_anterior(manifiesto.consolidado, exportador, reemplazados)
     
-    exitosos = 0
-    fallidos = 0
+    conteo = {diario.RESULTADO_OK: 0, diario.RESULTADO_OMITIDO: 0, diario.RESULTADO_FALLIDO: 0}
+    vistos = {}  # hash -> primer archivo del lote con ese contenido (triaje)
     
-    for i, archivo in enumerate(archivos, 1):
-        ruta_completa = os.path.join(directorio_entrada, archivo)
-        print(f"Procesando [{i}/{total}]: {archivo}")
+    def anotar(relativo, resultado, filas):
+        """
+        Escribe las filas de un PDF y lo anota en el almacén, el manifiesto y el conteo:
+        igual para un PDF recién procesado que para uno recuperado del diario.
+        Retorna el Cronometro de la escritura (para el perfil).
+        """
+        with perfilado.Cronometro() as cronometro:
+            exportador.agregar(filas)
+        if almacen is not None:
+            almacen.agregar(filas)
+        # Los omitidos también quedan en el manifiesto: no se vuelven a clasificar
+        if manifiesto is not None and resultado != diario.RESULTADO_FALLIDO:
+            ruta_completa = os.path.join(directorio_entrada, relativo)
+            manifiesto.registrar(relativo, firmas.get(relativo) or incremental.firmar_archivo(ruta_completa))
+        conteo[resultado] += 1
+        return cronometro
+    
+    if reanudando:
+        # Las facturas del diario se escriben de nuevo sin releer sus PDFs
+        for relativo, resultado, filas in diario_corrida.iterar_registros():
+            if filas.get('hash_pdf'):
+                vistos.setdefault(filas['hash_pdf'], relativo)
+                if indice is not None and resultado == diario.RESULTADO_OK:
+                    registrar_en_indice(indice, os.path.abspath(os.path.join(directorio_entrada, relativo)), filas)
+            anotar(relativo, resultado, filas)
+        logger.info(f"Reanudación: {sum(conteo.values())} facturas recuperadas del diario")
+        diario_corrida.continuar()
+    else:
+        diario_corrida.iniciar(dict(encabezado, ruta_base=ruta_base))
+    
+    reporte = perfilado.ReportePerfil() if perfil else None
+    
+    if triaje_previo or indice is not None:
+        # El hash se calcula aquí (orden del lote) para detectar las copias antes de repartir
+        def tareas_con_triaje():
+            for archivo in archivos:
+                ruta = os.path.join(directorio_entrada, archivo)
+                try:
+                    hash_pdf = utils.calcular_hash_archivo(ruta)
+                except OSError as e:
+                    logger.error(f"No se pudo leer {ruta}: {e}")
+                    hash_pdf = None
+                original = None
+                if hash_pdf and indice is not None:
+                    original = indice.reservar(hash_pdf, os.path.abspath(ruta))
+                elif hash_pdf:
+                    original = vistos.setdefault(hash_pdf, archivo)
+                    original = original if original != archivo else None
+                yield ruta, cache, opciones, perfil, hash_pdf, archivo, original, triaje_previo
+        funcion, tareas = procesar_pdf_con_triaje, tareas_con_triaje()
+    else:
+        funcion = procesar_pdf_a_datos
+        tareas = ((os.path.join(directorio_entrada, archivo), cache, opciones, perfil, None, archivo)
+                  for archivo in archivos)
+    resultados = ejecucion.procesar_en_orden(funcion, tareas, workers, limite_segundos, limite_memoria_mb)
+    
+    rutas_pdf = {}
+    for i, (tarea, estado, datos) in enumerate(resultados, 1):
+        # Cada PDF se identifica por su ruta relativa a la entrada (con -r dos
+        # subdirectorios pueden tener archivos con el mismo nombre)
+        ruta_completa, relativo = tarea[0], tarea[5]
+        print(f"Procesando [{i}/{total}]: {relativo}" if total else f"Procesando [{i}]: {relativo}")
         
-        datos = procesar_pdf_a_datos(ruta_completa)
+        if indice is not None:
+            if estado == ejecucion.ESTADO_OK and datos and 'triaje' not in datos:
+                duplicado = registrar_en_indice(indice, os.path.abspath(ruta_completa), datos)
+                if duplicado is not None:
+                    logger.info(f"Índice: {relativo} -> {duplicado.motivo}")
+                    datos = {'triaje': duplicado}
+            elif not (estado == ejecucion.ESTADO_OK and datos) and tarea[4]:
+                indice.liberar(tarea[4], os.path.abspath(ruta_completa))
         
-        if datos:
-            # Append a las listas maestras
-            acumulado_conceptos.extend(datos['conceptos'])
-            acumulado_generales.extend(datos['generales'])
-            acumulado_comparacion.extend(datos['comparacion'])
-            
-            # Log de validación
-            val = datos['validacion']
-            log_entry = {
-                'Fecha Proceso': time.strftime("%Y-%m-%d %H:%M:%S"),
-                'Archivo': archivo,
-                'No. Factura': val.get('factura', 'N/A'),
-                'Es Válida': "SÍ" if val.get('es_valida') else "NO",
-                'Errores': "; ".join(val.get('errores', [])) if val.get('errores') else "Ninguno"
-            }
-            acumulado_validacion.append(log_entry)
-            
-            exitosos += 1
+        filas = construir_filas(relativo, estado, datos)
+        if estado == ejecucion.ESTADO_OK and datos and 'triaje' in datos:
+            resultado = diario.RESULTADO_OMITIDO
+        elif estado == ejecucion.ESTADO_OK and datos:
+            resultado = diario.RESULTADO_OK
         else:
-            fallidos += 1
-            acumulado_validacion.append({
-                'Fecha Proceso': time.strftime("%Y-%m-%d %H:%M:%S"),
-                'Archivo': archivo,
-                'Es Válida': "ERROR CRÍTICO",
-                'Errores': "Fallo en lectura del archivo"
-            })
-
-    # --- EXPORTACIÓN FINAL ---
-    if exitosos > 0:
-        logger.info("Generando Excel Consolidado...")
+            resultado = diario.RESULTADO_FALLIDO
+            if estado in ejecucion.ESTADOS_LIMITE:
+                logger.warning(f"{relativo}: {datos}")
         
-        datos_consolidados = {
-            'conceptos': acumulado_conceptos,
-            'generales': acumulado_generales,
-            'comparacion': acumulado_comparacion,
-            'validacion': acumulado_validacion # Pasamos la lista acumulada
-        }
+        cronometro = anotar(relativo, resultado, filas)
+        diario_corrida.registrar(relativo, resultado, filas)
         
-        nombre_consolidado = f"Consolidado_Gecelca_{time.strftime('%Y%m%d_%H%M%S')}.xlsx"
-        ruta_excel = os.path.join(directorio_salida, nombre_consolidado)
+        if reporte is not None and resultado == diario.RESULTADO_OK:
+            reporte.registrar(relativo, datos.get('perfil'), cronometro)
+            rutas_pdf[relativo] = ruta_completa
+
+    exitosos = conteo[diario.RESULTADO_OK]
+    fallidos = conteo[diario.RESULTADO_FALLIDO]
+    omitidos = conteo[diario.RESULTADO_OMITIDO]
+
+    # --- CIERRE DEL CONSOLIDADO ---
+    if exitosos > 0:
+        logger.info(f"Guardando consolidado ({', '.join(formatos)})...")
+        rutas = exportador.cerrar()
         
-        exportador = exportacion.ExportadorExcel(datos_consolidados, ruta_excel)
-        exportador.exportar()
+        if manifiesto is not None:
+            manifiesto.consolidado = ruta_excel
+            manifiesto.guardar()
         
-        logger.info(f"¡Éxito! Archivo maestro guardado en: {ruta_excel}")
+        rutas = rutas if isinstance(rutas, list) else [rutas]
+        logger.info(f"¡Éxito! Consolidado guardado en: {', '.join(rutas)}")
+        # El consolidado quedó cerrado: ya no hay nada que reanudar
+        diario_corrida.eliminar()
     else:
+        rutas = []
+        # Sin facturas no se genera consolidado: se borran las salidas a medio escribir
+        exportador.descartar()
+        diario_corrida.cerrar()
         logger.error("No se pudo procesar ningún archivo correctamente.")
 
+    if cache is not None:
+        cache.desalojar()
+
+    if reporte is not None:
+        escribir_perfil(reporte, directorio_salida, top_cprofile, rutas_pdf, opciones)
+
     elapsed_time = time.time() - start_time
-    logger.info(f"Resumen: {exitosos} procesados, {fallidos} fallidos. Tiempo: {elapsed_time:.2f}s")
+    resumen_omitidos = f", {omitidos} omitidos (triaje/duplicados)" if triaje_previo or indice is not None else ""
+    logger.info(f"Resumen: {exitosos} procesados, {fallidos} fallidos{resumen_omitidos}. Tiempo: {elapsed_time:.2f}s")
+    return rutas
 
-def procesar_individual(ruta_pdf, directorio_salida=None):
+def procesar_individual(ruta_pdf, directorio_salida=None, cache=None, formatos=('xlsx',), opciones=None,
+                        perfil=False, top_cprofile=0, almacen=None):
     """
     Procesa un solo archivo (wrapper para mantener compatibilidad con -a).
     """
@@ -156,32 +617,250 @@ def procesar_individual(ruta_pdf, directorio_salida=None):
         directorio_salida = os.path.dirname(os.path.abspath(ruta_pdf))
     
     nombre_base = utils.obtener_nombre_archivo_sin_extension(ruta_pdf)
-    ruta_excel = os.path.join(directorio_salida, f"{nombre_base}_procesado.xlsx")
+    ruta_base = os.path.join(directorio_salida, f"{nombre_base}_procesado")
+    ruta_excel = f"{ruta_base}.xlsx"
     
-    datos = procesar_pdf_a_datos(ruta_pdf)
+    datos = procesar_pdf_a_datos(ruta_pdf, cache, opciones, perfil)
     
     if datos:
-        exportador = exportacion.ExportadorExcel(datos, ruta_excel)
-        exportador.exportar()
-        logger.info(f"Archivo individual generado: {ruta_excel}")
+        with perfilado.Cronometro() as cronometro:
+            if 'xlsx' in formatos:
+                exportador = exportacion.ExportadorExcel(datos, ruta_excel)
+                exportador.exportar()
+                logger.info(f"Archivo individual generado: {ruta_excel}")
+            
+            formatos_columnares = [f for f in formatos if f != 'xlsx']
+            if formatos_columnares:
+                exportador = exportacion.crear_exportador_streaming(formatos_columnares, ruta_base)
+                exportador.agregar(construir_filas(os.path.basename(ruta_pdf), ejecucion.ESTADO_OK, datos))
+                rutas = exportador.cerrar()
+                rutas = rutas if isinstance(rutas, list) else [rutas]
+                logger.info(f"Archivos individuales generados: {', '.join(rutas)}")
+        
+        if almacen is not None:
+            almacen.agregar(construir_filas(os.path.basename(ruta_pdf), ejecucion.ESTADO_OK, datos))
+        
+        if perfil:
+            reporte = perfilado.ReportePerfil()
+            archivo = os.path.basename(ruta_pdf)
+            reporte.registrar(archivo, datos.get('perfil'), cronometro)
+            escribir_perfil(reporte, directorio_salida, top_cprofile, {archivo: ruta_pdf}, opciones)
     else:
         logger.error("Fallo al procesar el archivo individual.")
 
+def valor_o_defecto(valor, defecto):
+    """Valor de una opción de la línea de comandos, o el defecto del módulo que la usa."""
+    return defecto if valor is None else valor
+
 def main():
     parser = argparse.ArgumentParser(description='Procesador Consolidado de Facturas')
     
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument('-a', '--archivo', help='Procesar un solo archivo')
     group.add_argument('-d', '--directorio', help='Procesar directorio completo y consolidar')
+    group.add_argument('-s', '--servicio', metavar='BANDEJA',
+                       help='Vigilar una bandeja de entrada y procesar cada PDF al llegar (hasta Ctrl+C)')
+    group.add_argument('--api', type=int, metavar='PUERTO', nargs='?', const=0,
+                       help='Servir la extracción por HTTP en localhost (por defecto puerto 8765)')
+    group.add_argument('--conciliar', metavar='CONSOLIDADO',
+                       help='Conciliar un consolidado (.xlsx, _comparacion.csv/.parquet/.jsonl o base --sqlite) '
+                            'contra el extracto --data-lake')
+    group.add_argument('--consulta', metavar='BD',
+                       help='Generar el consolidado desde un almacén SQLite (--sqlite), sin releer PDFs; '
+                            'se puede filtrar con --contrato, --mes, --nit y --factura')
+    group.add_argument('--fusionar', nargs='+', metavar='ENTRADA',
+                       help='Fusionar en un solo consolidado las salidas de varios shards '
+                            '(directorios de salida o archivos de consolidado)')
     
     parser.add_argument('-o', '--output', help='Directorio de salida (opcional)')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='Número de procesos para repartir los PDFs en modo directorio (por defecto 1)')
+    
+    parser.add_argument('-r', '--recursivo', action='store_true',
+                        help='Directorio: recorrer también los subdirectorios (p. ej. año/mes/proveedor)')
+    parser.add_argument('--incluir', nargs='+', metavar='GLOB',
+                        help="Directorio: globs de los archivos a procesar (por defecto '*.pdf'); "
+                             "con '/' se comparan con la ruta relativa, p. ej. '2024/*/*/*.pdf'")
+    parser.add_argument('--excluir', nargs='+', metavar='GLOB',
+                        help='Directorio: globs de archivos o subdirectorios a omitir')
+    parser.add_argument('--shard', metavar='i/N',
+                        help='Directorio: procesar solo la porción i de N (por hash de la ruta relativa), '
+                             'para repartir una corrida entre varias máquinas; ver --fusionar')
+    
+    parser.add_argument('--triaje', action='store_true',
+                        help='Directorio: clasificar cada PDF por sus metadatos y el texto crudo de la página 1 y '
+                             'extraer solo las facturas; copias, notas, anexos y PDFs sin texto quedan como '
+                             'OMITIDO en Log_Proceso')
+    parser.add_argument('--indice-duplicados', metavar='BD',
+                        help='Directorio: índice SQLite persistente (hash, CUFE, No. Factura) para omitir las '
+                             'facturas ya procesadas en este u otros lotes; se crea si no existe')
+    parser.add_argument('--limite-segundos', type=float, metavar='S',
+                        help='Directorio: tiempo máximo por PDF; el trabajador que lo supera se reinicia y el '
+                             'archivo queda como TIMEOUT en Log_Proceso (implica un proceso trabajador aunque -w sea 1)')
+    parser.add_argument('--limite-memoria-mb', type=float, metavar='MB',
+                        help='Directorio: memoria residente máxima de un trabajador; si la supera se reinicia y el '
+                             'archivo queda como MEMORIA en Log_Proceso')
+    
+    parser.add_argument('-f', '--formato', nargs='+', choices=exportacion.FORMATOS, default=['xlsx'],
+                        help='Formatos de salida (xlsx, parquet, csv, jsonl); se pueden combinar. Por defecto xlsx')
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help='Procesar solo PDFs nuevos o modificados y fusionarlos con el consolidado anterior')
+    parser.add_argument('--reanudar', action='store_true',
+                        help='Continuar una corrida -d interrumpida desde su último punto de control '
+                             '(las facturas ya anotadas en el diario no se vuelven a leer)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='No usar la caché de extracción (fuerza la relectura de todos los PDFs)')
+    parser.add_argument('--cache-dir', help='Directorio de la caché de extracción (por defecto <salida>/.cache_extraccion)')
+    parser.add_argument('--cache-max-mb', type=float, help='Tamaño máximo de la caché en MB (por defecto 512)')
+    
+    parser.add_argument('--max-paginas', type=int, help='Analizar como máximo N páginas por PDF')
+    parser.add_argument('--paginas', help='Páginas a analizar (base 1), separadas por coma. Ej: 1,2')
+    parser.add_argument('--omitir-figuras', action='store_true',
+                        help='No analizar el texto dentro de figuras (LTFigure)')
+    parser.add_argument('--adaptativo', action='store_true',
+                        help='Dejar de leer páginas al encontrar los campos requeridos y el cierre de la tabla de ítems')
+    parser.add_argument('--backend', choices=list(extractores_pdf.BACKENDS), default='pdfminer',
+                        help="Backend de lectura de texto: 'pdfminer' (layout completo, por defecto), "
+                             "'rapido' (intérprete de bajo nivel sin LAParams) o 'pymupdf' (si está instalado)")
+    
+    parser.add_argument('--espera-estable', type=float,
+                        help='Servicio: segundos sin cambios de tamaño antes de procesar un PDF (por defecto 2)')
+    parser.add_argument('--intervalo-sondeo', type=float,
+                        help='Servicio: segundos entre revisiones de la bandeja si no hay inotify (por defecto 2)')
+    parser.add_argument('--rotar-minutos', type=float,
+                        help='Servicio: minutos antes de cerrar la salida y abrir una nueva (por defecto 60). '
+                             'Las filas CSV/JSONL quedan en disco tras cada factura; xlsx/parquet al rotar')
+    
+    parser.add_argument('--host', default='127.0.0.1', help='API: dirección de escucha (por defecto 127.0.0.1)')
+    parser.add_argument('--cola-maxima', type=int,
+                        help='API: PDFs en espera además de los que están en proceso (por defecto 4 por worker); '
+                             'con la cola llena se responde 503')
+    parser.add_argument('--api-max-mb', type=float,
+                        help='API: tamaño máximo de una solicitud en MB (por defecto 50)')
+    
+    parser.add_argument('--sqlite', metavar='BD',
+                        help='Guardar también los resultados en un almacén SQLite (upsert por hash del PDF y No. Factura)')
+    parser.add_argument('--contrato', help='Consulta: solo las facturas de este No. Contrato')
+    parser.add_argument('--mes', metavar='AAAA-MM', help='Consulta: solo las facturas expedidas en este mes')
+    parser.add_argument('--nit', help='Consulta: solo las facturas de este NIT de cliente')
+    parser.add_argument('--factura', help='Consulta: solo esta No. Factura')
+    
+    parser.add_argument('--data-lake', metavar='EXTRACTO',
+                        help='Extracto del Data Lake (CSV/Parquet/Excel con No. Factura, No. Contrato, Variable y '
+                             'Valor Data Lake) para conciliar la hoja Comparación; con -d se concilia al terminar')
+    parser.add_argument('--tolerancia', type=float,
+                        help='Conciliación: diferencia absoluta aceptada en montos y cantidades (por defecto 1)')
+    parser.add_argument('--tolerancia-relativa', type=float, metavar='PORCENTAJE',
+                        help='Conciliación: diferencia aceptada como %% del valor del Data Lake (por defecto 0)')
+    
+    parser.add_argument('--perfil', action='store_true',
+                        help='Medir tiempo de pared y CPU por etapa y por archivo (Perfil_<fecha>.csv/.json en la salida)')
+    parser.add_argument('--perfil-cprofile', type=int, default=0, metavar='N',
+                        help='Con --perfil, volver a ejecutar bajo cProfile los N archivos más lentos (.prof)')
     
     args = parser.parse_args()
     
+    opciones = {}
+    if args.max_paginas:
+        opciones['max_paginas'] = args.max_paginas
+    if args.paginas:
+        opciones['paginas'] = [int(p) for p in args.paginas.split(',') if p.strip()]
+    if args.omitir_figuras:
+        opciones['omitir_figuras'] = True
+    if args.adaptativo:
+        opciones['adaptativo'] = True
+    if args.backend != 'pdfminer':
+        if args.backend not in extractores_pdf.backends_disponibles():
+            parser.error(f"El backend '{args.backend}' no está disponible en este entorno")
+        opciones['backend'] = args.backend
+    
+    shard = None
+    if args.shard:
+        try:
+            shard = escaneo.parsear_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+    
+    tolerancia_relativa = args.tolerancia_relativa / 100 if args.tolerancia_relativa is not None else None
+    
+    almacen = None
+    if args.sqlite and (args.archivo or args.directorio or args.servicio):
+        almacen = abrir_almacen(args.sqlite)
+        if almacen is None:
+            return
+    
+    indice = None
+    if args.indice_duplicados and args.directorio:
+        indice = abrir_indice(args.indice_duplicados)
+        if indice is None:
+            return
+    
     if args.archivo:
-        procesar_individual(args.archivo, args.output)
+        directorio_salida = args.output or os.path.dirname(os.path.abspath(args.archivo))
+        cache = None
+        if os.path.exists(args.archivo):
+            cache = crear_cache(directorio_salida, not args.no_cache, args.cache_dir, args.cache_max_mb)
+        procesar_individual(args.archivo, args.output, cache=cache, formatos=args.formato, opciones=opciones,
+                            perfil=args.perfil, top_cprofile=args.perfil_cprofile, almacen=almacen)
+        cerrar_almacen(almacen)
     elif args.directorio:
-        procesar_directorio_consolidado(args.directorio, args.output)
+        directorio_salida = args.output or os.path.join(args.directorio, "Resultados_Consolidados")
+        cache = None
+        if os.path.exists(args.directorio):
+            cache = crear_cache(directorio_salida, not args.no_cache, args.cache_dir, args.cache_max_mb)
+        rutas = procesar_directorio_consolidado(args.directorio, args.output, workers=args.workers, cache=cache,
+                                                modo_incremental=args.incremental, formatos=args.formato,
+                                                opciones=opciones, perfil=args.perfil,
+                                                top_cprofile=args.perfil_cprofile, almacen=almacen,
+                                                recursivo=args.recursivo, incluir=args.incluir,
+                                                excluir=args.excluir, shard=shard, reanudar=args.reanudar,
+                                                limite_segundos=args.limite_segundos,
+                                                limite_memoria_mb=args.limite_memoria_mb,
+                                                triaje_previo=args.triaje, indice=indice)
+        cerrar_almacen(almacen)
+        cerrar_indice(indice)
+        fuente = elegir_fuente_comparacion(rutas or [])
+        if args.data_lake and fuente:
+            conciliar_con_data_lake(fuente, args.data_lake, directorio_salida, args.formato,
+                                    args.tolerancia, tolerancia_relativa)
+    elif args.conciliar:
+        if not args.data_lake:
+            parser.error("--conciliar requiere --data-lake")
+        if not os.path.exists(args.conciliar):
+            logger.error(f"El consolidado no existe: {args.conciliar}")
+            return
+        conciliar_con_data_lake(args.conciliar, args.data_lake, args.output, args.formato,
+                                args.tolerancia, tolerancia_relativa)
+    elif args.consulta:
+        filtros = {'contrato': args.contrato, 'mes': args.mes, 'nit': args.nit, 'factura': args.factura}
+        exportar_desde_almacen(args.consulta, args.output, formatos=args.formato, filtros=filtros)
+    elif args.fusionar:
+        fusionar_shards(args.fusionar, args.output, args.formato)
+    elif args.servicio:
+        if not os.path.isdir(args.servicio):
+            logger.error(f"La bandeja de entrada no existe: {args.servicio}")
+            return
+        directorio_salida = args.output or os.path.join(args.servicio, "Resultados_Servicio")
+        cache = crear_cache(directorio_salida, not args.no_cache, args.cache_dir, args.cache_max_mb)
+        import servicio
+        servicio.ejecutar_servicio(
+            procesar_pdf_a_datos, construir_filas, args.servicio, directorio_salida,
+            workers=args.workers, formatos=args.formato, argumentos_extra=(cache, opciones),
+            espera_estable=valor_o_defecto(args.espera_estable, servicio.ESPERA_ESTABLE_DEFECTO),
+            intervalo_sondeo=valor_o_defecto(args.intervalo_sondeo, servicio.INTERVALO_SONDEO_DEFECTO),
+            rotar_minutos=valor_o_defecto(args.rotar_minutos, servicio.ROTAR_MINUTOS_DEFECTO),
+            almacen=almacen, cache=cache,
+        )
+        cerrar_almacen(almacen)
+    elif args.api is not None:
+        cache = None
+        if args.cache_dir:
+            cache = crear_cache(args.cache_dir, not args.no_cache, args.cache_dir, args.cache_max_mb)
+        import api
+        api.ejecutar_api(procesar_pdf_a_datos, (cache, opciones), host=args.host,
+                         puerto=args.api or api.PUERTO_DEFECTO, workers=args.workers,
+                         cola_maxima=args.cola_maxima, max_mb=valor_o_defecto(args.api_max_mb, api.MAX_MB_DEFECTO),
+                         cache=cache)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""
+Motor de coincidencia de patrones en una sola pasada.
+Se construye a partir de extractores_patrones y reemplaza el recorrido de
+"todas las regex contra todas las líneas" por:
+1. Un pre-filtro barato por palabras clave que decide qué patrones pueden coincidir.
+2. Un conjunto de patrones activos del que se retira cada campo en cuanto se llena.
+3. Corte del recorrido cuando todos los campos están resueltos.
+"""
+
+import logging
+from extractores_patrones import (
+    PATRONES_ENCABEZADO, PATRONES_MONTO, PATRONES_INFO_PIE,
+    CLAVES_PATRONES, CAMPOS_CLIENTE, MARCADORES_CLIENTE
+)
+from numeros import interpretar_valor, FORMATO_AMBIGUO
+
+logger = logging.getLogger(__name__)
+
+# Tipos de patrón (determinan cómo se interpreta la coincidencia)
+TIPO_ENCABEZADO = 'encabezado'
+TIPO_MONTO = 'monto'
+TIPO_INFO = 'info'
+
+# re.IGNORECASE hace coincidir estas letras con su equivalente ASCII,
+# pero str.lower() no las convierte; se normalizan antes del pre-filtro.
+_EQUIVALENCIAS_IGNORECASE = str.maketrans({'İ': 'i', 'ı': 'i', 'ſ': 's', 'K': 'k'})
+
+class _Especificacion:
+    __slots__ = ('campo', 'patron', 'tipo', 'claves', 'es_cliente')
+
+    def __init__(self, campo, patron, tipo, claves, es_cliente):
+        self.campo = campo
+        self.patron = patron
+        self.tipo = tipo
+        self.claves = claves
+        self.es_cliente = es_cliente
+
+class MotorPatrones:
+    def __init__(self, grupos, claves, campos_cliente, marcadores_cliente):
+        """
+        Inicializa el motor.
+        Args:
+            grupos (list): Pares (tipo, dict campo -> regex compilada), en orden de evaluación.
+            claves (dict): Campo -> tupla de literales requeridos para el pre-filtro.
+            campos_cliente (list): Campos que solo se aceptan dentro de la sección del cliente.
+            marcadores_cliente (list): Textos que activan la sección del cliente.
+        """
+        self.especificaciones = []
+        for tipo, patrones in grupos:
+            for campo, patron in patrones.items():
+                if campo not in claves:
+                    raise ValueError(f"El campo '{campo}' no tiene palabras clave de pre-filtro")
+                self.especificaciones.append(
+                    _Especificacion(campo, patron, tipo, claves[campo], campo in campos_cliente)
+                )
+        self.marcadores_cliente = marcadores_cliente
+        self._prefiltros = {}
+
+    def _prefiltro(self, activos):
+        """
+        Retorna el pre-filtro del conjunto activo: pares (palabra clave, índices de los
+        patrones activos que la requieren). Se memoriza por conjunto de campos activos.
+        """
+        llave = tuple(esp.campo for esp in activos)
+        pares = self._prefiltros.get(llave)
+        if pares is None:
+            if len(self._prefiltros) > 4096:
+                self._prefiltros.clear()
+            por_clave = {}
+            for indice, esp in enumerate(activos):
+                for clave in esp.claves:
+                    por_clave.setdefault(clave, []).append(indice)
+            pares = self._prefiltros[llave] = [(clave, tuple(indices)) for clave, indices in por_clave.items()]
+        return pares
+
+    def extraer(self, lineas, ambiguos=None):
+        """
+        Recorre las líneas una vez y retorna el diccionario de datos generales.
+        El resultado es idéntico al de evaluar todos los patrones contra todas las líneas
+        (mismo valor por campo y mismo orden de inserción).
+        Args:
+            ambiguos (list): Si se indica, recibe los campos de monto leídos con
+                FORMATO_AMBIGUO ('280.933': miles o decimales).
+        """
+        datos = {}
+        activos = list(self.especificaciones)
+        pares_claves = self._prefiltro(activos)
+        quedan_cliente = any(esp.es_cliente for esp in activos)
+        seccion_cliente_activa = False
+
+        for linea in lineas:
+            if not activos:
+                break
+
+            # 1. Detectar la sección del cliente (solo importa si faltan campos del cliente)
+            if quedan_cliente and not seccion_cliente_activa:
+                linea_lower = linea.lower()
+                for marcador in self.marcadores_cliente:
+                    if marcador in linea_lower:
+                        seccion_cliente_activa = True
+                        break
+
+            # 2. Pre-filtro: búsqueda de subcadenas para hallar los patrones candidatos
+            if linea.isascii():
+                linea_norm = linea.lower()
+            else:
+                linea_norm = linea.translate(_EQUIVALENCIAS_IGNORECASE).lower()
+
+            indices = None
+            for clave, indices_clave in pares_claves:
+                if clave in linea_norm:
+                    if indices is None:
+                        indices = set(indices_clave)
+                    else:
+                        indices.update(indices_clave)
+            if indices is None:
+                continue
+
+            resueltos = False
+            for indice in sorted(indices):
+                esp = activos[indice]
+                if esp.es_cliente and not seccion_cliente_activa:
+                    continue
+
+                match = esp.patron.search(linea)
+                if match is None:
+                    continue
+
+                # 3. Interpretar la coincidencia según el tipo de patrón
+                if esp.tipo == TIPO_MONTO:
+                    interpretado = interpretar_valor(linea[match.end():])
+                    datos[esp.campo] = interpretado.valor
+                    if ambiguos is not None and interpretado.formato == FORMATO_AMBIGUO:
+                        ambiguos.append(esp.campo)
+                elif esp.tipo == TIPO_ENCABEZADO and len(match.groups()) > 1:
+                    datos[esp.campo] = f"{match.group(1)} al {match.group(2)}".strip()
+                else:
+                    datos[esp.campo] = match.group(1).strip()
+                resueltos = True
+
+            # 4. Retirar los campos resueltos del conjunto activo
+            if resueltos:
+                activos = [esp for esp in activos if esp.campo not in datos]
+                pares_claves = self._prefiltro(activos)
+                quedan_cliente = any(esp.es_cliente for esp in activos)
+
+        return datos
+
+def crear_motor_generales():
+    """
+    Construye el motor para los datos generales de la factura.
+    """
+    return MotorPatrones(
+        [
+            (TIPO_ENCABEZADO, PATRONES_ENCABEZADO),
+            (TIPO_MONTO, PATRONES_MONTO),
+            (TIPO_INFO, PATRONES_INFO_PIE),
+        ],
+        CLAVES_PATRONES,
+        CAMPOS_CLIENTE,
+        MARCADORES_CLIENTE,
+    )
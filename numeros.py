@@ -0,0 +1,145 @@
+"""
+Módulo de interpretación de números en formato colombiano.
+Cada texto se interpreta una sola vez (caché LRU) y el resultado incluye el formato
+detectado, de modo que la ambigüedad miles/decimales queda explícita:
+'280.933' puede ser 280933 o 280,933 y se marca como FORMATO_AMBIGUO.
+"""
+
+import re
+import math
+from collections import namedtuple
+from functools import lru_cache
+
+# Formatos detectados
+FORMATO_VACIO = 'vacio'          # Sin contenido numérico ('', '$', 'COP')
+FORMATO_ENTERO = 'entero'        # Solo dígitos: '8360566'
+FORMATO_MILES = 'miles'          # Separadores de miles: '8,360,566' o '8.360.566'
+FORMATO_DECIMAL = 'decimal'      # Punto decimal inequívoco: '150.5', '1,234.567'
+FORMATO_AMBIGUO = 'ambiguo'      # Un solo punto seguido de 3 dígitos: '280.933' (se toma como decimal)
+FORMATO_INVALIDO = 'invalido'    # No es un número (valor 0.0)
+
+NumeroInterpretado = namedtuple('NumeroInterpretado', ['valor', 'formato'])
+
+TAMANO_CACHE = 65536
+
+_DIGITOS_ESPACIADOS = re.compile(r'\d\s+\d')
+_AMBIGUO = re.compile(r'\d\.\d{3}$')
+
+_VACIO = NumeroInterpretado(0.0, FORMATO_VACIO)
+_INVALIDO = NumeroInterpretado(0.0, FORMATO_INVALIDO)
+
+@lru_cache(maxsize=TAMANO_CACHE)
+def interpretar_numero(texto):
+    """
+    Interpreta un texto de moneda o cantidad, tolerando espacios internos.
+    Ej: '$ 8 . 3 6 0 . 5 6 6' -> (8360566.0, 'miles')
+    Las comas se toman como separador de miles; si hay más de un punto también son
+    miles, y un solo punto es decimal.
+    Returns:
+        NumeroInterpretado: (valor, formato).
+    """
+    # 1. Eliminar símbolos de moneda y texto 'COP'
+    s = texto.upper().replace('$', '').replace('COP', '').strip()
+    if not s:
+        return _VACIO
+
+    # 2. Dígitos separados por espacios (pdfminer): "2 9 , 7 6 0 , 0 0 0"
+    if _DIGITOS_ESPACIADOS.search(s):
+        s = s.replace(' ', '')
+
+    # 3. Comas = miles; varios puntos = miles; un punto = decimal
+    tiene_comas = ',' in s
+    s_limpia = s.replace(',', '') if tiene_comas else s
+    puntos = s_limpia.count('.')
+    if puntos > 1:
+        s_limpia = s_limpia.replace('.', '')
+
+    try:
+        valor = float(s_limpia)
+    except ValueError:
+        return _INVALIDO
+    if not math.isfinite(valor):  # 'nan', 'inf': float() los acepta pero no son montos
+        return _INVALIDO
+
+    if puntos > 1 or (tiene_comas and puntos == 0):
+        formato = FORMATO_MILES
+    elif puntos == 1:
+        formato = FORMATO_AMBIGUO if not tiene_comas and _AMBIGUO.search(s_limpia) else FORMATO_DECIMAL
+    else:
+        formato = FORMATO_ENTERO
+    return NumeroInterpretado(valor, formato)
+
+def interpretar_valor(valor):
+    """
+    Como interpretar_numero, pero acepta cualquier valor: los int/float se retornan
+    tal cual (no se vuelven a interpretar) y los vacíos (None, '', 0, NaN) son FORMATO_VACIO.
+    """
+    if not valor or valor != valor:
+        return _VACIO
+    if isinstance(valor, (int, float)):
+        return NumeroInterpretado(float(valor), FORMATO_DECIMAL if isinstance(valor, float) else FORMATO_ENTERO)
+    return interpretar_numero(str(valor))
+
+def interpretar_numeros(valores):
+    """
+    Variante vectorizada: interpreta una lista o una Series de pandas de textos crudos.
+    Cada valor distinto se interpreta una sola vez.
+    Returns:
+        list de NumeroInterpretado para una lista; para una Series, un DataFrame con
+        columnas 'valor' y 'formato' y el mismo índice.
+    """
+    if hasattr(valores, 'map') and hasattr(valores, 'index'):
+        return _interpretar_serie(valores)
+
+    distintos = {}
+    resultado = []
+    for valor in valores:
+        # El tipo es parte de la llave: 1 y 1.0 son iguales en un dict pero no en formato
+        llave = (type(valor), valor)
+        try:
+            interpretado = distintos[llave]
+        except KeyError:
+            interpretado = distintos[llave] = interpretar_valor(valor)
+        except TypeError:  # No hasheable
+            interpretado = interpretar_valor(valor)
+        resultado.append(interpretado)
+    return resultado
+
+def _interpretar_serie(valores):
+    """
+    interpretar_numeros para una Series: las columnas numéricas se resuelven sin recorrerlas
+    (mismo resultado que interpretar_valor); las de texto o mixtas pasan valor a valor por
+    interpretar_valor, con los nulos de pandas (NaN, None, NA, NaT) como FORMATO_VACIO.
+    """
+    import numpy as np
+    import pandas as pd
+
+    vacio_numero = valores.isna()
+    if pd.api.types.is_numeric_dtype(valores.dtype) and not pd.api.types.is_bool_dtype(valores.dtype):
+        valor = valores.astype('float64')
+        vacio = vacio_numero | (valor == 0)
+        formato = FORMATO_ENTERO if pd.api.types.is_integer_dtype(valores.dtype) else FORMATO_DECIMAL
+        return pd.DataFrame({
+            'valor': valor.where(~vacio, 0.0),
+            'formato': np.where(vacio, FORMATO_VACIO, formato),
+        }, index=valores.index)
+
+    objetos = valores.to_numpy(dtype=object)
+    nulos = vacio_numero.to_numpy()
+    if nulos.any():
+        objetos = objetos.copy()
+        objetos[nulos] = None
+    interpretados = interpretar_numeros(objetos.tolist())
+    return pd.DataFrame({
+        'valor': np.fromiter((i.valor for i in interpretados), dtype='float64', count=len(interpretados)),
+        'formato': [i.formato for i in interpretados],
+    }, index=valores.index)
+
+def limpiar_numeros(valores):
+    """
+    Como interpretar_numeros, pero retorna solo los valores (lista de float o Series).
+    """
+    interpretados = interpretar_numeros(valores)
+    if hasattr(interpretados, 'columns'):
+        return interpretados['valor']
+    return [i.valor for i in interpretados]
@@ -0,0 +1,252 @@
+"""
+Módulo de instrumentación por etapas del pipeline.
+Registra tiempo de pared y de CPU de cada etapa de cada PDF (lectura del layout,
+agrupación de filas, regex de encabezado, ítems, procesamiento y exportación) junto
+con los conteos de páginas, líneas e ítems. Sin un registro activo las mediciones
+son no-ops, de modo que la instrumentación no cuesta nada en una corrida normal.
+"""
+
+import csv
+import json
+import time
+import cProfile
+import logging
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+# Etapas en el orden del pipeline
+ETAPA_LECTURA = 'lectura_pdf'
+ETAPA_AGRUPACION = 'agrupacion_filas'
+ETAPA_ADAPTATIVA = 'condicion_adaptativa'
+ETAPA_ENCABEZADO = 'regex_encabezado'
+ETAPA_ITEMS = 'items'
+ETAPA_PROCESAMIENTO = 'procesamiento'
+ETAPA_EXPORTACION = 'exportacion'
+ETAPA_TOTAL = 'total'
+
+ETAPAS = [
+    ETAPA_LECTURA, ETAPA_AGRUPACION, ETAPA_ADAPTATIVA, ETAPA_ENCABEZADO,
+    ETAPA_ITEMS, ETAPA_PROCESAMIENTO, ETAPA_EXPORTACION, ETAPA_TOTAL,
+]
+
+CONTADORES = ['paginas', 'lineas', 'items', 'cache']
+
+_NULO = nullcontext()
+
+# Registro del PDF en curso (uno por proceso: cada worker procesa un PDF a la vez)
+_activo = None
+
+class Cronometro:
+    """
+    Mide tiempo de pared y de CPU de un bloque 'with'.
+    """
+    __slots__ = ('wall', 'cpu')
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall = time.perf_counter() - self.wall
+        self.cpu = time.process_time() - self.cpu
+        return False
+
+class _Etapa:
+    __slots__ = ('registro', 'nombre', 'cronometro')
+
+    def __init__(self, registro, nombre):
+        self.registro = registro
+        self.nombre = nombre
+        self.cronometro = Cronometro()
+
+    def __enter__(self):
+        self.cronometro.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self.cronometro.__exit__(*exc)
+        self.registro.sumar(self.nombre, self.cronometro.wall, self.cronometro.cpu)
+        return False
+
+class RegistroPerfil:
+    """
+    Tiempos acumulados por etapa y contadores de un PDF.
+    """
+    def __init__(self):
+        self.etapas = {}
+        self.contadores = {}
+        self.cronometro = Cronometro().__enter__()
+
+    def sumar(self, etapa, wall, cpu):
+        acumulado = self.etapas.setdefault(etapa, [0.0, 0.0])
+        acumulado[0] += wall
+        acumulado[1] += cpu
+
+    def contar(self, nombre, cantidad=1):
+        self.contadores[nombre] = self.contadores.get(nombre, 0) + cantidad
+
+    def cerrar(self):
+        """
+        Cierra la medición total y retorna el registro como dict serializable
+        (viaja del worker al proceso principal junto con los datos).
+        """
+        self.cronometro.__exit__()
+        self.etapas[ETAPA_TOTAL] = [self.cronometro.wall, self.cronometro.cpu]
+        return {
+            'etapas': {nombre: {'wall_s': w, 'cpu_s': c} for nombre, (w, c) in self.etapas.items()},
+            'contadores': dict(self.contadores),
+        }
+
+def iniciar():
+    """
+    Activa un registro nuevo para el PDF que empieza a procesarse en este proceso.
+    """
+    global _activo
+    _activo = RegistroPerfil()
+    return _activo
+
+def finalizar():
+    """
+    Desactiva el registro en curso (las mediciones vuelven a ser no-ops).
+    """
+    global _activo
+    _activo = None
+
+def etapa(nombre):
+    """
+    Context manager que acumula el tiempo del bloque en la etapa indicada.
+    """
+    if _activo is None:
+        return _NULO
+    return _Etapa(_activo, nombre)
+
+def medir_iterador(nombre, iterable):
+    """
+    Acumula en la etapa indicada el tiempo de producir cada elemento del iterable
+    (p. ej. el análisis de layout de cada página, que ocurre dentro del generador).
+    """
+    if _activo is None:
+        return iterable
+    return _medir_iterador(_activo, nombre, iterable)
+
+def _medir_iterador(registro, nombre, iterable):
+    iterador = iter(iterable)
+    while True:
+        with _Etapa(registro, nombre):
+            try:
+                elemento = next(iterador)
+            except StopIteration:
+                return
+        yield elemento
+
+def contar(nombre, cantidad=1):
+    if _activo is not None:
+        _activo.contar(nombre, cantidad)
+
+def percentil(valores, p):
+    """
+    Percentil p (0-100) con interpolación lineal.
+    """
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    k = (len(ordenados) - 1) * p / 100
+    inferior = int(k)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (k - inferior)
+
+def perfilar_con_cprofile(funcion, argumentos, ruta_salida):
+    """
+    Ejecuta la función bajo cProfile y guarda las estadísticas (.prof, legible con pstats/snakeviz).
+    """
+    perfilador = cProfile.Profile()
+    try:
+        perfilador.runcall(funcion, *argumentos)
+    finally:
+        perfilador.dump_stats(ruta_salida)
+    return ruta_salida
+
+class ReportePerfil:
+    """
+    Acumula los perfiles por archivo en el proceso principal y genera los reportes.
+    """
+    def __init__(self):
+        self.filas = []
+
+    def registrar(self, archivo, perfil, exportacion=None):
+        """
+        Args:
+            archivo (str): Nombre del PDF.
+            perfil (dict): Resultado de RegistroPerfil.cerrar() (None si el worker falló).
+            exportacion (Cronometro): Tiempo de escritura de sus filas en el proceso principal.
+        """
+        perfil = perfil or {'etapas': {}, 'contadores': {}}
+        etapas = {nombre: dict(valores) for nombre, valores in perfil['etapas'].items()}
+
+        if exportacion is not None:
+            etapas[ETAPA_EXPORTACION] = {'wall_s': exportacion.wall, 'cpu_s': exportacion.cpu}
+            total = etapas.setdefault(ETAPA_TOTAL, {'wall_s': 0.0, 'cpu_s': 0.0})
+            total['wall_s'] += exportacion.wall
+            total['cpu_s'] += exportacion.cpu
+
+        fila = {'Archivo': archivo}
+        for nombre in CONTADORES:
+            fila[nombre] = perfil['contadores'].get(nombre, 0)
+        for nombre in ETAPAS:
+            valores = etapas.get(nombre, {})
+            fila[f"{nombre}_wall_s"] = round(valores.get('wall_s', 0.0), 6)
+            fila[f"{nombre}_cpu_s"] = round(valores.get('cpu_s', 0.0), 6)
+        self.filas.append(fila)
+
+    def resumen(self):
+        """
+        Retorna p50/p95/max de pared y CPU por etapa.
+        """
+        resumen = {}
+        for nombre in ETAPAS:
+            resumen[nombre] = {}
+            for medida in ('wall_s', 'cpu_s'):
+                valores = [fila[f"{nombre}_{medida}"] for fila in self.filas]
+                resumen[nombre][medida] = {
+                    'p50': percentil(valores, 50),
+                    'p95': percentil(valores, 95),
+                    'max': max(valores) if valores else 0.0,
+                }
+        return resumen
+
+    def mas_lentos(self, n):
+        """
+        Retorna los nombres de los n archivos con mayor tiempo total de pared.
+        """
+        ordenadas = sorted(self.filas, key=lambda f: f[f"{ETAPA_TOTAL}_wall_s"], reverse=True)
+        return [fila['Archivo'] for fila in ordenadas[:n]]
+
+    def escribir(self, ruta_base):
+        """
+        Escribe '<ruta_base>.csv' (una fila por archivo) y '<ruta_base>.json'
+        (filas + resumen por etapa).
+        Returns:
+            list: Rutas generadas.
+        """
+        ruta_csv = f"{ruta_base}.csv"
+        ruta_json = f"{ruta_base}.json"
+
+        columnas = ['Archivo'] + CONTADORES + [f"{n}_{m}" for n in ETAPAS for m in ('wall_s', 'cpu_s')]
+        with open(ruta_csv, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columnas)
+            writer.writeheader()
+            writer.writerows(self.filas)
+
+        with open(ruta_json, 'w', encoding='utf-8') as f:
+            json.dump({'archivos': self.filas, 'resumen': self.resumen()}, f, ensure_ascii=False, indent=2)
+
+        return [ruta_csv, ruta_json]
+
+    def registrar_resumen_en_log(self):
+        resumen = self.resumen()
+        logger.info(f"Perfil de {len(self.filas)} archivos (pared, segundos):")
+        for nombre in ETAPAS:
+            wall = resumen[nombre]['wall_s']
+            logger.info(f"  {nombre:<22} p50 {wall['p50']:.4f}  p95 {wall['p95']:.4f}  max {wall['max']:.4f}")
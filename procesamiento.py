@@ -6,18 +6,85 @@ Estructura los datos en tres niveles:
 3. Comparación (Lista Maestra Vertical para conciliación con llaves)
 """
 
+import sys
 import logging
+from collections import namedtuple
+from functools import lru_cache
 from utils import limpiar_moneda
 
 logger = logging.getLogger(__name__)
 
+# --- REGISTROS ---
+# Tuplas con nombre (sin __dict__ por fila), en el mismo orden que exportacion.COLUMNAS:
+# los exportadores las escriben tal cual y pandas las convierte sin pasar por dicts.
+
+Item = namedtuple('Item', ['item', 'referencia', 'concepto', 'unidad', 'cantidad', 'tarifa', 'total'])
+
+FilaConcepto = namedtuple('FilaConcepto', [
+    'factura', 'contrato', 'item_id', 'referencia', 'concepto', 'unidad', 'cantidad', 'tarifa', 'total',
+    'nombre_archivo'
+])
+
+FilaGeneral = namedtuple('FilaGeneral', [
+    'nombre_archivo', 'factura', 'cufe', 'contrato',
+    'fecha_expedicion', 'fecha_vencimiento', 'periodo_facturacion',
+    'cliente', 'nit_cliente', 'direccion', 'ciudad', 'email', 'telefono',
+    'total_facturado', 'intereses', 'anticipo', 'total_pagar',
+    'valor_letras', 'medio_pago', 'banco', 'tipo_cuenta', 'num_cuenta',
+    'forma_pago', 'ipp', 'trm', 'observaciones',
+    'items_detectados', 'estado_validacion', 'errores'
+])
+
+FilaComparacion = namedtuple('FilaComparacion', [
+    'factura', 'contrato', 'tipo', 'variable', 'valor_pdf', 'valor_data_lake', 'nombre_archivo'
+])
+
+REGISTROS = {
+    'conceptos': FilaConcepto,
+    'generales': FilaGeneral,
+    'comparacion': FilaComparacion,
+}
+
+# Variables generales que pasan a la hoja Comparación (campo del registro, título)
+CAMPOS_A_COMPARAR = [
+    ('cufe', 'CUFE'), ('fecha_expedicion', 'Fecha Expedición'), ('fecha_vencimiento', 'Fecha Vencimiento'),
+    ('periodo_facturacion', 'Periodo Facturación'), ('cliente', 'Cliente'), ('nit_cliente', 'NIT Cliente'),
+    ('total_facturado', 'Total Facturado (Subtotal)'), ('total_pagar', 'Total a Pagar'),
+    ('anticipo', 'Anticipo/Prepago'), ('banco', 'Banco'), ('num_cuenta', 'No. Cuenta'),
+]
+
+def a_item(item):
+    """
+    Convierte un ítem extraído (dict de extractores) en un registro Item.
+    """
+    return Item(
+        item.get('item', ''), item.get('referencia', ''), item.get('concepto', 'DESCONOCIDO'),
+        item.get('unidad', ''), item.get('cantidad', 0), item.get('tarifa', 0), item.get('total', 0)
+    )
+
+def _internar(valor):
+    """Las llaves repetidas en cada fila (factura, contrato) se guardan una sola vez."""
+    return sys.intern(valor) if isinstance(valor, str) else valor
+
+@lru_cache(maxsize=1024)
+def variables_item(indice):
+    """Nombres internados de las 4 variables de comparación del ítem 'indice'."""
+    prefijo = f"Item {indice}"
+    return tuple(sys.intern(f"{prefijo} - {campo}") for campo in ('Concepto', 'Cantidad', 'Tarifa', 'Total'))
+
 class FacturaProcessor:
     def __init__(self, datos_extraidos):
         """
         Inicializa el procesador con los datos crudos extraídos.
         """
         self.datos_generales = datos_extraidos.get('datos_generales', {})
-        self.items = datos_extraidos.get('items', [])
+        self.items = [a_item(item) for item in datos_extraidos.get('items', [])]
+        # Montos leídos con formato ambiguo ('280.933': miles o decimales), ver numeros
+        self.montos_ambiguos = datos_extraidos.get('montos_ambiguos', [])
+        self.items_ambiguos = [
+            (idx, item.get('ambiguos', ())) for idx, item in enumerate(datos_extraidos.get('items', []), 1)
+            if item.get('ambiguos')
+        ]
         self.errores = []
 
     def validar_datos(self):
@@ -30,7 +97,7 @@ class FacturaProcessor:
 
         # 2. Validar coherencia matemática
         if self.items:
-            suma_items = sum(item.get('total', 0) for item in self.items)
+            suma_items = sum(item.total for item in self.items)
             total_leido = limpiar_moneda(self.datos_generales.get('total_facturado', 0))
             if total_leido == 0:
                 total_leido = limpiar_moneda(self.datos_generales.get('total_pagar', 0))
@@ -40,135 +107,95 @@ class FacturaProcessor:
                 if diferencia > 100: 
                     self.errores.append(f"Diferencia matemática: Suma Items ({suma_items:,.2f}) != Total Leído ({total_leido:,.2f})")
 
+        # 3. Montos ambiguos: un total mal leído cambia la factura en órdenes de magnitud,
+        # así que se pide revisión; una tarifa con 3 decimales es habitual y solo se avisa
+        for campo in self.montos_ambiguos:
+            self.errores.append(f"Monto ambiguo (miles o decimales) en {campo}: se leyó {self.datos_generales.get(campo)}")
+        tarifas_ambiguas = 0
+        for idx, campos in self.items_ambiguos:
+            if 'total' in campos:
+                self.errores.append(f"Monto ambiguo (miles o decimales) en el total del Item {idx}: "
+                                    f"se leyó {self.items[idx - 1].total}")
+            tarifas_ambiguas += 'tarifa' in campos
+        if tarifas_ambiguas:
+            logger.warning(f"Factura {self.datos_generales.get('numero_factura', 'N/A')}: {tarifas_ambiguas} "
+                           f"tarifas con formato ambiguo (miles o decimales), se tomaron como decimales")
+
     def obtener_datos_procesados(self):
         """
         Genera las estructuras de datos para el Excel.
+        Returns:
+            dict: Listas de registros 'conceptos' (FilaConcepto), 'generales' (FilaGeneral)
+            y 'comparacion' (FilaComparacion), y el resumen 'validacion' (dict).
         """
         self.validar_datos()
         dg = self.datos_generales
         
         # Variables clave
-        num_factura = dg.get('numero_factura', '')
-        contrato = dg.get('contrato', '')
+        num_factura = _internar(dg.get('numero_factura', ''))
+        contrato = _internar(dg.get('contrato', ''))
+        # Cada fila lleva el PDF de origen: dos archivos pueden tener el mismo número de factura
+        nombre_archivo = _internar(dg.get('nombre_archivo', ''))
         
         # --- 1. DATASET VERTICAL (CONCEPTOS) ---
-        filas_conceptos = []
         if self.items:
-            for item in self.items:
-                fila = {
-                    'No. Factura': num_factura,
-                    'No. Contrato': contrato,
-                    'Item ID': item.get('item', ''),
-                    'Referencia': item.get('referencia', ''),
-                    'Concepto': item.get('concepto', 'DESCONOCIDO'),
-                    'Unidad': item.get('unidad', ''),
-                    'Cantidad': item.get('cantidad', 0),
-                    'Tarifa': item.get('tarifa', 0),
-                    'Valor Total Item': item.get('total', 0)
-                }
-                filas_conceptos.append(fila)
+            filas_conceptos = [
+                FilaConcepto(num_factura, contrato, *item, nombre_archivo)
+                for item in self.items
+            ]
         else:
-            filas_conceptos.append({
-                'No. Factura': num_factura, 'No. Contrato': contrato,
-                'Item ID': '-', 'Referencia': '-', 'Concepto': 'SIN DETALLE DETECTADO',
-                'Unidad': '-', 'Cantidad': 0, 'Tarifa': 0, 'Valor Total Item': 0
-            })
+            filas_conceptos = [FilaConcepto(
+                num_factura, contrato, '-', '-', 'SIN DETALLE DETECTADO', '-', 0, 0, 0, nombre_archivo
+            )]
 
         # --- 2. DATASET HORIZONTAL (VARIABLES GENERALES) ---
-        fila_general = {
-            'Nombre Archivo': dg.get('nombre_archivo', ''),
-            'No. Factura': num_factura,
-            'CUFE': dg.get('cufe', ''),
-            'No. Contrato': contrato,
-            'Fecha Expedición': dg.get('fecha_expedicion', ''),
-            'Fecha Vencimiento': dg.get('fecha_vencimiento', ''),
-            'Periodo Facturación': dg.get('periodo_facturacion', ''),
-            'Cliente': dg.get('cliente_nombre', ''),
-            'NIT Cliente': dg.get('nit_cliente', ''),
-            'Dirección': dg.get('direccion_cliente', ''),
-            'Ciudad': dg.get('ciudad', ''),
-            'Email': dg.get('email_cliente', ''),
-            'Teléfono': dg.get('telefono_cliente', ''),
-            'Total Facturado (Subtotal)': limpiar_moneda(dg.get('total_facturado', 0)),
-            'Intereses': limpiar_moneda(dg.get('intereses', 0)),
-            'Anticipo/Prepago': limpiar_moneda(dg.get('anticipo', 0)),
-            'Total a Pagar': limpiar_moneda(dg.get('total_pagar', 0)),
-            'Valor en Letras': dg.get('valor_letras', ''),
-            'Medio de Pago': dg.get('medio_pago', ''),
-            'Banco': dg.get('banco', ''),
-            'Tipo Cuenta': dg.get('tipo_cuenta', ''),
-            'No. Cuenta': dg.get('num_cuenta', ''),
-            'Forma de Pago': dg.get('forma_pago', ''),
-            'IPP': dg.get('ipp', ''),
-            'TRM': dg.get('trm', ''),
-            'Observaciones': dg.get('observaciones', ''),
-            'Items Detectados': len(self.items),
-            'Estado Validación': "OK" if not self.errores else "REVISAR",
-            'Errores': "; ".join(self.errores) if self.errores else ""
-        }
+        fila_general = FilaGeneral(
+            nombre_archivo=nombre_archivo,
+            factura=num_factura,
+            cufe=dg.get('cufe', ''),
+            contrato=contrato,
+            fecha_expedicion=dg.get('fecha_expedicion', ''),
+            fecha_vencimiento=dg.get('fecha_vencimiento', ''),
+            periodo_facturacion=dg.get('periodo_facturacion', ''),
+            cliente=dg.get('cliente_nombre', ''),
+            nit_cliente=dg.get('nit_cliente', ''),
+            direccion=dg.get('direccion_cliente', ''),
+            ciudad=dg.get('ciudad', ''),
+            email=dg.get('email_cliente', ''),
+            telefono=dg.get('telefono_cliente', ''),
+            total_facturado=limpiar_moneda(dg.get('total_facturado', 0)),
+            intereses=limpiar_moneda(dg.get('intereses', 0)),
+            anticipo=limpiar_moneda(dg.get('anticipo', 0)),
+            total_pagar=limpiar_moneda(dg.get('total_pagar', 0)),
+            valor_letras=dg.get('valor_letras', ''),
+            medio_pago=dg.get('medio_pago', ''),
+            banco=dg.get('banco', ''),
+            tipo_cuenta=dg.get('tipo_cuenta', ''),
+            num_cuenta=dg.get('num_cuenta', ''),
+            forma_pago=dg.get('forma_pago', ''),
+            ipp=dg.get('ipp', ''),
+            trm=dg.get('trm', ''),
+            observaciones=dg.get('observaciones', ''),
+            items_detectados=len(self.items),
+            estado_validacion="OK" if not self.errores else "REVISAR",
+            errores="; ".join(self.errores) if self.errores else ""
+        )
 
         # --- 3. DATASET COMPARACIÓN (LISTA MAESTRA VERTICAL) ---
-        # Ahora incluye No. Factura y No. Contrato en cada fila para poder consolidar múltiples PDFs
-        filas_comparacion = []
-        
-        # A. Agregar Variables Generales
-        campos_a_comparar = [
-            'CUFE', 'Fecha Expedición', 'Fecha Vencimiento',
-            'Periodo Facturación', 'Cliente', 'NIT Cliente', 'Total Facturado (Subtotal)',
-            'Total a Pagar', 'Anticipo/Prepago', 'Banco', 'No. Cuenta'
+        # Cada fila lleva No. Factura y No. Contrato para poder consolidar múltiples PDFs
+        # A. Variables Generales
+        filas_comparacion = [
+            FilaComparacion(num_factura, contrato, 'General', titulo, getattr(fila_general, campo), '', nombre_archivo)
+            for campo, titulo in CAMPOS_A_COMPARAR
         ]
-        
-        for key in campos_a_comparar:
-            filas_comparacion.append({
-                'No. Factura': num_factura, # <--- LLAVE AGREGADA
-                'No. Contrato': contrato,   # <--- LLAVE AGREGADA
-                'Tipo': 'General',
-                'Variable': key,
-                'Valor PDF': fila_general.get(key, ''),
-                'Valor Data Lake': '' 
-            })
             
-        # B. Agregar Conceptos (Items)
-        if self.items:
-            for idx, item in enumerate(self.items, 1):
-                prefijo = f"Item {idx}"
-                
-                # Concepto
-                filas_comparacion.append({
-                    'No. Factura': num_factura, # <--- LLAVE AGREGADA
-                    'No. Contrato': contrato,   # <--- LLAVE AGREGADA
-                    'Tipo': 'Detalle',
-                    'Variable': f"{prefijo} - Concepto",
-                    'Valor PDF': item.get('concepto', ''),
-                    'Valor Data Lake': ''
-                })
-                # Cantidad
-                filas_comparacion.append({
-                    'No. Factura': num_factura,
-                    'No. Contrato': contrato,
-                    'Tipo': 'Detalle',
-                    'Variable': f"{prefijo} - Cantidad",
-                    'Valor PDF': item.get('cantidad', 0),
-                    'Valor Data Lake': ''
-                })
-                # Tarifa
-                filas_comparacion.append({
-                    'No. Factura': num_factura,
-                    'No. Contrato': contrato,
-                    'Tipo': 'Detalle',
-                    'Variable': f"{prefijo} - Tarifa",
-                    'Valor PDF': item.get('tarifa', 0),
-                    'Valor Data Lake': ''
-                })
-                # Total
-                filas_comparacion.append({
-                    'No. Factura': num_factura,
-                    'No. Contrato': contrato,
-                    'Tipo': 'Detalle',
-                    'Variable': f"{prefijo} - Total",
-                    'Valor PDF': item.get('total', 0),
-                    'Valor Data Lake': ''
-                })
+        # B. Conceptos (Items): concepto, cantidad, tarifa y total de cada uno
+        for idx, item in enumerate(self.items, 1):
+            valores = (item.concepto, item.cantidad, item.tarifa, item.total)
+            filas_comparacion.extend(
+                FilaComparacion(num_factura, contrato, 'Detalle', variable, valor, '', nombre_archivo)
+                for variable, valor in zip(variables_item(idx), valores)
+            )
 
         return {
             'conceptos': filas_conceptos,
@@ -179,4 +206,4 @@ class FacturaProcessor:
                 'errores': self.errores,
                 'factura': num_factura # Para el log
             }
-        }
\ No newline at end of file
+        }
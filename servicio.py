@@ -0,0 +1,382 @@
+"""
+Modo servicio: vigila una bandeja de entrada y procesa cada PDF apenas llega.
+Usa inotify (Linux) para enterarse de los archivos nuevos sin volver a listar el
+directorio, con sondeo periódico como respaldo. Cada PDF se procesa cuando su tamaño
+deja de cambiar, en un pool de procesos; las filas se agregan a una salida rotativa y
+el PDF se mueve a 'procesados/' o, si falló o no pasó la validación, a 'errores/'.
+La caché de extracción (si hay) se desaloja al rotar la salida y al detener el servicio.
+"""
+
+import os
+import sys
+import time
+import ctypes
+import ctypes.util
+import shutil
+import signal
+import struct
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import ejecucion
+import exportacion
+
+logger = logging.getLogger(__name__)
+
+DIRECTORIO_PROCESADOS = "procesados"
+DIRECTORIO_ERRORES = "errores"
+
+ESPERA_ESTABLE_DEFECTO = 2.0    # Segundos sin cambios de tamaño/mtime antes de procesar
+ESPERA_VACIO_DEFECTO = 60.0     # Segundos que un archivo de 0 bytes puede seguir vacío antes de ir a errores/
+INTERVALO_SONDEO_DEFECTO = 2.0  # Segundos entre listados en el modo de sondeo
+ROTAR_MINUTOS_DEFECTO = 60      # Cada cuánto se cierra la salida y se abre una nueva
+
+# Constantes de inotify (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+_EVENTO_INOTIFY = struct.Struct('iIII')
+
+def es_pdf_entrante(nombre):
+    return nombre.lower().endswith('.pdf') and not nombre.startswith('.')
+
+# --- VIGILANCIA DE LA BANDEJA ---
+
+class VigilanteInotify:
+    """
+    Avisa de cada PDF que termina de escribirse o se mueve a la bandeja.
+    Un aviso con nombre None indica que la cola de eventos se desbordó (hay que relistar).
+    """
+    def __init__(self, directorio, al_detectar):
+        self.directorio = directorio
+        self.al_detectar = al_detectar
+        self.fd = None
+        self.loop = None
+
+    def iniciar(self, loop):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 falló")
+        if libc.inotify_add_watch(fd, os.fsencode(self.directorio), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(fd)
+            raise OSError(errno, f"inotify_add_watch falló en {self.directorio}")
+        self.fd = fd
+        self.loop = loop
+        loop.add_reader(fd, self._leer)
+
+    def _leer(self):
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        posicion = 0
+        while posicion + _EVENTO_INOTIFY.size <= len(buffer):
+            _, mascara, _, largo = _EVENTO_INOTIFY.unpack_from(buffer, posicion)
+            posicion += _EVENTO_INOTIFY.size
+            nombre = buffer[posicion:posicion + largo].rstrip(b'\0').decode('utf-8', errors='surrogateescape')
+            posicion += largo
+            if mascara & IN_Q_OVERFLOW:
+                self.al_detectar(None)
+            elif es_pdf_entrante(nombre):
+                self.al_detectar(nombre)
+
+    def detener(self):
+        if self.fd is not None:
+            self.loop.remove_reader(self.fd)
+            os.close(self.fd)
+            self.fd = None
+
+class VigilanteSondeo:
+    """
+    Respaldo sin inotify: lista la bandeja cada 'intervalo' segundos.
+    """
+    def __init__(self, directorio, al_detectar, intervalo=INTERVALO_SONDEO_DEFECTO):
+        self.directorio = directorio
+        self.al_detectar = al_detectar
+        self.intervalo = intervalo
+        self.tarea = None
+
+    def iniciar(self, loop):
+        self.tarea = loop.create_task(self._bucle())
+
+    async def _bucle(self):
+        while True:
+            await asyncio.sleep(self.intervalo)
+            self.al_detectar(None)
+
+    def detener(self):
+        if self.tarea is not None:
+            self.tarea.cancel()
+            self.tarea = None
+
+def crear_vigilante(directorio, al_detectar, intervalo_sondeo=INTERVALO_SONDEO_DEFECTO, loop=None):
+    """
+    Inicia inotify si está disponible; si no, el vigilante por sondeo.
+    """
+    loop = loop or asyncio.get_running_loop()
+    if sys.platform.startswith('linux'):
+        vigilante = VigilanteInotify(directorio, al_detectar)
+        try:
+            vigilante.iniciar(loop)
+            logger.info(f"Vigilando {directorio} con inotify")
+            return vigilante
+        except (OSError, AttributeError) as e:
+            logger.warning(f"inotify no disponible ({e}); se usará sondeo")
+
+    vigilante = VigilanteSondeo(directorio, al_detectar, intervalo_sondeo)
+    vigilante.iniciar(loop)
+    logger.info(f"Vigilando {directorio} por sondeo cada {intervalo_sondeo}s")
+    return vigilante
+
+# --- SALIDA ROTATIVA ---
+
+class SalidaRotativa:
+    """
+    Exportador en streaming que se cierra y se reabre con otro nombre cada cierto tiempo,
+    para que los consolidados cerrados queden disponibles durante el día.
+    Las filas de CSV/JSONL quedan en disco tras cada factura; xlsx y parquet al rotar.
+    """
+    def __init__(self, directorio, formatos, rotar_minutos=ROTAR_MINUTOS_DEFECTO):
+        self.directorio = directorio
+        self.formatos = list(formatos)
+        self.rotar_segundos = rotar_minutos * 60
+        self.exportador = None
+        self.abierto_desde = None
+        self.facturas = 0
+
+    def agregar(self, filas):
+        if self.exportador is None:
+            ruta_base = os.path.join(self.directorio, f"Servicio_Gecelca_{time.strftime('%Y%m%d_%H%M%S')}")
+            self.exportador = exportacion.crear_exportador_streaming(self.formatos, ruta_base)
+            self.abierto_desde = time.monotonic()
+        self.exportador.agregar(filas)
+        self.exportador.vaciar()
+        self.facturas += 1
+
+    def revisar(self):
+        """
+        Rota si la salida actual superó su tiempo de vida.
+        Returns:
+            bool: True si se rotó.
+        """
+        if self.exportador is not None and time.monotonic() - self.abierto_desde >= self.rotar_segundos:
+            self.cerrar()
+            return True
+        return False
+
+    def cerrar(self):
+        if self.exportador is None:
+            return
+        rutas = self.exportador.cerrar()
+        rutas = rutas if isinstance(rutas, list) else [rutas]
+        logger.info(f"Salida cerrada ({self.facturas} facturas): {', '.join(rutas)}")
+        self.exportador = None
+        self.facturas = 0
+
+# --- SERVICIO ---
+
+class ServicioIngesta:
+    """
+    Procesa los PDFs de la bandeja a medida que llegan.
+    Args:
+        funcion: Función de extracción (ruta_pdf, *argumentos_extra) -> datos procesados.
+        construir_filas: (archivo, estado, datos) -> dict de filas para el exportador.
+        argumentos_extra (tuple): Argumentos adicionales para 'funcion' (p. ej. caché y opciones).
+        almacen: AlmacenResultados opcional; cada factura se confirma en SQLite al llegar.
+        cache: CacheExtraccion opcional (la misma de argumentos_extra) que se desaloja al
+            rotar la salida, para respetar su tamaño máximo en un proceso sin fin.
+        espera_vacio: Segundos que un PDF de 0 bytes puede seguir vacío antes de ir a errores/.
+    """
+    def __init__(self, funcion, construir_filas, directorio_entrada, directorio_salida, workers=1,
+                 formatos=('xlsx',), argumentos_extra=(), espera_estable=ESPERA_ESTABLE_DEFECTO,
+                 intervalo_sondeo=INTERVALO_SONDEO_DEFECTO, rotar_minutos=ROTAR_MINUTOS_DEFECTO,
+                 almacen=None, cache=None, espera_vacio=ESPERA_VACIO_DEFECTO):
+        self.funcion = funcion
+        self.construir_filas = construir_filas
+        self.directorio_entrada = directorio_entrada
+        self.directorio_salida = directorio_salida
+        self.workers = max(1, int(workers))
+        self.argumentos_extra = tuple(argumentos_extra)
+        self.espera_estable = espera_estable
+        self.espera_vacio = espera_vacio
+        self.intervalo_sondeo = intervalo_sondeo
+        self.salida = SalidaRotativa(directorio_salida, formatos, rotar_minutos)
+        self.almacen = almacen
+        self.cache = cache
+        self.en_curso = set()
+        self.tareas = set()
+        self.executor = None
+        self.cupos = None
+        self.detenido = None
+        self.exitosos = 0
+        self.fallidos = 0
+
+    def _detectar(self, nombre):
+        """
+        Callback de los vigilantes. None = relistar la bandeja (arranque, desborde o sondeo).
+        """
+        if self.detenido.is_set():
+            return
+        if nombre is None:
+            try:
+                with os.scandir(self.directorio_entrada) as entradas:
+                    nombres = [e.name for e in entradas if es_pdf_entrante(e.name) and e.is_file()]
+            except OSError as e:
+                logger.error(f"No se pudo listar {self.directorio_entrada}: {e}")
+                return
+            for n in nombres:
+                self._detectar(n)
+            return
+
+        if nombre in self.en_curso:
+            return
+        self.en_curso.add(nombre)
+        tarea = asyncio.get_running_loop().create_task(self._atender(nombre))
+        self.tareas.add(tarea)
+        tarea.add_done_callback(self.tareas.discard)
+
+    async def _esperar_estable(self, ruta):
+        """
+        Espera a que el tamaño y la fecha de modificación no cambien durante 'espera_estable'
+        (un archivo vacío, hasta 'espera_vacio': puede que aún no se haya empezado a copiar).
+        Returns:
+            int: Tamaño final del archivo (0 si siguió vacío), o None si desapareció.
+        """
+        anterior = None
+        estable_desde = time.monotonic()
+        while True:
+            try:
+                estado = os.stat(ruta)
+            except FileNotFoundError:
+                return None
+            firma = (estado.st_size, estado.st_mtime_ns)
+            if firma != anterior:
+                anterior = firma
+                estable_desde = time.monotonic()
+            else:
+                quieto = time.monotonic() - estable_desde
+                if quieto >= self.espera_estable and (estado.st_size > 0 or quieto >= self.espera_vacio):
+                    return estado.st_size
+            await asyncio.sleep(min(0.5, self.espera_estable / 2) or 0.1)
+
+    async def _atender(self, nombre):
+        ruta = os.path.join(self.directorio_entrada, nombre)
+        try:
+            tamano = await self._esperar_estable(ruta)
+            if tamano is None:
+                return
+
+            llegada = time.monotonic()
+            if tamano == 0:
+                estado, datos = ejecucion.ESTADO_ERROR, f"Archivo vacío después de {self.espera_vacio:g}s"
+            else:
+                async with self.cupos:
+                    estado, datos = await self._ejecutar(ruta)
+
+            filas = self.construir_filas(nombre, estado, datos)
+            self.salida.agregar(filas)
+            if self.almacen is not None:
+                self.almacen.agregar(filas)
+                self.almacen.vaciar()
+
+            # A 'errores/' van los que fallaron y los que no pasaron la validación
+            # (sus filas quedan igual en la salida, con el detalle en Log_Proceso)
+            exito = estado == ejecucion.ESTADO_OK and bool(datos) and datos['validacion'].get('es_valida', False)
+            destino = DIRECTORIO_PROCESADOS if exito else DIRECTORIO_ERRORES
+            self._mover(ruta, destino)
+            if exito:
+                self.exitosos += 1
+            else:
+                self.fallidos += 1
+            logger.info(f"{nombre}: {estado} en {time.monotonic() - llegada:.2f}s -> {destino}/")
+        except Exception as e:
+            logger.error(f"Error atendiendo {nombre}: {e}", exc_info=True)
+        finally:
+            self.en_curso.discard(nombre)
+
+    async def _ejecutar(self, ruta):
+        """
+        Ejecuta la extracción en el pool. Si un trabajador muere el pool queda roto:
+        se recrea y solo falla este PDF.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            datos = await loop.run_in_executor(executor, self.funcion, ruta, *self.argumentos_extra)
+            return ejecucion.ESTADO_OK, datos
+        except BrokenProcessPool as e:
+            if self.executor is executor:
+                logger.error("El pool de extracción se rompió; se crea uno nuevo")
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            return ejecucion.ESTADO_CAIDA, f"Proceso trabajador terminó inesperadamente: {e}"
+        except Exception as e:
+            return ejecucion.ESTADO_ERROR, f"{type(e).__name__}: {e}"
+
+    async def _desalojar_cache(self):
+        """
+        Desaloja la caché fuera del bucle de eventos (recorre todo su directorio).
+        """
+        if self.cache is None:
+            return
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.cache.desalojar)
+        except OSError as e:
+            logger.warning(f"No se pudo desalojar la caché: {e}")
+
+    def _mover(self, ruta, subdirectorio):
+        destino_dir = os.path.join(self.directorio_entrada, subdirectorio)
+        os.makedirs(destino_dir, exist_ok=True)
+        destino = os.path.join(destino_dir, os.path.basename(ruta))
+        if os.path.exists(destino):
+            base, extension = os.path.splitext(os.path.basename(ruta))
+            destino = os.path.join(destino_dir, f"{base}_{time.strftime('%Y%m%d_%H%M%S')}{extension}")
+        shutil.move(ruta, destino)
+
+    async def ejecutar(self):
+        """
+        Bucle principal: corre hasta SIGINT/SIGTERM y luego termina lo que esté en curso.
+        """
+        loop = asyncio.get_running_loop()
+        self.detenido = asyncio.Event()
+        for senal in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(senal, self.detenido.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        os.makedirs(self.directorio_salida, exist_ok=True)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.cupos = asyncio.Semaphore(self.workers * 2)
+
+        vigilante = crear_vigilante(self.directorio_entrada, self._detectar, self.intervalo_sondeo, loop)
+        # Los PDFs que llegaron mientras el servicio estaba detenido
+        self._detectar(None)
+
+        try:
+            while not self.detenido.is_set():
+                try:
+                    await asyncio.wait_for(self.detenido.wait(), timeout=5)
+                except asyncio.TimeoutError:
+                    if self.salida.revisar():
+                        await self._desalojar_cache()
+        finally:
+            logger.info("Deteniendo servicio...")
+            vigilante.detener()
+            if self.tareas:
+                await asyncio.gather(*self.tareas, return_exceptions=True)
+            self.salida.cerrar()
+            await self._desalojar_cache()
+            self.executor.shutdown(wait=True)
+            logger.info(f"Servicio detenido: {self.exitosos} procesados, {self.fallidos} fallidos")
+
+def ejecutar_servicio(*args, **kwargs):
+    """
+    Crea un ServicioIngesta (mismos argumentos) y lo ejecuta hasta recibir SIGINT/SIGTERM.
+    """
+    servicio = ServicioIngesta(*args, **kwargs)
+    asyncio.run(servicio.ejecutar())
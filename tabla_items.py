@@ -0,0 +1,179 @@
+"""
+Motor de la tabla de ítems por columnas.
+Ubica las columnas una sola vez por tabla a partir de la fila de encabezado
+(títulos de COLUMNAS_TABLA_ITEMS) y asigna cada palabra de las filas siguientes a
+su columna según la coordenada X, en lugar de desarmar el texto plano token a token.
+Requiere líneas con celdas (extractores_pdf.Fila); si no las hay, o el encabezado no
+permite ubicar las columnas, el llamador usa el parser por tokens.
+"""
+
+import re
+import bisect
+import logging
+from extractores_patrones import COLUMNAS_TABLA_ITEMS
+from utils import limpiar_cantidad, es_numero_valido
+from numeros import interpretar_valor, FORMATO_AMBIGUO
+
+logger = logging.getLogger(__name__)
+
+# Holguras en anchos de carácter (estimados a partir del encabezado)
+HOLGURA_COLUMNA = 1.5   # Cuánto puede empezar una celda antes del título de su columna
+MARGEN_TABLA = 4.0      # Margen a la izquierda de la primera columna; más allá, fuera de la tabla
+MARGEN_TABLA_DERECHA = 8.0  # Margen tras el título de la última columna (los montos lo desbordan)
+
+CAMPOS_REQUERIDOS_TABLA = ('concepto', 'total')
+
+CONVERSORES_NUMERICOS = {
+    'cantidad': limpiar_cantidad,
+    'tarifa': interpretar_valor,
+    'total': interpretar_valor,
+}
+# Montos cuyo formato ambiguo ('280.933') se anota en item['ambiguos']
+CAMPOS_MONTO = ('tarifa', 'total')
+
+# Marca de las filas sin ninguna palabra dentro de la tabla (se descartan)
+FUERA_DE_TABLA = object()
+# Marca de la fila de totales al pie de la tabla: las filas siguientes ya no son ítems
+FIN_DE_TABLA = object()
+
+# Concepto de una fila de totales sin número de ítem: 'TOTAL', 'Subtotal:', 'Total general'...
+_ETIQUETA_TOTALES = re.compile(r'^(?:sub\s*)?totale?s?\b', re.IGNORECASE)
+
+_PALABRA = re.compile(r'\S+')
+_DIGITOS_ESPACIADOS = re.compile(r'^[\d.,$]( [\d.,$])+$')
+
+def palabras_con_posicion(celdas):
+    """
+    Divide las celdas (texto, x0, x1) en palabras con su rango X estimado
+    (proporcional a la posición del carácter dentro de la celda).
+    """
+    palabras = []
+    for texto, x0, x1 in celdas:
+        if ' ' not in texto:
+            palabras.append((texto, x0, x1))
+            continue
+        ancho = (x1 - x0) / len(texto)
+        for m in _PALABRA.finditer(texto):
+            palabras.append((m.group(), x0 + m.start() * ancho, x0 + m.end() * ancho))
+    return palabras
+
+def es_numero_celda(texto):
+    """
+    Un valor numérico de celda: un solo número, o un número con los dígitos
+    separados por espacios ('2 9 , 7 6 0'). Dos números juntos no son válidos
+    (señal de que una celda invadió la columna vecina).
+    """
+    texto = texto.replace('$ ', '$')
+    if ' ' in texto and not _DIGITOS_ESPACIADOS.match(texto):
+        return False
+    return es_numero_valido(texto)
+
+class ColumnasTabla:
+    """
+    Columnas de una tabla de ítems: campo de cada columna (de izquierda a derecha)
+    y la coordenada X donde empieza cada una.
+    """
+    def __init__(self, campos, inicios, x_minimo, x_maximo=float('inf')):
+        self.campos = campos
+        self.inicios = inicios  # Inicio de las columnas 2..n (para bisect)
+        self.x_minimo = x_minimo
+        self.x_maximo = x_maximo
+
+    @classmethod
+    def desde_encabezado(cls, fila):
+        """
+        Construye las columnas a partir de la fila de encabezado.
+        Returns:
+            ColumnasTabla o None si la fila no trae celdas o no se reconocen
+            las columnas requeridas (CAMPOS_REQUERIDOS_TABLA).
+        """
+        celdas = getattr(fila, 'celdas', None)
+        if not celdas:
+            return None
+
+        palabras = palabras_con_posicion(celdas)
+        normalizadas = [p[0].lower().strip('.:') for p in palabras]
+
+        # 1. Ubicar los títulos (primero los de dos palabras)
+        titulos = []
+        i = 0
+        while i < len(palabras):
+            if i + 1 < len(palabras):
+                doble = f"{normalizadas[i]} {normalizadas[i + 1]}"
+                if doble in COLUMNAS_TABLA_ITEMS:
+                    titulos.append((palabras[i][1], palabras[i + 1][2], COLUMNAS_TABLA_ITEMS[doble]))
+                    i += 2
+                    continue
+            if normalizadas[i] in COLUMNAS_TABLA_ITEMS:
+                titulos.append((palabras[i][1], palabras[i][2], COLUMNAS_TABLA_ITEMS[normalizadas[i]]))
+            i += 1
+
+        campos = [t[2] for t in titulos]
+        if len(set(campos)) != len(campos) or not all(c in campos for c in CAMPOS_REQUERIDOS_TABLA):
+            return None
+
+        # 2. Límites de columna (en anchos de carácter del encabezado)
+        caracteres = sum(len(p[0]) for p in palabras)
+        ancho_caracter = sum(p[2] - p[1] for p in palabras) / caracteres if caracteres else 0.0
+
+        titulos.sort()
+        inicios = [t[0] - HOLGURA_COLUMNA * ancho_caracter for t in titulos[1:]]
+        x_minimo = titulos[0][0] - MARGEN_TABLA * ancho_caracter
+        x_maximo = max(t[1] for t in titulos) + MARGEN_TABLA_DERECHA * ancho_caracter
+        return cls([t[2] for t in titulos], inicios, x_minimo, x_maximo)
+
+    def parsear_fila(self, fila):
+        """
+        Interpreta una fila de la tabla asignando cada palabra a su columna.
+        Returns:
+            dict: El ítem (mismas claves que extractores.parsear_linea_item),
+            FUERA_DE_TABLA si ninguna palabra cae dentro de la tabla, FIN_DE_TABLA
+            si es la fila de totales del pie, o None si la fila no forma un ítem
+            válido por columnas.
+        """
+        celdas = getattr(fila, 'celdas', None)
+        if not celdas:
+            return None
+
+        valores = [[] for _ in self.campos]
+        dentro = False
+        for texto, x0, x1 in palabras_con_posicion(celdas):
+            centro = (x0 + x1) / 2
+            if centro < self.x_minimo or centro > self.x_maximo:
+                continue
+            dentro = True
+            valores[bisect.bisect_right(self.inicios, centro)].append(texto)
+
+        if not dentro:
+            return FUERA_DE_TABLA
+
+        item = {
+            'item': '', 'referencia': '', 'concepto': '',
+            'unidad': '', 'cantidad': 0, 'tarifa': 0, 'total': 0
+        }
+        for campo, palabras in zip(self.campos, valores):
+            if not palabras:
+                continue
+            texto = " ".join(palabras)
+            conversor = CONVERSORES_NUMERICOS.get(campo)
+            if conversor is not None:
+                if not es_numero_celda(texto):
+                    return None
+                valor = conversor(texto)
+                if campo in CAMPOS_MONTO:
+                    if valor.formato == FORMATO_AMBIGUO:
+                        item.setdefault('ambiguos', []).append(campo)
+                    valor = valor.valor
+                item[campo] = valor
+            else:
+                item[campo] = texto
+
+        item['concepto'] = item['concepto'].strip(" .-,:")
+        if not item['item'] and _ETIQUETA_TOTALES.match(item['concepto']):
+            return FIN_DE_TABLA
+        if item['total'] <= 0 or len(item['concepto']) < 2:
+            return None
+        if item['item'] and not (item['item'].isdigit() and len(item['item']) <= 3):
+            return None
+
+        return item
@@ -0,0 +1,17 @@
+"""
+Configuración común de las pruebas. Uso (desde la raíz del repositorio):
+
+    python -m pytest -q
+"""
+
+import os
+import sys
+import logging
+
+# Los módulos del proyecto son planos: la raíz del repositorio va en sys.path
+RAIZ_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ_REPO not in sys.path:
+    sys.path.insert(0, RAIZ_REPO)
+
+# Con el logging ya configurado, importar main no agrega el procesador_consolidado.log
+logging.basicConfig(level=logging.INFO, handlers=[logging.NullHandler()])
@@ -0,0 +1,146 @@
+"""
+Pruebas del almacén SQLite de resultados (almacen_resultados.AlmacenResultados).
+"""
+
+import csv
+import sqlite3
+import pytest
+import almacen_resultados
+from almacen_resultados import AlmacenResultados, nombre_sql, rango_mes
+from exportacion import COLUMNAS
+
+def _factura(hash_pdf, factura, contrato='GC-1', fecha='2026-01-11', nit='900-1', archivo=None, items=2):
+    """Filas de una factura como las arma main.construir_filas (dicts por título de columna)."""
+    archivo = archivo or f"FE_{factura}.pdf"
+    return {
+        'hash_pdf': hash_pdf,
+        'generales': [{'Nombre Archivo': archivo, 'No. Factura': factura, 'No. Contrato': contrato,
+                       'Fecha Expedición': fecha, 'NIT Cliente': nit, 'Total a Pagar': '1,000',
+                       'Items Detectados': items}],
+        'conceptos': [{'No. Factura': factura, 'No. Contrato': contrato, 'Item': str(i), 'Concepto': f"C{i}",
+                       'Valor Total Item': 500.0, 'Nombre Archivo': archivo} for i in range(1, items + 1)],
+        'comparacion': [{'No. Factura': factura, 'No. Contrato': contrato, 'Tipo': 'General',
+                         'Variable': 'Total a Pagar', 'Valor PDF': 1000.0, 'Nombre Archivo': archivo}],
+        'validacion': [{'Fecha Proceso': '2026-02-01 10:00:00', 'Archivo': archivo, 'No. Factura': factura,
+                        'Es Válida': 'SÍ', 'Errores': 'Ninguno'}],
+    }
+
+def _fallida(archivo):
+    return {'validacion': [{'Fecha Proceso': '2026-02-01 10:00:00', 'Archivo': archivo,
+                            'Es Válida': 'ERROR CRÍTICO', 'Errores': 'Fallo en lectura del archivo'}]}
+
+def _columna(almacen, clave, columna, **filtros):
+    indice = COLUMNAS[clave].index(columna)
+    return [fila[indice] for fila in almacen.iterar_filas(clave, **filtros)]
+
+def test_nombres_y_meses():
+    assert nombre_sql('Total Facturado (Subtotal)') == 'total_facturado_subtotal'
+    assert nombre_sql('Fecha Expedición') == 'fecha_expedicion'
+    assert rango_mes('2026-12') == ('2026-12-01', '2027-01-01')
+    for mes in ('2026-13', '2026-1', 'enero'):
+        with pytest.raises(ValueError):
+            rango_mes(mes)
+
+def test_upsert_por_pdf(tmp_path):
+    almacen = AlmacenResultados(str(tmp_path / 'r.db'))
+    almacen.agregar(_factura('h1', '100', items=3))
+    almacen.agregar(_factura('h2', '100', archivo='copia.pdf'))  # Otro PDF, misma factura
+    # Reprocesar h1 reemplaza todas sus filas
+    almacen.agregar(_factura('h1', '100', contrato='GC-9', items=1))
+
+    assert almacen.contar_facturas() == 2
+    assert sorted(_columna(almacen, 'generales', 'No. Contrato')) == ['GC-1', 'GC-9']
+    assert sorted(_columna(almacen, 'conceptos', 'Nombre Archivo')) == ['FE_100.pdf', 'copia.pdf', 'copia.pdf']
+    assert len(list(almacen.iterar_filas('comparacion'))) == 2
+    assert len(list(almacen.iterar_filas('validacion'))) == 2
+    # Tipado como en los formatos columnares
+    assert _columna(almacen, 'generales', 'Total a Pagar') == [1000.0, 1000.0]
+    assert almacen.cerrar() == str(tmp_path / 'r.db')
+    assert almacen.facturas_guardadas == 3
+
+def test_pdf_fallido_se_reemplaza_al_leerse(tmp_path):
+    almacen = AlmacenResultados(str(tmp_path / 'r.db'))
+    almacen.agregar(_fallida('FE_100.pdf'))
+    almacen.agregar(_fallida('FE_100.pdf'))
+    assert _columna(almacen, 'validacion', 'Es Válida') == ['ERROR CRÍTICO']
+
+    almacen.agregar(_factura('h1', '100'))
+    assert _columna(almacen, 'validacion', 'Es Válida') == ['SÍ']
+    almacen.cerrar()
+
+def test_escrituras_por_transaccion(tmp_path):
+    ruta = str(tmp_path / 'r.db')
+    almacen = AlmacenResultados(ruta, facturas_por_transaccion=2)
+    lector = sqlite3.connect(ruta)
+    contar = lambda: lector.execute("SELECT COUNT(*) FROM facturas").fetchone()[0]
+
+    almacen.agregar(_factura('h1', '1'))
+    assert contar() == 0
+    almacen.agregar(_factura('h2', '2'))
+    assert contar() == 2
+    almacen.agregar(_factura('h3', '3'))
+    almacen.cerrar()
+    assert contar() == 3
+    lector.close()
+
+def _almacen_con_facturas(tmp_path):
+    almacen = AlmacenResultados(str(tmp_path / 'r.db'))
+    almacen.agregar(_factura('h1', '1', contrato='A', fecha='2026-01-31', nit='N1'))
+    almacen.agregar(_factura('h2', '2', contrato='B', fecha='2026-02-01', nit='N1'))
+    almacen.agregar(_factura('h3', '3', contrato='A', fecha='2026-01-01', nit='N2', items=3))
+    almacen.agregar(_factura('h4', '4', contrato='A', fecha='2025-12-31', nit='N1'))
+    return almacen
+
+def test_consultas_filtradas(tmp_path):
+    almacen = _almacen_con_facturas(tmp_path)
+    facturas = lambda clave='generales', **f: _columna(almacen, clave, 'No. Factura', **f)
+
+    # Ordenadas por fecha de expedición
+    assert facturas() == ['4', '3', '1', '2']
+    assert facturas(contrato='A') == ['4', '3', '1']
+    assert facturas(mes='2026-01') == ['3', '1']
+    assert facturas(nit='N1', mes='2026-01') == ['1']
+    assert facturas(factura='2') == ['2']
+    assert facturas(contrato='Z') == []
+    # Los demás datasets siguen el filtro de su factura
+    assert facturas('conceptos', mes='2026-01') == ['3', '3', '3', '1', '1']
+    assert facturas('validacion', contrato='B') == ['2']
+    assert almacen.contar_facturas(contrato='A', nit='N1') == 2
+    with pytest.raises(ValueError):
+        almacen.contar_facturas(mes='2026-1')
+    almacen.cerrar()
+
+def test_exportar_consulta(tmp_path):
+    almacen = _almacen_con_facturas(tmp_path)
+    rutas = almacen.exportar_consulta(['csv', 'xlsx'], str(tmp_path / 'consulta'), mes='2026-01')
+    assert rutas[0] == str(tmp_path / 'consulta_conceptos.csv') and rutas[-1] == str(tmp_path / 'consulta.xlsx')
+
+    with open(tmp_path / 'consulta_generales.csv', encoding='utf-8', newline='') as f:
+        generales = list(csv.DictReader(f))
+    assert list(generales[0]) == COLUMNAS['generales']
+    assert [(g['No. Factura'], g['Fecha Expedición']) for g in generales] == [('3', '2026-01-01'), ('1', '2026-01-31')]
+    with open(tmp_path / 'consulta_conceptos.csv', encoding='utf-8', newline='') as f:
+        assert len(list(csv.DictReader(f))) == 5
+    almacen.cerrar()
+
+def test_migra_un_esquema_anterior(tmp_path):
+    ruta = str(tmp_path / 'r.db')
+    AlmacenResultados(ruta).cerrar()
+    # Versión 1: conceptos y comparacion sin 'Nombre Archivo'
+    conexion = sqlite3.connect(ruta)
+    for tabla in ('conceptos', 'comparacion'):
+        conexion.execute(f"ALTER TABLE {tabla} DROP COLUMN nombre_archivo")
+    conexion.execute("PRAGMA user_version = 1")
+    conexion.commit()
+    conexion.close()
+
+    almacen = AlmacenResultados(ruta)
+    almacen.agregar(_factura('h1', '1'))
+    assert _columna(almacen, 'conceptos', 'Nombre Archivo') == ['FE_1.pdf', 'FE_1.pdf']
+    almacen.cerrar()
+
+    conexion = sqlite3.connect(ruta)
+    conexion.execute(f"PRAGMA user_version = {almacen_resultados.VERSION_ESQUEMA + 1}")
+    conexion.close()
+    with pytest.raises(ValueError):
+        AlmacenResultados(ruta)
@@ -0,0 +1,150 @@
+"""
+Pruebas del modo API (api.ServidorExtraccion) contra un servidor real en localhost.
+"""
+
+import os
+import json
+import time
+import base64
+import pathlib
+import threading
+import contextlib
+import urllib.error
+import urllib.request
+import api
+import main
+import cache_extraccion
+from benchmarks import generador
+
+@contextlib.contextmanager
+def _servidor(argumentos_extra=(None, None), **opciones):
+    extraccion = api.ServidorExtraccion(main.procesar_pdf_a_datos, argumentos_extra, **opciones)
+    httpd = extraccion.servir(puerto=0)
+    hilo = threading.Thread(target=httpd.serve_forever, daemon=True)
+    hilo.start()
+    try:
+        yield extraccion, f"http://127.0.0.1:{httpd.server_address[1]}"
+    finally:
+        httpd.shutdown()
+        extraccion.cerrar()
+        hilo.join()
+
+def _pedir(url, cuerpo=None, cabeceras=None):
+    """
+    Returns:
+        tuple: (código HTTP, cabeceras, JSON de la respuesta).
+    """
+    solicitud = urllib.request.Request(url, data=cuerpo, headers=cabeceras or {},
+                                       method='POST' if cuerpo is not None else 'GET')
+    try:
+        with urllib.request.urlopen(solicitud, timeout=30) as respuesta:
+            return respuesta.status, respuesta.headers, json.loads(respuesta.read())
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, json.loads(e.read())
+
+def _pdfs(tmp_path, cantidad):
+    rutas = generador.generar_lote(str(tmp_path / 'pdfs'), cantidad, items=(2, 5), paginas_anexo=(0, 0))
+    return [(os.path.basename(r), pathlib.Path(r).read_bytes()) for r in rutas]
+
+def _multipart(documentos, limite='limite-prueba'):
+    partes = []
+    for nombre, contenido in documentos:
+        partes.append(
+            f'--{limite}\r\nContent-Disposition: form-data; name="archivos"; filename="{nombre}"\r\n'
+            f'Content-Type: application/pdf\r\n\r\n'.encode() + contenido + b'\r\n'
+        )
+    cuerpo = b''.join(partes) + f'--{limite}--\r\n'.encode()
+    return cuerpo, {'Content-Type': f'multipart/form-data; boundary={limite}'}
+
+def test_extraer_responde_los_datasets(tmp_path):
+    (nombre, contenido), = _pdfs(tmp_path, 1)
+    with _servidor() as (_, url):
+        codigo, _, respuesta = _pedir(f"{url}/extraer?nombre=../{nombre}", contenido,
+                                      {'Content-Type': 'application/pdf'})
+
+    assert codigo == 200
+    assert respuesta['archivo'] == nombre and respuesta['estado'] == 'OK'
+    general, = respuesta['datos']['generales']
+    assert general['No. Factura'] == '100000' and general['Nombre Archivo'] == nombre
+    assert {fila['No. Factura'] for fila in respuesta['datos']['conceptos']} == {'100000'}
+    assert respuesta['datos']['comparacion']
+
+def test_lote_json_y_multipart(tmp_path):
+    documentos = _pdfs(tmp_path, 3)
+    cuerpo_json = json.dumps({'archivos': [
+        {'nombre': nombre, 'contenido_base64': base64.b64encode(contenido).decode('ascii')}
+        for nombre, contenido in documentos
+    ]}).encode()
+
+    with _servidor(workers=2) as (_, url):
+        for cuerpo, cabeceras in [(cuerpo_json, {'Content-Type': 'application/json'}), _multipart(documentos)]:
+            codigo, _, respuesta = _pedir(f"{url}/lote", cuerpo, cabeceras)
+            assert codigo == 200
+            resultados = respuesta['resultados']
+            # Mismo orden que el lote
+            assert [r['archivo'] for r in resultados] == [nombre for nombre, _ in documentos]
+            assert [r['datos']['generales'][0]['No. Factura'] for r in resultados] == ['100000', '100001', '100002']
+
+def test_cola_llena_responde_503_y_lote_excesivo_413(tmp_path):
+    documentos = _pdfs(tmp_path, 3)
+    with _servidor(workers=1, cola_maxima=1) as (extraccion, url):
+        assert extraccion.capacidad == 2
+
+        # Un lote mayor que la capacidad nunca cabrá: no se invita a reintentar
+        cuerpo, cabeceras = _multipart(documentos)
+        codigo, respuesta_cabeceras, respuesta = _pedir(f"{url}/lote", cuerpo, cabeceras)
+        assert codigo == 413 and respuesta['maximo'] == 2
+        assert respuesta_cabeceras.get('Retry-After') is None
+
+        # Con el cupo ocupado, la solicitud se rechaza con Retry-After
+        assert extraccion.reservar(2)
+        try:
+            codigo, respuesta_cabeceras, _ = _pedir(f"{url}/extraer?nombre=a.pdf", documentos[0][1])
+        finally:
+            for _ in range(2):
+                extraccion.cupos.release()
+                extraccion.metricas.completar('OK', 0.0)
+        assert codigo == 503 and respuesta_cabeceras['Retry-After'] == '1'
+
+        # Liberado el cupo, la misma solicitud se atiende
+        codigo, _, _ = _pedir(f"{url}/extraer?nombre=a.pdf", documentos[0][1])
+        assert codigo == 200
+
+        codigo, _, metricas = _pedir(f"{url}/metrics")
+
+    assert codigo == 200
+    assert metricas['capacidad'] == 2 and metricas['en_curso'] == 0
+    assert metricas['aceptadas'] == 3 and metricas['rechazadas'] == 1
+    assert metricas['completadas'] == {'OK': 3}
+    assert metricas['latencia_s']['muestras'] == 3
+
+def test_ruta_desconocida_y_cuerpo_vacio():
+    with _servidor() as (_, url):
+        assert _pedir(f"{url}/salud")[2] == {'estado': 'ok'}
+        assert _pedir(f"{url}/otra")[0] == 404
+        assert _pedir(f"{url}/extraer", b'')[0] == 400
+
+def _cache_llena(tmp_path, entradas=5):
+    cache = cache_extraccion.CacheExtraccion(str(tmp_path / 'cache'), tamano_maximo=0)
+    cache.preparar()
+    for indice in range(entradas):
+        cache.guardar(f"{indice:064x}", {'items': [indice]})
+    return cache
+
+def _entradas(cache):
+    return sum(len(archivos) for _, _, archivos in os.walk(cache.directorio_version))
+
+def test_el_servidor_desaloja_la_cache_mientras_atiende(tmp_path):
+    cache = _cache_llena(tmp_path)
+    (nombre, contenido), = _pdfs(tmp_path, 1)
+    with _servidor((cache, None), cache=cache, intervalo_desalojo=0.05) as (_, url):
+        # Sin solicitudes no se recorre la caché
+        time.sleep(0.2)
+        assert _entradas(cache) == 5
+
+        assert _pedir(f"{url}/extraer?nombre={nombre}", contenido)[0] == 200
+
+        limite = time.monotonic() + 5
+        while _entradas(cache) and time.monotonic() < limite:
+            time.sleep(0.02)
+        assert _entradas(cache) == 0
@@ -0,0 +1,24 @@
+"""
+El arranque de la CLI no debe cargar las dependencias pesadas (ver benchmarks/arranque.py):
+pandas y openpyxl solo se importan al exportar o conciliar.
+"""
+
+import os
+import sys
+import json
+import subprocess
+from benchmarks import arranque
+
+def test_importar_main_no_carga_dependencias_pesadas(tmp_path):
+    codigo = (
+        "import sys, json, main, extractores; "
+        "print(json.dumps(sorted({m.split('.')[0] for m in sys.modules})))"
+    )
+    rutas = [arranque.RAIZ_REPO, os.environ.get('PYTHONPATH')]
+    entorno = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, rutas)))
+    # cwd aparte: main configura un log en el directorio actual al importarse
+    resultado = subprocess.run([sys.executable, '-c', codigo], cwd=tmp_path, env=entorno,
+                               capture_output=True, text=True, check=True)
+    modulos = set(json.loads(resultado.stdout.splitlines()[-1]))
+    assert 'main' in modulos and 'extractores' in modulos
+    assert not modulos & set(arranque.MODULOS_PESADOS)
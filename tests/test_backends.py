@@ -0,0 +1,35 @@
+"""
+Pruebas de paridad entre los backends de texto de extractores_pdf.
+"""
+
+import extractores
+import extractores_pdf
+from benchmarks import generador
+
+def test_backends_extraen_lo_mismo(tmp_path):
+    rutas = generador.generar_lote(str(tmp_path), 6, items=(1, 60), paginas_anexo=(0, 2), semilla=3)
+    backends = [b for b in extractores_pdf.backends_disponibles() if b != 'pdfminer']
+    assert 'rapido' in backends
+
+    for ruta in rutas:
+        referencia = extractores.extraer_datos_factura(ruta)
+        assert referencia['items'] and referencia['datos_generales']
+        for backend in backends:
+            assert extractores_pdf.comparar_backends(ruta, backend_b=backend)['identicos'], (ruta, backend)
+            assert extractores.extraer_datos_factura(ruta, {'backend': backend}) == referencia, (ruta, backend)
+
+def test_max_paginas_se_aplica_despues_de_la_seleccion(tmp_path):
+    ruta = str(tmp_path / 'anexos.pdf')
+    assert generador.generar_factura(ruta, 1, items=5, paginas_anexo=4)['paginas'] == 5
+
+    casos = [
+        ({'paginas': [3, 4], 'max_paginas': 2}, [3, 4]),
+        ({'paginas': [4, 2, 3], 'max_paginas': 1}, [2]),
+        ({'paginas': [4, 9]}, [4]),
+        ({'max_paginas': 2}, [1, 2]),
+    ]
+    for backend in extractores_pdf.backends_disponibles():
+        for opciones, esperadas in casos:
+            datos = extractores_pdf.extraer_datos_estructurados(ruta, backend=backend, **opciones)
+            assert sorted(datos) == esperadas, (backend, opciones)
+            assert all(datos[p] for p in esperadas), (backend, opciones)
@@ -0,0 +1,70 @@
+"""
+Pruebas de la suite de benchmarks: el generador de facturas sintéticas y el
+resumen / comparación de resultados (benchmarks.ejecutar).
+"""
+
+import json
+import extractores_pdf
+import main
+from benchmarks import generador, ejecutar
+
+def test_factura_generada_se_extrae_con_sus_valores(tmp_path):
+    ruta = str(tmp_path / 'f.pdf')
+    # Suficientes ítems para que la tabla continúe en una segunda página, más un anexo
+    esperado = generador.generar_factura(ruta, 123456, items=60, paginas_anexo=1, semilla=5)
+    assert esperado['paginas'] == 3
+    assert len(extractores_pdf.extraer_datos_estructurados(ruta)) == esperado['paginas']
+
+    datos = main.procesar_pdf_a_datos(ruta)
+    general, = datos['generales']
+    assert general.factura == esperado['numero_factura'] == '123456'
+    assert general.contrato == esperado['contrato']
+    assert general.total_pagar == general.total_facturado == esperado['total']
+    assert general.items_detectados == 60
+    assert sum(fila.total for fila in datos['conceptos']) == esperado['total']
+    assert datos['validacion']['es_valida']
+
+def test_generador_reproducible(tmp_path):
+    primero = generador.generar_lote(str(tmp_path / 'a'), 3, items=(1, 20), paginas_anexo=(0, 2), semilla=9)
+    segundo = generador.generar_lote(str(tmp_path / 'b'), 3, items=(1, 20), paginas_anexo=(0, 2), semilla=9)
+    otra = generador.generar_lote(str(tmp_path / 'c'), 3, items=(1, 20), paginas_anexo=(0, 2), semilla=10)
+    leer = lambda rutas: [open(r, 'rb').read() for r in rutas]
+    assert [r.split('/')[-1] for r in primero] == ['FE_100000.pdf', 'FE_100001.pdf', 'FE_100002.pdf']
+    assert leer(primero) == leer(segundo)
+    assert leer(primero) != leer(otra)
+
+def test_resumir():
+    resumen = ejecutar.resumir([0.4, 0.1, 0.3, 0.2], unidades=10)
+    assert resumen['n'] == 4 and resumen['min_s'] == 0.1 and resumen['max_s'] == 0.4
+    assert abs(resumen['total_s'] - 1.0) < 1e-9 and abs(resumen['por_segundo'] - 10.0) < 1e-9
+    assert abs(resumen['p50_s'] - 0.25) < 1e-9 and abs(resumen['p95_s'] - 0.385) < 1e-9
+    assert ejecutar.resumir([])['media_s'] == 0.0
+
+def test_comparar_marca_regresiones():
+    base = {'etapas': {'a': {'media_s': 1.0}, 'b': {'media_s': 1.0}, 'c': {'media_s': 0.0}}}
+    actual = {'etapas': {'a': {'media_s': 1.05}, 'b': {'media_s': 1.5}, 'c': {'media_s': 1.0},
+                         'nueva': {'media_s': 1.0}}}
+    filas = {etapa: (variacion, regresion) for etapa, _, _, variacion, regresion in ejecutar.comparar(base, actual)}
+    # Las etapas sin base (o con media 0) no se comparan
+    assert set(filas) == {'a', 'b'}
+    assert not filas['a'][1] and filas['b'][1]
+    assert abs(filas['b'][0] - 50.0) < 1e-9
+    assert not any(fila[4] for fila in ejecutar.comparar(base, actual, umbral=60.0))
+
+def test_ejecucion_completa_y_comparacion(tmp_path, capsys):
+    salida = tmp_path / 'resultados.json'
+    argumentos = ['--facturas', '2', '--items', '2', '4', '--anexos', '0', '0', '--repeticiones', '1',
+                  '--backends', 'pdfminer']
+    assert ejecutar.main(argumentos + ['--salida', str(salida)]) == 0
+    resultados = json.loads(salida.read_text(encoding='utf-8'))
+    assert resultados['facturas'] == 2
+    assert 'extraer_datos_estructurados[pdfminer]' in resultados['etapas']
+    assert resultados['etapas']['extraer_datos_factura']['n'] == 2
+
+    # Contra una base diez veces más rápida, toda etapa es regresión
+    for datos in resultados['etapas'].values():
+        datos['media_s'] /= 10
+    base = tmp_path / 'base.json'
+    base.write_text(json.dumps(resultados), encoding='utf-8')
+    assert ejecutar.main(argumentos + ['--comparar', str(base)]) == 1
+    assert 'REGRESIÓN' in capsys.readouterr().out
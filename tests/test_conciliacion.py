@@ -0,0 +1,122 @@
+"""
+Pruebas de la conciliación contra el Data Lake (conciliacion.conciliar y resumir_discrepancias).
+"""
+
+import math
+import pandas as pd
+import conciliacion
+from exportacion import COLUMNAS_COMPARACION
+from conciliacion import (
+    ESTADO_COINCIDE, ESTADO_TOLERANCIA, ESTADO_DIFERENCIA, ESTADO_SIN_DATA_LAKE, ESTADO_SOLO_DATA_LAKE
+)
+
+def _comparacion(filas):
+    """Filas (factura, variable, valor PDF) de la hoja Comparación."""
+    return pd.DataFrame(
+        [(factura, 'GC-1', 'General', variable, valor, '', f"FE_{factura}.pdf") for factura, variable, valor in filas],
+        columns=COLUMNAS_COMPARACION,
+    )
+
+def _extracto(filas):
+    return pd.DataFrame(
+        [(factura, 'GC-1', variable, valor) for factura, variable, valor in filas],
+        columns=conciliacion.LLAVES + ['Valor Data Lake'],
+    )
+
+def _por_variable(conciliado):
+    return {(f, v): fila for f, v, fila in zip(conciliado['No. Factura'], conciliado['Variable'],
+                                               conciliado.to_dict('records'))}
+
+def test_conciliar_estados_y_diferencias():
+    comparacion = _comparacion([
+        ('1', 'Total a Pagar', 1000.0),
+        ('1', 'Total Facturado (Subtotal)', '1,000'),
+        ('1', 'Cliente', 'AIR-E  S.A.S.'),
+        ('1', 'Item 1 - Total', 500.0),
+        ('2', 'Total a Pagar', 777.0),         # Sin fila en el Data Lake
+        ('3', 'Total a Pagar', 300.0),
+    ])
+    extracto = _extracto([
+        ('1', 'Total a Pagar', '1000'),
+        ('1', 'Total Facturado (Subtotal)', '1000.5'),
+        ('1', 'Cliente', 'air-e s.a.s.'),
+        ('1', 'Item 1 - Total', '480'),
+        ('3', 'Total a Pagar', '350'),
+        ('4', 'Total a Pagar', '999'),         # Solo en el Data Lake
+        ('4.0', 'Cliente', 'X'),               # Llave como la deja Excel ('4.0' -> '4')
+    ])
+
+    conciliado = conciliacion.conciliar(comparacion, extracto)
+    assert list(conciliado.columns) == conciliacion.COLUMNAS_CONCILIACION
+    filas = _por_variable(conciliado)
+    assert len(filas) == 8
+
+    def ver(factura, variable):
+        fila = filas[(factura, variable)]
+        return fila['Estado Conciliación'], fila['Diferencia']
+
+    assert ver('1', 'Total a Pagar') == (ESTADO_COINCIDE, 0.0)
+    assert ver('1', 'Total Facturado (Subtotal)') == (ESTADO_TOLERANCIA, -0.5)
+    assert ver('1', 'Item 1 - Total') == (ESTADO_DIFERENCIA, 20.0)
+    assert ver('3', 'Total a Pagar') == (ESTADO_DIFERENCIA, -50.0)
+
+    # Las variables de texto no llevan diferencia
+    estado, diferencia = ver('1', 'Cliente')
+    assert estado == ESTADO_COINCIDE and math.isnan(diferencia)
+
+    # Sin contraparte no hay diferencia (no es el monto completo contra 0)
+    for llave, esperado in [(('2', 'Total a Pagar'), ESTADO_SIN_DATA_LAKE),
+                            (('4', 'Total a Pagar'), ESTADO_SOLO_DATA_LAKE),
+                            (('4', 'Cliente'), ESTADO_SOLO_DATA_LAKE)]:
+        estado, diferencia = ver(*llave)
+        assert estado == esperado and math.isnan(diferencia), llave
+        assert not filas[llave]['Coincide'] and not filas[llave]['En Tolerancia']
+
+def test_tolerancia_relativa():
+    comparacion = _comparacion([('1', 'Total a Pagar', 100500.0)])
+    extracto = _extracto([('1', 'Total a Pagar', '100000')])
+    estado = lambda **t: conciliacion.conciliar(comparacion, extracto, **t)['Estado Conciliación'].iloc[0]
+    assert estado() == ESTADO_DIFERENCIA
+    assert estado(tolerancia_relativa=0.01) == ESTADO_TOLERANCIA
+    assert estado(tolerancia_absoluta=500) == ESTADO_TOLERANCIA
+
+def test_llave_repetida_en_el_extracto_usa_la_ultima():
+    comparacion = _comparacion([('1', 'Total a Pagar', 10.0)])
+    extracto = _extracto([('1', 'Total a Pagar', '99'), ('1', 'Total a Pagar', '10')])
+    conciliado = conciliacion.conciliar(comparacion, extracto)
+    assert len(conciliado) == 1 and conciliado['Estado Conciliación'].iloc[0] == ESTADO_COINCIDE
+
+def test_resumir_discrepancias():
+    comparacion = _comparacion([
+        ('1', 'Total a Pagar', 1000.0),
+        ('1', 'Item 1 - Total', 500.0),
+        ('1', 'Item 2 - Total', 100.0),
+        ('2', 'Total a Pagar', 777.0),
+        ('3', 'Total a Pagar', 300.0),
+    ])
+    extracto = _extracto([
+        ('1', 'Total a Pagar', '1000'),
+        ('1', 'Item 1 - Total', '480'),
+        ('1', 'Item 2 - Total', '130'),
+        ('3', 'Total a Pagar', '300'),
+    ])
+    por_variable, por_factura = conciliacion.resumir_discrepancias(conciliacion.conciliar(comparacion, extracto))
+
+    variables = por_variable.set_index('Variable')
+    # Los ítems se agrupan por campo
+    assert list(variables.index) == ['Item - Total', 'Total a Pagar']
+    assert variables.loc['Item - Total', ESTADO_DIFERENCIA] == 2
+    assert variables.loc['Item - Total', 'Máx. Diferencia'] == 30.0
+    assert variables.loc['Item - Total', 'Suma Diferencias'] == 50.0
+    # La fila sin Data Lake de la factura 2 no aporta diferencia
+    assert variables.loc['Total a Pagar', ESTADO_SIN_DATA_LAKE] == 1
+    assert variables.loc['Total a Pagar', ESTADO_DIFERENCIA] == 0
+    assert variables.loc['Total a Pagar', 'Máx. Diferencia'] == 0.0
+    assert variables.loc['Total a Pagar', 'Suma Diferencias'] == 0.0
+
+    # Solo las facturas con algo que revisar, la de más diferencias primero
+    assert list(por_factura['No. Factura']) == ['1', '2']
+    facturas = por_factura.set_index('No. Factura')
+    assert facturas.loc['1', 'Diferencia Neta'] == -10.0
+    assert facturas.loc['2', 'Diferencia Neta'] == 0.0
+    assert facturas.loc['2', ESTADO_SIN_DATA_LAKE] == 1
@@ -0,0 +1,71 @@
+"""
+Pruebas del diario de consolidación (diario.py) y de --reanudar en
+main.procesar_directorio_consolidado.
+"""
+
+import os
+import shutil
+import logging
+import pytest
+from benchmarks import generador
+import diario
+import incremental
+import main
+
+class Interrupcion(BaseException):
+    """Simula que la corrida muere a mitad del lote (no la atrapa el bucle de tareas)."""
+
+def _lote(directorio):
+    directorio.mkdir()
+    for indice, nombre in enumerate(('a.pdf', 'b.pdf', 'd.pdf', 'e.pdf')):
+        generador.generar_factura(str(directorio / nombre), 100000 + indice, items=3, semilla=indice)
+    # Copia de a.pdf: el triaje la marca OMITIDO
+    shutil.copyfile(directorio / 'a.pdf', directorio / 'c.pdf')
+
+def _consolidar(entrada, salida, caplog, **opciones):
+    caplog.clear()
+    with caplog.at_level(logging.INFO):
+        main.procesar_directorio_consolidado(str(entrada), str(salida), modo_incremental=True,
+                                             triaje_previo=True, **opciones)
+    resumen = [r.getMessage() for r in caplog.records if r.getMessage().startswith('Resumen:')]
+    manifiesto = incremental.Manifiesto.cargar(os.path.join(salida, incremental.NOMBRE_MANIFIESTO))
+    return resumen[0].split('. Tiempo')[0], sorted(manifiesto.archivos)
+
+def test_reanudar_equivale_a_una_corrida_completa(tmp_path, caplog, monkeypatch):
+    entrada = tmp_path / 'pdfs'
+    _lote(entrada)
+    completa = _consolidar(entrada, tmp_path / 'completa', caplog)
+    assert completa == ("Resumen: 4 procesados, 0 fallidos, 1 omitidos (triaje/duplicados)",
+                        ['a.pdf', 'b.pdf', 'c.pdf', 'd.pdf', 'e.pdf'])
+
+    # La corrida muere al llegar a d.pdf, después de registrar a, b y c (omitido)
+    original = main.procesar_pdf_con_triaje
+    def procesar_o_morir(ruta_pdf, *argumentos):
+        if os.path.basename(ruta_pdf) == 'd.pdf':
+            raise Interrupcion()
+        return original(ruta_pdf, *argumentos)
+    monkeypatch.setattr(main, 'procesar_pdf_con_triaje', procesar_o_morir)
+    salida = tmp_path / 'reanudada'
+    with pytest.raises(Interrupcion):
+        main.procesar_directorio_consolidado(str(entrada), str(salida), modo_incremental=True, triaje_previo=True)
+    monkeypatch.undo()
+
+    ruta = diario.ruta_diario(str(salida))
+    registrado = diario.DiarioConsolidacion(ruta)
+    assert registrado.cargar()
+    assert registrado.completados == {'a.pdf', 'b.pdf', 'c.pdf'}
+
+    assert _consolidar(entrada, salida, caplog, reanudar=True) == completa
+    assert not os.path.exists(ruta)
+
+def test_sin_facturas_no_deja_salidas_a_medias(tmp_path, monkeypatch):
+    entrada = tmp_path / 'pdfs'
+    salida = tmp_path / 'salida'
+    _lote(entrada)
+    # Ningún PDF se puede leer (procesar_pdf_a_datos retorna None ante un error crítico)
+    monkeypatch.setattr(main, 'procesar_pdf_a_datos', lambda *argumentos: None)
+
+    assert main.procesar_directorio_consolidado(str(entrada), str(salida), formatos=('csv', 'jsonl')) == []
+    assert not [n for n in os.listdir(salida) if n.startswith('Consolidado_')]
+    # El diario solo se borra cuando el consolidado quedó guardado
+    assert os.path.exists(diario.ruta_diario(str(salida)))
@@ -0,0 +1,42 @@
+"""
+Pruebas del pool supervisado (ejecucion.PoolSupervisado) y de cómo sus estados
+llegan al Log_Proceso (main.construir_filas).
+"""
+
+import os
+import time
+import ejecucion
+import main
+
+def _tarea(accion):
+    if accion == 'caer':
+        os._exit(3)
+    if accion == 'dormir':
+        time.sleep(30)
+    if accion == 'fallar':
+        raise ValueError('PDF ilegible')
+    return accion.upper()
+
+def test_pool_aisla_caidas_y_limites():
+    tareas = [('a',), ('caer',), ('b',), ('dormir',), ('fallar',), ('c',)]
+    resultados = list(ejecucion.procesar_en_orden(_tarea, tareas, workers=2, limite_segundos=1.0))
+
+    # Mismo orden que las tareas; solo falla la tarea del trabajador afectado
+    assert [r[0] for r in resultados] == tareas
+    assert [r[1] for r in resultados] == [
+        ejecucion.ESTADO_OK, ejecucion.ESTADO_CAIDA, ejecucion.ESTADO_OK,
+        ejecucion.ESTADO_TIMEOUT, ejecucion.ESTADO_ERROR, ejecucion.ESTADO_OK,
+    ]
+    assert [r[2] for r in resultados if r[1] == ejecucion.ESTADO_OK] == ['A', 'B', 'C']
+    assert resultados[4][2] == 'ValueError: PDF ilegible'
+
+def test_log_proceso_muestra_el_estado_del_pool():
+    def es_valida(estado):
+        fila, = main.construir_filas('f.pdf', estado, 'detalle')['validacion']
+        return fila['Es Válida'], fila['Errores']
+
+    for estado in (ejecucion.ESTADO_CAIDA, ejecucion.ESTADO_TIMEOUT, ejecucion.ESTADO_MEMORIA):
+        assert es_valida(estado) == (estado, f"Fallo en lectura del archivo ({estado}: detalle)")
+    # Una excepción de la función no es un estado del pool
+    assert es_valida(ejecucion.ESTADO_ERROR)[0] == "ERROR CRÍTICO"
+    assert main.construir_filas('f.pdf', ejecucion.ESTADO_OK, None)['validacion'][0]['Es Válida'] == "ERROR CRÍTICO"
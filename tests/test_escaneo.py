@@ -0,0 +1,106 @@
+"""
+Pruebas del escaneo de directorios (escaneo.iterar_pdfs), el reparto por shards y
+la fusión de sus consolidados (fusion / main.fusionar_shards).
+"""
+
+import os
+import shutil
+import pytest
+import escaneo
+import fusion
+import incremental
+import main
+from openpyxl import load_workbook
+from benchmarks import generador
+from exportacion import COLUMNAS
+
+ARBOL = [
+    '2025/12/prov_a/f1.pdf', '2025/12/prov_a/f2.PDF', '2025/12/prov_b/f3.pdf',
+    '2026/01/prov_a/f4.pdf', '2026/01/prov_a/notas.txt', '2026/01/tmp/f5.pdf',
+    '2026/02/f6.pdf', 'suelto.pdf', 'b.pdf', 'a.pdf',
+]
+
+def _arbol(raiz):
+    for relativo in ARBOL:
+        ruta = raiz / relativo
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        ruta.write_bytes(b'%PDF-1.4')
+    return str(raiz)
+
+def test_recorrido_y_filtros(tmp_path):
+    raiz = _arbol(tmp_path / 'archivo')
+    assert list(escaneo.iterar_pdfs(raiz)) == ['a.pdf', 'b.pdf', 'suelto.pdf']
+    # Recursivo: en profundidad; en cada directorio sus archivos y luego sus subdirectorios
+    assert list(escaneo.iterar_pdfs(raiz, recursivo=True)) == [
+        'a.pdf', 'b.pdf', 'suelto.pdf',
+        '2025/12/prov_a/f1.pdf', '2025/12/prov_a/f2.PDF', '2025/12/prov_b/f3.pdf',
+        '2026/01/prov_a/f4.pdf', '2026/01/tmp/f5.pdf', '2026/02/f6.pdf',
+    ]
+    # Un glob con '/' se compara con la ruta completa; un directorio excluido no se recorre
+    assert list(escaneo.iterar_pdfs(raiz, True, incluir=['2026/*'])) == [
+        '2026/01/prov_a/f4.pdf', '2026/01/prov_a/notas.txt', '2026/01/tmp/f5.pdf', '2026/02/f6.pdf'
+    ]
+    assert list(escaneo.iterar_pdfs(raiz, True, incluir=['*/prov_a/*.pdf'])) == [
+        '2025/12/prov_a/f1.pdf', '2025/12/prov_a/f2.PDF', '2026/01/prov_a/f4.pdf'
+    ]
+    assert list(escaneo.iterar_pdfs(raiz, True, excluir=['tmp', '2025', '?.pdf'])) == [
+        'suelto.pdf', '2026/01/prov_a/f4.pdf', '2026/02/f6.pdf'
+    ]
+    assert list(escaneo.iterar_pdfs(raiz, True, incluir=['*.txt'])) == ['2026/01/prov_a/notas.txt']
+    assert list(escaneo.iterar_pdfs(str(tmp_path / 'no_existe'))) == []
+
+def test_shards_disjuntos_y_deterministas(tmp_path):
+    raiz = _arbol(tmp_path / 'archivo')
+    todos = list(escaneo.iterar_pdfs(raiz, recursivo=True))
+    for total in (1, 2, 3, 7):
+        porciones = [list(escaneo.iterar_pdfs(raiz, True, shard=(i, total))) for i in range(1, total + 1)]
+        assert sorted(sum(porciones, [])) == sorted(todos)
+        assert sum(len(p) for p in porciones) == len(todos)
+
+    # El reparto depende solo de la ruta relativa, no del punto de montaje
+    copia = shutil.copytree(raiz, tmp_path / 'montaje' / 'otro')
+    for i in (1, 2, 3):
+        assert list(escaneo.iterar_pdfs(str(copia), True, shard=(i, 3))) == \
+               list(escaneo.iterar_pdfs(raiz, True, shard=(i, 3)))
+    # Y es estable entre procesos y máquinas (SHA-1, no el hash() aleatorio de Python)
+    assert [escaneo.shard_de(r, 5) for r in ('a.pdf', 'b.pdf', 'suelto.pdf', '2026/02/f6.pdf')] == [3, 3, 2, 2]
+
+def test_parsear_shard():
+    assert escaneo.parsear_shard('2/4') == (2, 4)
+    assert escaneo.sufijo_shard((2, 4)) == '_shard2de4' and escaneo.sufijo_shard(None) == ''
+    for texto in ('0/4', '5/4', '1/0', '2', 'a/b', '1/2/3'):
+        with pytest.raises(ValueError):
+            escaneo.parsear_shard(texto)
+
+def _facturas(ruta_xlsx):
+    workbook = load_workbook(ruta_xlsx, read_only=True)
+    try:
+        indice = COLUMNAS['generales'].index('Nombre Archivo')
+        return sorted(fila[indice] for fila in incremental.leer_hoja(workbook, 'generales'))
+    finally:
+        workbook.close()
+
+def test_shards_fusionados_igual_a_una_corrida(tmp_path):
+    entrada = tmp_path / 'pdfs'
+    for indice, sub in enumerate(['2026/01', '2026/01', '2026/02', '2026/02', 'x', 'x']):
+        (entrada / sub).mkdir(parents=True, exist_ok=True)
+        generador.generar_factura(str(entrada / sub / f"f{indice}.pdf"), 100 + indice, items=2)
+
+    completa = tmp_path / 'completa'
+    main.procesar_directorio_consolidado(str(entrada), str(completa), recursivo=True)
+    esperado = _facturas(next(completa.glob('Consolidado_*.xlsx')))
+    assert len(esperado) == 6
+
+    salida = tmp_path / 'shards'
+    for i in (1, 2, 3):
+        main.procesar_directorio_consolidado(str(entrada), str(salida), recursivo=True, shard=(i, 3),
+                                             formatos=('xlsx', 'csv'))
+    consolidados = fusion.localizar_consolidados([str(salida)])
+    assert len(consolidados) == 3
+    assert all(completos == {'xlsx', 'csv'} for _, completos in consolidados)
+
+    rutas = main.fusionar_shards([str(salida)], str(tmp_path / 'fusion'), formatos=('xlsx', 'jsonl'))
+    assert _facturas(rutas[0]) == esperado
+    assert rutas[1].endswith('_fusion_conceptos.jsonl')
+    with open(rutas[1], encoding='utf-8') as f:
+        assert sum(1 for _ in f) == 12
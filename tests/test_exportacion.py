@@ -0,0 +1,129 @@
+"""
+Pruebas de la exportación a Excel (exportacion.ExportadorExcelStreaming y ExportadorExcel).
+"""
+
+import os
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.utils import get_column_letter
+from benchmarks import generador
+from exportacion import HOJAS, COLUMNAS, ExportadorExcel, ExportadorExcelStreaming, calcular_ancho_columna
+import main
+
+def _filas_lote(tmp_path, cantidad=3):
+    """Filas por dataset de un lote sintético, como las arma procesar_directorio_consolidado."""
+    rutas = generador.generar_lote(str(tmp_path / 'pdfs'), cantidad, items=(2, 6), paginas_anexo=(0, 0))
+    lote = []
+    for ruta in rutas:
+        filas = main.construir_filas(os.path.basename(ruta), 'OK', main.procesar_pdf_a_datos(ruta))
+        lote.append({clave: filas.get(clave, []) for clave in COLUMNAS})
+    # Un PDF ilegible solo deja su entrada en el Log_Proceso
+    lote.append(main.construir_filas('roto.pdf', 'ERROR', 'sin texto'))
+    return lote
+
+def _leer(ruta):
+    workbook = load_workbook(ruta)
+    try:
+        return {nombre: [tuple(fila) for fila in workbook[nombre].iter_rows(values_only=True)]
+                for nombre in workbook.sheetnames}
+    finally:
+        workbook.close()
+
+def test_streaming_escribe_lo_mismo_que_en_memoria(tmp_path):
+    lote = _filas_lote(tmp_path)
+
+    # Muestra de 4 filas: parte de cada hoja se escribe después de fijar los anchos
+    streaming = ExportadorExcelStreaming(str(tmp_path / 'streaming.xlsx'), filas_muestra=4)
+    for datos in lote:
+        streaming.agregar(datos)
+    streaming.cerrar()
+
+    acumulado = {clave: [fila for datos in lote for fila in datos.get(clave, [])] for clave in COLUMNAS}
+    ExportadorExcel(acumulado, str(tmp_path / 'memoria.xlsx')).exportar()
+
+    en_streaming = _leer(tmp_path / 'streaming.xlsx')
+    en_memoria = _leer(tmp_path / 'memoria.xlsx')
+    assert list(en_streaming) == list(HOJAS.values())
+    for clave, nombre in HOJAS.items():
+        assert en_streaming[nombre][0] == tuple(COLUMNAS[clave])
+        assert len(en_streaming[nombre]) == len(acumulado[clave]) + 1
+        if clave != 'validacion':  # La fecha de proceso se escribe como texto en un caso y fecha en el otro
+            assert en_streaming[nombre] == en_memoria[nombre], clave
+    assert streaming.filas_escritas == {clave: len(filas) for clave, filas in acumulado.items()}
+
+def test_dicts_y_tuplas_en_el_orden_de_las_columnas(tmp_path):
+    ruta = str(tmp_path / 'salida.xlsx')
+    exportador = ExportadorExcelStreaming(ruta)
+    log = {'Archivo': 'a.pdf', 'Es Válida': 'SÍ', 'Fecha Proceso': '2026-01-01', 'Otra': 'x'}
+    exportador.agregar({'validacion': [log, ('2026-01-02', 'b.pdf', '7', 'NO', 'falta total')]})
+    exportador.cerrar()
+
+    hojas = _leer(ruta)
+    assert hojas[HOJAS['validacion']][1:] == [
+        ('2026-01-01', 'a.pdf', None, 'SÍ', None),
+        ('2026-01-02', 'b.pdf', '7', 'NO', 'falta total'),
+    ]
+    # Las hojas sin filas quedan solo con el encabezado
+    assert hojas[HOJAS['conceptos']] == [tuple(COLUMNAS['conceptos'])]
+
+def test_anchos_y_encabezado_desde_la_muestra(tmp_path):
+    ruta = str(tmp_path / 'salida.xlsx')
+    exportador = ExportadorExcelStreaming(ruta, filas_muestra=2)
+    fila = lambda archivo: ('2026-01-01', archivo, '1', 'SÍ', 'Ninguno')
+    exportador.escribir_fila('validacion', fila('a' * 30))
+    exportador.escribir_fila('validacion', fila('b.pdf'))
+    # Tras la muestra los anchos ya están fijos: una fila más larga no los cambia
+    exportador.escribir_fila('validacion', fila('c' * 80))
+    exportador.cerrar()
+
+    workbook = load_workbook(ruta)
+    hoja = workbook[HOJAS['validacion']]
+    assert hoja.column_dimensions['B'].width == 32
+    assert hoja.column_dimensions['E'].width == 10
+    assert all(celda.font.bold for celda in hoja[1])
+    assert hoja.max_row == 4
+
+def test_descartar_no_deja_archivos(tmp_path):
+    ruta = tmp_path / 'salida.xlsx'
+    exportador = ExportadorExcelStreaming(str(ruta), filas_muestra=1)
+    exportador.escribir_fila('validacion', ('2026-01-01', 'a.pdf', '1', 'SÍ', 'Ninguno'))
+    temporales = [hoja._writer.out for hoja in exportador.hojas.values() if hoja._writer]
+    assert temporales
+    exportador.descartar()
+    assert not ruta.exists()
+    assert not any(os.path.exists(t) for t in temporales)
+
+def _anchos_recorriendo_celdas(hoja):
+    """Recorrido original: el texto más largo de cada columna en el libro ya escrito."""
+    anchos = []
+    for columna in hoja.columns:
+        max_length = 0
+        for celda in columna:
+            if celda.value:
+                max_length = max(max_length, len(str(celda.value)))
+        anchos.append(calcular_ancho_columna(max_length))
+    return anchos
+
+def test_anchos_desde_dataframes_igual_que_recorriendo_el_libro(tmp_path):
+    lote = _filas_lote(tmp_path)
+    acumulado = {clave: [fila for datos in lote for fila in datos.get(clave, [])] for clave in COLUMNAS}
+    # Valores vacíos, nulos y cero no cuentan; un texto largo sí
+    acumulado['generales'][0] = acumulado['generales'][0]._replace(
+        cliente='X' * 45, anticipo=0, cufe=None, observaciones=''
+    )
+    ruta = str(tmp_path / 'memoria.xlsx')
+    ExportadorExcel(acumulado, ruta).exportar()
+
+    workbook = load_workbook(ruta)
+    for nombre in HOJAS.values():
+        hoja = workbook[nombre]
+        anchos = [hoja.column_dimensions[get_column_letter(i)].width for i in range(1, hoja.max_column + 1)]
+        assert anchos == _anchos_recorriendo_celdas(hoja), nombre
+
+def test_calcular_anchos_limites():
+    df = pd.DataFrame({'A': [None, 0, '', 'abc'], 'Columna larga': [1.5, None, None, None], 'C': ['x' * 100] * 4})
+    assert ExportadorExcel.calcular_anchos(df) == [10, 15, 60]
+    # Los flotantes enteros se escriben sin '.0' (float64 por los nulos, u object mixto)
+    df = pd.DataFrame({'N': [123456789.0, None], 'M': [123456789.0, 'abc'], 'D': [12345678.25, None]})
+    assert ExportadorExcel.calcular_anchos(df) == [11, 11, 13]
+    assert ExportadorExcel.calcular_anchos(pd.DataFrame({'Vacía': []})) == [10]
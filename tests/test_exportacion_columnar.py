@@ -0,0 +1,108 @@
+"""
+Pruebas de los formatos columnares (exportacion_columnar) y de la selección de
+formatos en streaming (exportacion.crear_exportador_streaming).
+"""
+
+import csv
+import json
+from datetime import date, datetime
+import pytest
+import exportacion
+from exportacion import COLUMNAS
+from exportacion_columnar import (
+    convertir_valor, ExportadorCSV, ExportadorJSONL,
+    TIPO_TEXTO, TIPO_DECIMAL, TIPO_ENTERO, TIPO_FECHA, TIPO_FECHA_HORA
+)
+
+def _general(**valores):
+    fila = dict.fromkeys(COLUMNAS['generales'])
+    fila.update({'Nombre Archivo': 'f.pdf', 'No. Factura': '100', 'Fecha Expedición': '2026-01-11',
+                 'Total a Pagar': '1,234,567', 'Intereses': 12.5, 'Items Detectados': 3})
+    fila.update(valores)
+    return fila
+
+DATOS = {
+    'generales': [_general(), _general(**{'No. Factura': '101', 'Total a Pagar': 'N/A', 'Fecha Expedición': 'mal'})],
+    'validacion': [('2026-01-02 03:04:05', 'f.pdf', '100', 'SÍ', 'Ninguno')],
+}
+
+def test_convertir_valor():
+    assert convertir_valor('$ 1,234,567', TIPO_DECIMAL) == 1234567.0
+    assert convertir_valor(7, TIPO_DECIMAL) == 7.0
+    assert convertir_valor('0', TIPO_DECIMAL) == 0.0
+    # Vacío o no numérico queda nulo, no en cero
+    for valor in (None, '', '$', 'N/A'):
+        assert convertir_valor(valor, TIPO_DECIMAL) is None, valor
+    assert convertir_valor('12', TIPO_ENTERO) == 12 and convertir_valor('x', TIPO_ENTERO) is None
+    assert convertir_valor('2026/01/11', TIPO_FECHA) == date(2026, 1, 11)
+    assert convertir_valor(datetime(2026, 1, 11, 5), TIPO_FECHA) == date(2026, 1, 11)
+    assert convertir_valor('mal', TIPO_FECHA) is None
+    assert convertir_valor('2026-01-02 03:04:05', TIPO_FECHA_HORA) == datetime(2026, 1, 2, 3, 4, 5)
+    assert convertir_valor(5, TIPO_TEXTO) == '5'
+
+def _exportar(clase, tmp_path, **opciones):
+    exportador = clase(str(tmp_path / 'salida'), COLUMNAS, **opciones)
+    exportador.agregar(DATOS)
+    return exportador, exportador.cerrar()
+
+def test_csv(tmp_path):
+    exportador, rutas = _exportar(ExportadorCSV, tmp_path)
+    assert rutas == [str(tmp_path / f"salida_{clave}.csv") for clave in COLUMNAS]
+    with open(exportador.rutas['generales'], encoding='utf-8', newline='') as f:
+        filas = list(csv.DictReader(f))
+    assert list(filas[0]) == COLUMNAS['generales']
+    assert [(f['Fecha Expedición'], f['Total a Pagar'], f['Items Detectados']) for f in filas] == [
+        ('2026-01-11', '1234567.0', '3'), ('', '', '3')
+    ]
+    with open(exportador.rutas['conceptos'], encoding='utf-8') as f:
+        assert f.read().splitlines() == [','.join(COLUMNAS['conceptos'])]
+
+def test_jsonl(tmp_path):
+    exportador, _ = _exportar(ExportadorJSONL, tmp_path)
+    with open(exportador.rutas['generales'], encoding='utf-8') as f:
+        primero, segundo = [json.loads(linea) for linea in f]
+    assert primero['Fecha Expedición'] == '2026-01-11' and primero['Total a Pagar'] == 1234567.0
+    assert primero['Intereses'] == 12.5 and primero['Items Detectados'] == 3
+    assert segundo['Fecha Expedición'] is None and segundo['Total a Pagar'] is None
+    with open(exportador.rutas['validacion'], encoding='utf-8') as f:
+        assert json.loads(f.readline())['Fecha Proceso'] == '2026-01-02T03:04:05'
+    assert exportador.filas_escritas == {'conceptos': 0, 'generales': 2, 'comparacion': 0, 'validacion': 1}
+
+def test_parquet_tipado_y_por_grupos(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    from exportacion_columnar import ExportadorParquet
+
+    exportador = ExportadorParquet(str(tmp_path / 'salida'), COLUMNAS, filas_por_grupo=2)
+    for indice in range(5):
+        exportador.agregar({'generales': [_general(**{'No. Factura': str(indice)})]})
+    exportador.cerrar()
+
+    archivo = pq.ParquetFile(exportador.rutas['generales'])
+    assert archivo.metadata.num_row_groups == 3
+    tabla = archivo.read()
+    assert str(tabla.schema.field('Fecha Expedición').type) == 'date32[day]'
+    assert str(tabla.schema.field('Total a Pagar').type) == 'double'
+    assert str(tabla.schema.field('Items Detectados').type) == 'int64'
+    assert tabla.column('No. Factura').to_pylist() == ['0', '1', '2', '3', '4']
+    assert pq.ParquetFile(exportador.rutas['validacion']).read().num_rows == 0
+
+def test_descartar_borra_los_archivos(tmp_path):
+    exportador = ExportadorCSV(str(tmp_path / 'salida'), COLUMNAS)
+    exportador.agregar(DATOS)
+    exportador.descartar()
+    assert list(tmp_path.iterdir()) == []
+
+def test_crear_exportador_streaming(tmp_path):
+    base = str(tmp_path / 'consolidado')
+    exportador = exportacion.crear_exportador_streaming(['xlsx', 'csv', 'jsonl'], base)
+    assert isinstance(exportador, exportacion.ExportadorMultiple)
+    exportador.agregar(DATOS)
+    rutas = exportador.cerrar()
+    assert rutas[0] == f"{base}.xlsx" and len(rutas) == 1 + 2 * len(COLUMNAS)
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(p.split('/')[-1] for p in rutas)
+
+    unico = exportacion.crear_exportador_streaming(['csv'], base)
+    assert isinstance(unico, ExportadorCSV)
+    unico.descartar()
+    with pytest.raises(ValueError):
+        exportacion.crear_exportador_streaming(['xls'], base)
@@ -0,0 +1,50 @@
+"""
+Pruebas del modo adaptativo de extractores (lectura detenida al tener los datos requeridos).
+"""
+
+import extractores
+import extractores_pdf
+from benchmarks import generador
+from extractores_patrones import CAMPOS_REQUERIDOS
+
+def _condicion_original(datos_paginas):
+    """Condición anterior: vuelve a recorrer todas las líneas leídas en cada página."""
+    lineas = [linea for p in sorted(datos_paginas) for linea in datos_paginas[p]]
+    en_tabla = tabla_cerrada = False
+    for linea in lineas:
+        if not en_tabla:
+            en_tabla = extractores.es_encabezado_tabla(linea)
+        elif extractores.es_linea_totales(linea):
+            tabla_cerrada = True
+            break
+    datos_generales = extractores.MOTOR_GENERALES.extraer(lineas)
+    return tabla_cerrada and all(campo in datos_generales for campo in CAMPOS_REQUERIDOS)
+
+def test_adaptativo_lee_las_mismas_paginas_y_cada_linea_una_vez(tmp_path, monkeypatch):
+    rutas = generador.generar_lote(str(tmp_path), 4, items=(40, 120), paginas_anexo=(1, 3), semilla=5)
+
+    lineas_buscadas = []
+    extraer = extractores.MOTOR_GENERALES.extraer
+    monkeypatch.setattr(extractores.MOTOR_GENERALES, 'extraer',
+                        lambda lineas, *args: lineas_buscadas.append(len(lineas)) or extraer(lineas, *args))
+    lineas_tabla = []
+    for nombre in ('es_encabezado_tabla', 'es_linea_totales'):
+        funcion = getattr(extractores, nombre)
+        monkeypatch.setattr(extractores, nombre,
+                            lambda linea, funcion=funcion: lineas_tabla.append(linea) or funcion(linea))
+
+    for ruta in rutas:
+        esperado = extractores_pdf.extraer_datos_estructurados(ruta, condicion_parada=_condicion_original)
+        total = extractores_pdf.extraer_datos_estructurados(ruta)
+
+        lineas_buscadas.clear()
+        lineas_tabla.clear()
+        leido = extractores_pdf.extraer_datos_estructurados(
+            ruta, condicion_parada=extractores.crear_condicion_adaptativa()
+        )
+        assert leido == esperado
+        assert len(leido) < len(total), "la lectura debió detenerse antes de los anexos"
+        # Cada línea leída se revisa a lo sumo una vez (antes: todas las anteriores en cada página)
+        lineas_leidas = sum(len(lineas) for lineas in leido.values())
+        assert sum(lineas_buscadas) <= lineas_leidas
+        assert len(lineas_tabla) <= lineas_leidas
@@ -0,0 +1,84 @@
+"""
+Pruebas del modo incremental (incremental.py con main.procesar_directorio_consolidado).
+"""
+
+import os
+import shutil
+from openpyxl import load_workbook
+from benchmarks import generador
+from exportacion import COLUMNAS
+import incremental
+import main
+
+def _consolidar(entrada, salida):
+    main.procesar_directorio_consolidado(str(entrada), str(salida), modo_incremental=True)
+    return incremental.Manifiesto.cargar(os.path.join(salida, incremental.NOMBRE_MANIFIESTO)).consolidado
+
+def _filas_por_archivo(ruta_excel, clave):
+    """Cantidad de filas de la hoja por archivo de origen."""
+    workbook = load_workbook(ruta_excel, read_only=True)
+    try:
+        idx_nombre = COLUMNAS[clave].index('Archivo' if clave == 'validacion' else 'Nombre Archivo')
+        conteo = {}
+        for fila in incremental.leer_hoja(workbook, clave):
+            conteo[fila[idx_nombre]] = conteo.get(fila[idx_nombre], 0) + 1
+        return conteo
+    finally:
+        workbook.close()
+
+def test_reprocesar_archivo_conserva_otro_con_la_misma_factura(tmp_path):
+    entrada = tmp_path / 'pdfs'
+    salida = tmp_path / 'salida'
+    entrada.mkdir()
+    # Dos PDFs distintos con el mismo número de factura
+    generador.generar_factura(str(entrada / 'FE_100000.pdf'), 100000, items=16, semilla=1)
+    generador.generar_factura(str(entrada / 'copia.pdf'), 100000, items=5, semilla=2)
+
+    primero = _consolidar(entrada, salida)
+    conceptos = _filas_por_archivo(primero, 'conceptos')
+    assert conceptos == {'FE_100000.pdf': 16, 'copia.pdf': 5}
+
+    # Solo copia.pdf cambia (ahora es otra factura): FE_100000.pdf no se reprocesa
+    otra = tmp_path / 'otra.pdf'
+    generador.generar_factura(str(otra), 100008, items=3, semilla=3)
+    shutil.copyfile(otra, entrada / 'copia.pdf')
+    os.utime(entrada / 'copia.pdf', (1, 1))
+
+    segundo = _consolidar(entrada, salida)
+    assert _filas_por_archivo(segundo, 'conceptos') == {'FE_100000.pdf': 16, 'copia.pdf': 3}
+    comparacion = _filas_por_archivo(segundo, 'comparacion')
+    assert comparacion['FE_100000.pdf'] == _filas_por_archivo(primero, 'comparacion')['FE_100000.pdf']
+
+    workbook = load_workbook(segundo, read_only=True)
+    try:
+        generales = list(incremental.leer_hoja(workbook, 'generales'))
+    finally:
+        workbook.close()
+    idx_nombre = COLUMNAS['generales'].index('Nombre Archivo')
+    idx_items = COLUMNAS['generales'].index('Items Detectados')
+    items = {fila[idx_nombre]: fila[idx_items] for fila in generales}
+    assert items == {'FE_100000.pdf': 16, 'copia.pdf': 3}
+
+def test_recursivo_identifica_archivos_por_ruta_relativa(tmp_path):
+    entrada = tmp_path / 'pdfs'
+    salida = tmp_path / 'salida'
+    (entrada / 'a').mkdir(parents=True)
+    (entrada / 'b').mkdir()
+    generador.generar_factura(str(entrada / 'a' / 'f.pdf'), 100001, items=4, semilla=1)
+    generador.generar_factura(str(entrada / 'b' / 'f.pdf'), 100002, items=6, semilla=2)
+
+    def consolidar():
+        main.procesar_directorio_consolidado(str(entrada), str(salida), modo_incremental=True, recursivo=True)
+        return incremental.Manifiesto.cargar(os.path.join(salida, incremental.NOMBRE_MANIFIESTO))
+
+    manifiesto = consolidar()
+    assert sorted(manifiesto.archivos) == ['a/f.pdf', 'b/f.pdf']
+    assert _filas_por_archivo(manifiesto.consolidado, 'generales') == {'a/f.pdf': 1, 'b/f.pdf': 1}
+
+    # Solo cambia b/f.pdf: a/f.pdf se conserva del consolidado anterior
+    generador.generar_factura(str(entrada / 'b' / 'f.pdf'), 100003, items=2, semilla=3)
+    os.utime(entrada / 'b' / 'f.pdf', (1, 1))
+    manifiesto = consolidar()
+    assert _filas_por_archivo(manifiesto.consolidado, 'generales') == {'a/f.pdf': 1, 'b/f.pdf': 1}
+    assert _filas_por_archivo(manifiesto.consolidado, 'conceptos') == {'a/f.pdf': 4, 'b/f.pdf': 2}
+    assert _filas_por_archivo(manifiesto.consolidado, 'validacion') == {'a/f.pdf': 1, 'b/f.pdf': 1}
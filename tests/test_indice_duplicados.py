@@ -0,0 +1,126 @@
+"""
+Pruebas del índice persistente de duplicados (indice_duplicados.IndiceDuplicados)
+y de su uso entre lotes (--indice-duplicados).
+"""
+
+import os
+import shutil
+import sqlite3
+import indice_duplicados
+import main
+from openpyxl import load_workbook
+from benchmarks import generador
+from exportacion import HOJAS
+from indice_duplicados import IndiceDuplicados
+
+def test_reservar(tmp_path):
+    indice = IndiceDuplicados(str(tmp_path / 'i.db'))
+    assert indice.reservar('h1', '/lote1/a.pdf') is None
+    # Reprocesar el mismo archivo no es duplicado
+    assert indice.reservar('h1', '/lote1/a.pdf') is None
+    assert indice.reservar('h1', '/lote2/copia.pdf') == '/lote1/a.pdf'
+    assert indice.contar() == 1
+    indice.cerrar()
+
+def test_buscar_factura(tmp_path):
+    indice = IndiceDuplicados(str(tmp_path / 'i.db'))
+    indice.registrar('h1', '/a.pdf', cufe='C1', no_factura='100', no_contrato='GC-1')
+    indice.registrar('h2', '/b.pdf', no_factura='200')
+
+    assert indice.buscar_factura('/x.pdf', cufe='C1') == ('/a.pdf', 'CUFE')
+    assert indice.buscar_factura('/x.pdf', cufe='C9', no_factura='100', no_contrato='GC-1') == ('/a.pdf', 'No. Factura')
+    # El número solo coincide con el mismo contrato (o ambos sin contrato)
+    assert indice.buscar_factura('/x.pdf', no_factura='100', no_contrato='GC-2') is None
+    assert indice.buscar_factura('/x.pdf', no_factura='200', no_contrato='') == ('/b.pdf', 'No. Factura')
+    # Una ruta nunca es duplicado de sí misma; sin llaves no hay consulta
+    assert indice.buscar_factura('/a.pdf', cufe='C1', no_factura='100', no_contrato='GC-1') is None
+    assert indice.buscar_factura('/x.pdf') is None
+    indice.cerrar()
+
+def test_registrar_conserva_la_ruta_original(tmp_path):
+    indice = IndiceDuplicados(str(tmp_path / 'i.db'))
+    indice.registrar('h1', '/a.pdf', cufe='C1')
+    indice.registrar('h1', '/copia.pdf', cufe='C2')
+    assert indice.buscar_factura('/x.pdf', cufe='C1') == ('/a.pdf', 'CUFE')
+    assert indice.buscar_factura('/x.pdf', cufe='C2') is None
+    # La misma ruta sí actualiza sus llaves
+    indice.registrar('h1', '/a.pdf', cufe='C3')
+    assert indice.buscar_factura('/x.pdf', cufe='C3') == ('/a.pdf', 'CUFE')
+    indice.cerrar()
+
+def test_liberar_solo_quita_reservas_sin_datos(tmp_path):
+    indice = IndiceDuplicados(str(tmp_path / 'i.db'))
+    indice.reservar('h1', '/a.pdf')
+    indice.liberar('h1', '/otro.pdf')
+    assert indice.reservar('h1', '/copia.pdf') == '/a.pdf'
+    indice.liberar('h1', '/a.pdf')
+    assert indice.reservar('h1', '/copia.pdf') is None
+
+    indice.registrar('h2', '/b.pdf', no_factura='1')
+    indice.liberar('h2', '/b.pdf')
+    assert indice.reservar('h2', '/copia_b.pdf') == '/b.pdf'
+    indice.cerrar()
+
+def test_persistencia_y_transacciones(tmp_path):
+    ruta = str(tmp_path / 'i.db')
+    indice = IndiceDuplicados(ruta, operaciones_por_transaccion=2)
+    lector = sqlite3.connect(ruta)
+    contar = lambda: lector.execute("SELECT COUNT(*) FROM pdfs_indexados").fetchone()[0]
+    indice.reservar('h1', '/a.pdf')
+    assert contar() == 0
+    indice.registrar('h1', '/a.pdf', cufe='C1')
+    assert contar() == 1
+    indice.reservar('h2', '/b.pdf')
+    indice.cerrar()
+    assert contar() == 2
+    lector.close()
+
+    indice = IndiceDuplicados(ruta)
+    assert indice.reservar('h2', '/c.pdf') == '/b.pdf'
+    assert indice.buscar_factura('/c.pdf', cufe='C1') == ('/a.pdf', 'CUFE')
+    indice.cerrar()
+
+def test_llaves_factura():
+    fila = [None] * len(indice_duplicados.COLUMNAS['generales'])
+    fila[1], fila[2] = ' 100 ', 'cufe'
+    assert indice_duplicados.llaves_factura(fila) == ('cufe', '100', '')
+
+def _log(salida):
+    ruta, = salida.glob('Consolidado_*.xlsx')
+    workbook = load_workbook(ruta, read_only=True)
+    try:
+        hoja = workbook[HOJAS['validacion']]
+        return {fila[1]: (fila[3], fila[4]) for fila in hoja.iter_rows(min_row=2, values_only=True)}
+    finally:
+        workbook.close()
+
+def test_duplicados_entre_lotes(tmp_path):
+    ruta_indice = str(tmp_path / 'indice.db')
+    lote1, lote2 = tmp_path / 'lote1', tmp_path / 'lote2'
+    lote1.mkdir()
+    lote2.mkdir()
+    generador.generar_factura(str(lote1 / 'a.pdf'), 100, items=3, semilla=1)
+    generador.generar_factura(str(lote1 / 'b.pdf'), 200, items=3, semilla=2)
+
+    def consolidar(entrada, salida):
+        indice = main.abrir_indice(ruta_indice)
+        try:
+            main.procesar_directorio_consolidado(str(entrada), str(tmp_path / salida), indice=indice)
+        finally:
+            main.cerrar_indice(indice)
+        return _log(tmp_path / salida)
+
+    assert {a: v[0] for a, v in consolidar(lote1, 'salida1').items()} == {'a.pdf': 'SÍ', 'b.pdf': 'SÍ'}
+
+    shutil.copyfile(lote1 / 'a.pdf', lote2 / 'copia_a.pdf')                        # Mismo contenido
+    generador.generar_factura(str(lote2 / 'b_reemitida.pdf'), 200, items=3, semilla=9)  # Otro CUFE, mismo número
+    generador.generar_factura(str(lote2 / 'c.pdf'), 300, items=3, semilla=3)
+    log = consolidar(lote2, 'salida2')
+    original_a = os.path.abspath(lote1 / 'a.pdf')
+    original_b = os.path.abspath(lote1 / 'b.pdf')
+    assert log['copia_a.pdf'] == ('OMITIDO', f"Triaje DUPLICADO: Mismo contenido (hash) que {original_a}")
+    assert log['b_reemitida.pdf'] == ('OMITIDO', f"Triaje DUPLICADO: Misma No. Factura que {original_b}")
+    assert log['c.pdf'][0] == 'SÍ'
+
+    # Volver a consolidar el primer lote no lo marca como duplicado de sí mismo
+    assert {a: v[0] for a, v in consolidar(lote1, 'salida3').items()} == {'a.pdf': 'SÍ', 'b.pdf': 'SÍ'}
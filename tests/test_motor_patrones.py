@@ -0,0 +1,153 @@
+"""
+Pruebas del motor de patrones (motor_patrones.MotorPatrones) contra el recorrido
+original: todas las regex de extractores_patrones contra todas las líneas.
+"""
+
+import random
+import extractores_pdf
+import motor_patrones
+from benchmarks import generador
+from extractores_patrones import (
+    PATRONES_ENCABEZADO, PATRONES_MONTO, PATRONES_INFO_PIE,
+    CLAVES_PATRONES, CAMPOS_CLIENTE, MARCADORES_CLIENTE
+)
+from utils import limpiar_moneda
+
+GRUPOS = [PATRONES_ENCABEZADO, PATRONES_MONTO, PATRONES_INFO_PIE]
+
+# Líneas de factura con al menos una variante por campo (y por marcador del cliente)
+PLANTILLAS = [
+    'GECELCA S.A. E.S.P. Nit: 900.123.456-{n}',
+    'FACTURA ELECTRONICA DE VENTA No. {numero}',
+    'Número Factura: {numero}',
+    'Fecha expedición: 2026-01-{d:02d}  Fecha vencimiento: 2026/02/{d:02d}',
+    'Fecha expedicion. 2025-12-{d:02d}',
+    'Periodo Facturación: 2026-01-01 A 2026-01-31',
+    'Periodo facturacion 2025-12-01 hasta 2025-12-31',
+    'CUFE: {cufe}',
+    'Señores: AIR-E S.A.S. E.S.P. Nit: 901380930-{n}',
+    'Datos del cliente',
+    'Adquirente: Electricaribe',
+    'Cliente: Empresa {n}',
+    'Nit: 901380930-{n} No. Contrato: GC-2021-{n:02d}',
+    'Dirección: Carrera {n} # 99A-65 Ciudad: Barranquilla',
+    'Ciudad: Santa Marta Teléfono: 605 361 {n:04d}',
+    'Email: facturas{n}@air-e.com Telefono: (605) 3611000',
+    'Item Ref Concepto Unidad Cantidad Tarifa Total',
+    '{n} EN Energía en bolsa kWh 4,280,348 135.376 579,456,390',
+    'TOTAL FACTURADO $ {monto}',
+    'TOTAL A PAGAR $ {monto}',
+    'Anticipo/Prepago $ -{monto}',
+    'Anticipo 0',
+    'Intereses financieros $ {n}',
+    'SON: VALOR EN LETRAS DE LA FACTURA Medio de pago: Transferencia',
+    'Medio de pago: Transferencia Entidad: Bancolombia',
+    'Entidad: Banco de Bogotá Cuenta: Corriente Número: {numero}',
+    'Cuenta: Ahorros Numero: 123456789',
+    'Forma de pago: Crédito Observaciones: ninguna',
+    'IPP Provisional: 1.234,{n}',
+    'TRM del día: 4.{n}',
+    'ANEXO {n} - Detalle horario de la medición',
+    'Hora {d:02d} 12,345 kWh medidos en frontera comercial',
+]
+
+# Letras que re.IGNORECASE iguala a su par ASCII (ver motor_patrones._EQUIVALENCIAS_IGNORECASE)
+VARIANTES_LETRAS = {'i': 'İı', 's': 'ſ', 'k': 'K'}
+
+def _variar_letras(rnd, linea):
+    return ''.join(
+        rnd.choice(VARIANTES_LETRAS[c.lower()]) if c.lower() in VARIANTES_LETRAS and rnd.random() < 0.1 else c
+        for c in linea
+    )
+
+def _texto_aleatorio(rnd):
+    """
+    Líneas de una factura sintética: plantillas al azar, en cualquier orden, con cambios
+    de mayúsculas, espacios, letras equivalentes y líneas pegadas.
+    """
+    lineas = []
+    for _ in range(rnd.randint(5, 40)):
+        linea = rnd.choice(PLANTILLAS).format(
+            n=rnd.randint(0, 99), d=rnd.randint(1, 28), numero=rnd.randint(1, 10 ** 7),
+            cufe=f"{rnd.getrandbits(96):024x}", monto=f"{rnd.randint(0, 10 ** 9):,}",
+        )
+        caso = rnd.random()
+        if caso < 0.15:
+            linea = linea.upper()
+        elif caso < 0.3:
+            linea = linea.lower()
+        if rnd.random() < 0.2:
+            linea = linea.replace(': ', rnd.choice([':', ' ', '.  ', '']))
+        if rnd.random() < 0.3:
+            linea = _variar_letras(rnd, linea)
+        if lineas and rnd.random() < 0.1:
+            lineas[-1] = f"{lineas[-1]} {linea}"
+        else:
+            lineas.append(linea)
+    return lineas
+
+def _textos_de_pdfs(directorio):
+    rutas = generador.generar_lote(str(directorio), 4, items=(1, 12), paginas_anexo=(0, 1), semilla=7)
+    textos = []
+    for ruta in rutas:
+        paginas = extractores_pdf.extraer_datos_estructurados(ruta)
+        textos.append([linea for p in sorted(paginas) for linea in paginas[p]])
+    return textos
+
+def _textos(directorio):
+    rnd = random.Random(2024)
+    return _textos_de_pdfs(directorio) + [_texto_aleatorio(rnd) for _ in range(300)]
+
+def extraer_original(lineas):
+    """
+    Recorrido original de extractores.extraer_datos_factura (antes del motor).
+    """
+    datos = {}
+    seccion_cliente_activa = False
+    for linea in lineas:
+        linea_lower = linea.lower()
+        if not seccion_cliente_activa:
+            if any(m in linea_lower for m in MARCADORES_CLIENTE):
+                seccion_cliente_activa = True
+
+        for key, patron in PATRONES_ENCABEZADO.items():
+            if key in CAMPOS_CLIENTE and not seccion_cliente_activa:
+                continue
+            if key not in datos:
+                match = patron.search(linea)
+                if match:
+                    if len(match.groups()) > 1:
+                        val = f"{match.group(1)} al {match.group(2)}"
+                    else:
+                        val = match.group(1)
+                    datos[key] = val.strip()
+
+        for key, patron in PATRONES_MONTO.items():
+            if key not in datos:
+                match = patron.search(linea)
+                if match:
+                    datos[key] = limpiar_moneda(linea[match.end():])
+
+        for key, patron in PATRONES_INFO_PIE.items():
+            if key not in datos:
+                match = patron.search(linea)
+                if match:
+                    datos[key] = match.group(1).strip()
+    return datos
+
+def test_motor_equivale_al_recorrido_original(tmp_path):
+    motor = motor_patrones.crear_motor_generales()
+    for lineas in _textos(tmp_path):
+        esperado = extraer_original(lineas)
+        obtenido = motor.extraer(lineas)
+        # Mismos valores y mismo orden de inserción (el orden de las columnas depende de él)
+        assert list(obtenido.items()) == list(esperado.items()), lineas
+
+def test_claves_no_descartan_coincidencias(tmp_path):
+    for lineas in _textos(tmp_path):
+        for linea in lineas:
+            linea_norm = linea.translate(motor_patrones._EQUIVALENCIAS_IGNORECASE).lower()
+            for patrones in GRUPOS:
+                for campo, patron in patrones.items():
+                    if patron.search(linea):
+                        assert any(clave in linea_norm for clave in CLAVES_PATRONES[campo]), (campo, linea)
@@ -0,0 +1,65 @@
+"""
+Pruebas de numeros: la variante para Series debe dar lo mismo que interpretar_valor.
+"""
+
+import math
+import numpy as np
+import pandas as pd
+import numeros
+from numeros import (
+    FORMATO_VACIO, FORMATO_ENTERO, FORMATO_MILES, FORMATO_DECIMAL, FORMATO_AMBIGUO, FORMATO_INVALIDO
+)
+
+TABLA = [
+    ('280.933', 280.933, FORMATO_AMBIGUO),
+    ('$ 8 . 3 6 0', 8.36, FORMATO_AMBIGUO),
+    ('$ 8 . 3 6 0 . 5 6 6', 8360566.0, FORMATO_MILES),
+    ('8,360,566', 8360566.0, FORMATO_MILES),
+    ('1,234.5', 1234.5, FORMATO_DECIMAL),
+    ('150.5', 150.5, FORMATO_DECIMAL),
+    ('8360566', 8360566.0, FORMATO_ENTERO),
+    (' COP 42 ', 42.0, FORMATO_ENTERO),
+    ('COP', 0.0, FORMATO_VACIO),
+    ('', 0.0, FORMATO_VACIO),
+    ('Energía', 0.0, FORMATO_INVALIDO),
+    ('nan', 0.0, FORMATO_INVALIDO),
+    ('inf', 0.0, FORMATO_INVALIDO),
+    (0, 0.0, FORMATO_VACIO),
+    (0.0, 0.0, FORMATO_VACIO),
+    (12, 12.0, FORMATO_ENTERO),
+    (12.5, 12.5, FORMATO_DECIMAL),
+    (np.float64(3.25), 3.25, FORMATO_DECIMAL),
+    (float('nan'), 0.0, FORMATO_VACIO),
+    (None, 0.0, FORMATO_VACIO),
+]
+
+def _como_tuplas(df):
+    return list(zip(df['valor'].tolist(), df['formato'].tolist()))
+
+def test_interpretar_valor():
+    for entrada, valor, formato in TABLA:
+        assert tuple(numeros.interpretar_valor(entrada)) == (valor, formato), entrada
+
+def test_serie_equivale_a_interpretar_valor():
+    entradas = [entrada for entrada, _, _ in TABLA]
+    esperado = [(valor, formato) for _, valor, formato in TABLA]
+    indice = pd.RangeIndex(10, 10 + len(entradas))
+
+    # Columna mixta (textos y números, como se leen de Excel)
+    mixta = pd.Series(entradas, dtype=object, index=indice)
+    resultado = numeros.interpretar_numeros(mixta)
+    assert resultado.index.equals(indice)
+    assert _como_tuplas(resultado) == esperado
+    assert [tuple(i) for i in numeros.interpretar_numeros(entradas)] == esperado
+
+    # Columnas de texto y numéricas
+    textos = [entrada for entrada in entradas if isinstance(entrada, str)]
+    for serie in (pd.Series(textos, dtype=object), pd.Series(textos + [None], dtype='string'),
+                  pd.Series([0, 12, 8360566]), pd.Series([0.0, 12.5, np.nan, 3.25])):
+        esperado_serie = [tuple(numeros.interpretar_valor(None if pd.isna(v) else v)) for v in serie]
+        assert _como_tuplas(numeros.interpretar_numeros(serie)) == esperado_serie, serie.dtype
+
+def test_serie_vacia():
+    resultado = numeros.interpretar_numeros(pd.Series([], dtype=object))
+    assert len(resultado) == 0 and resultado['valor'].dtype == 'float64'
+    assert not any(math.isnan(v) for v in numeros.limpiar_numeros(pd.Series(['1', None, 'x'])))
@@ -0,0 +1,107 @@
+"""
+Pruebas de la instrumentación por etapas (perfilado) y de su uso en main.
+"""
+
+import os
+import csv
+import json
+import time
+import perfilado
+import cache_extraccion
+import main
+from benchmarks import generador
+
+def test_sin_registro_las_mediciones_son_no_ops():
+    assert perfilado._activo is None
+    assert perfilado.etapa(perfilado.ETAPA_ITEMS) is perfilado._NULO
+    lista = [1, 2]
+    assert perfilado.medir_iterador(perfilado.ETAPA_LECTURA, lista) is lista
+    perfilado.contar('items', 5)
+
+def test_registro_acumula_etapas_y_contadores():
+    registro = perfilado.iniciar()
+    try:
+        for _ in range(2):
+            with perfilado.etapa(perfilado.ETAPA_ITEMS):
+                time.sleep(0.01)
+
+        def paginas():
+            for pagina in range(3):
+                time.sleep(0.01)
+                yield pagina
+        assert list(perfilado.medir_iterador(perfilado.ETAPA_LECTURA, paginas())) == [0, 1, 2]
+        perfilado.contar('paginas', 3)
+        perfilado.contar('paginas')
+        resultado = registro.cerrar()
+    finally:
+        perfilado.finalizar()
+
+    etapas = resultado['etapas']
+    assert etapas[perfilado.ETAPA_ITEMS]['wall_s'] >= 0.02
+    assert etapas[perfilado.ETAPA_LECTURA]['wall_s'] >= 0.03
+    assert etapas[perfilado.ETAPA_TOTAL]['wall_s'] >= 0.05
+    assert resultado['contadores'] == {'paginas': 4}
+    json.dumps(resultado)  # Viaja del worker al proceso principal
+
+def test_procesar_pdf_con_perfil(tmp_path):
+    ruta = str(tmp_path / 'f.pdf')
+    generador.generar_factura(ruta, 100, items=5, paginas_anexo=1)
+    cache = cache_extraccion.CacheExtraccion(str(tmp_path / 'cache'))
+    cache.preparar()
+
+    perfil = main.procesar_pdf_a_datos(ruta, cache, perfil=True)['perfil']
+    assert perfilado._activo is None
+    assert perfil['contadores'] == {'paginas': 2, 'lineas': perfil['contadores']['lineas'], 'items': 5}
+    assert perfil['contadores']['lineas'] > 5
+    for etapa in (perfilado.ETAPA_LECTURA, perfilado.ETAPA_ENCABEZADO, perfilado.ETAPA_ITEMS,
+                  perfilado.ETAPA_PROCESAMIENTO, perfilado.ETAPA_TOTAL):
+        assert etapa in perfil['etapas'], etapa
+
+    # Desde la caché no hay lectura del PDF
+    perfil = main.procesar_pdf_a_datos(ruta, cache, perfil=True)['perfil']
+    assert perfil['contadores'] == {'cache': 1, 'items': 5}
+    assert perfilado.ETAPA_LECTURA not in perfil['etapas']
+    assert 'perfil' not in main.procesar_pdf_a_datos(ruta, cache)
+
+def _perfil(total, items=1):
+    return {'etapas': {perfilado.ETAPA_TOTAL: {'wall_s': total, 'cpu_s': total / 2}},
+            'contadores': {'items': items}}
+
+def test_reporte_resumen_y_archivos(tmp_path):
+    reporte = perfilado.ReportePerfil()
+    reporte.registrar('a.pdf', _perfil(1.0))
+    reporte.registrar('b.pdf', _perfil(3.0, items=4))
+    reporte.registrar('c.pdf', None)  # El worker falló: fila en cero
+    exportacion = perfilado.Cronometro()
+    exportacion.wall, exportacion.cpu = 0.5, 0.25
+    reporte.registrar('d.pdf', _perfil(2.0), exportacion)
+
+    assert reporte.mas_lentos(2) == ['b.pdf', 'd.pdf']
+    d = reporte.filas[-1]
+    assert d[f"{perfilado.ETAPA_EXPORTACION}_wall_s"] == 0.5 and d[f"{perfilado.ETAPA_TOTAL}_wall_s"] == 2.5
+    resumen = reporte.resumen()[perfilado.ETAPA_TOTAL]['wall_s']
+    assert resumen['p50'] == 1.75 and resumen['max'] == 3.0
+
+    ruta_csv, ruta_json = reporte.escribir(str(tmp_path / 'perfil'))
+    with open(ruta_csv, encoding='utf-8', newline='') as f:
+        filas = list(csv.DictReader(f))
+    assert [(f['Archivo'], f['items']) for f in filas] == [('a.pdf', '1'), ('b.pdf', '4'), ('c.pdf', '0'), ('d.pdf', '1')]
+    with open(ruta_json, encoding='utf-8') as f:
+        contenido = json.load(f)
+    assert len(contenido['archivos']) == 4 and set(contenido['resumen']) == set(perfilado.ETAPAS)
+
+def test_directorio_con_perfil_y_cprofile(tmp_path):
+    entrada = tmp_path / 'pdfs'
+    salida = tmp_path / 'salida'
+    generador.generar_lote(str(entrada / 'sub'), 2, items=(2, 4), paginas_anexo=(0, 0))
+    main.procesar_directorio_consolidado(str(entrada), str(salida), perfil=True, top_cprofile=1, recursivo=True)
+
+    perfiles = sorted(n for n in os.listdir(salida) if n.startswith('Perfil_'))
+    assert [os.path.splitext(n)[1] for n in perfiles] == ['.csv', '.json', '']
+    with open(salida / perfiles[0], encoding='utf-8', newline='') as f:
+        filas = list(csv.DictReader(f))
+    assert sorted(f['Archivo'] for f in filas) == ['sub/FE_100000.pdf', 'sub/FE_100001.pdf']
+    assert all(float(f[f"{perfilado.ETAPA_EXPORTACION}_wall_s"]) > 0 for f in filas)
+    # El más lento se vuelve a ejecutar bajo cProfile (la subcarpeta pasa al nombre)
+    prof, = os.listdir(salida / perfiles[2])
+    assert prof.startswith('sub_FE_1000') and prof.endswith('.prof')
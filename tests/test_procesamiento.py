@@ -0,0 +1,53 @@
+"""
+Pruebas de los montos con formato ambiguo ('280.933': miles o decimales) desde la
+lectura del texto hasta la validación de FacturaProcessor.
+"""
+
+import logging
+import extractores
+import motor_patrones
+from extractores_pdf import Fila
+from procesamiento import FacturaProcessor
+from tabla_items import ColumnasTabla
+
+def _estado(datos):
+    return FacturaProcessor(datos).obtener_datos_procesados()['generales'][0]
+
+def test_motor_anota_los_totales_ambiguos():
+    ambiguos = []
+    datos = motor_patrones.crear_motor_generales().extraer(
+        ['TOTAL FACTURADO $ 280.933', 'TOTAL A PAGAR $ 1,280,933', 'Anticipo 12.5'], ambiguos
+    )
+    assert datos['total_facturado'] == 280.933 and datos['total_pagar'] == 1280933.0
+    assert ambiguos == ['total_facturado']
+
+def test_items_anotan_tarifa_y_total_ambiguos():
+    item = extractores.parsear_linea_item('1 EN Energía en bolsa kWh 1,000 135.376 280.933')
+    assert (item['tarifa'], item['total']) == (135.376, 280.933)
+    assert item['ambiguos'] == ['total', 'tarifa']
+    assert 'ambiguos' not in extractores.parsear_linea_item('1 EN Energía en bolsa kWh 1,000 135.5 135,500')
+
+    encabezado = Fila('Item Concepto Tarifa Total', [('Item', 40, 58), ('Concepto', 110, 146),
+                                                     ('Tarifa', 430, 455), ('Total', 500, 520)])
+    columnas = ColumnasTabla.desde_encabezado(encabezado)
+    fila = Fila('1 Energía 135.376 280.933', [('1', 40, 45), ('Energía', 110, 140),
+                                               ('135.376', 430, 460), ('280.933', 500, 530)])
+    item = columnas.parsear_fila(fila)
+    assert (item['tarifa'], item['total']) == (135.376, 280.933)
+    assert item['ambiguos'] == ['tarifa', 'total']
+
+def test_total_ambiguo_pide_revision():
+    generales = {'numero_factura': '7', 'total_pagar': 280.933}
+    fila = _estado({'datos_generales': generales, 'items': [], 'montos_ambiguos': ['total_pagar']})
+    assert fila.estado_validacion == 'REVISAR' and 'total_pagar' in fila.errores
+
+    item = {'concepto': 'Energía', 'tarifa': 1.5, 'total': 280.933, 'ambiguos': ['total']}
+    fila = _estado({'datos_generales': {'numero_factura': '7'}, 'items': [item]})
+    assert fila.estado_validacion == 'REVISAR' and 'Item 1' in fila.errores
+
+def test_tarifa_ambigua_solo_se_avisa(caplog):
+    item = {'concepto': 'Energía', 'tarifa': 135.376, 'total': 500.0, 'ambiguos': ['tarifa']}
+    with caplog.at_level(logging.WARNING, logger='procesamiento'):
+        fila = _estado({'datos_generales': {'numero_factura': '7', 'total_pagar': 500.0}, 'items': [item]})
+    assert fila.estado_validacion == 'OK'
+    assert 'Factura 7: 1 tarifas con formato ambiguo' in caplog.text
@@ -0,0 +1,69 @@
+"""
+Pruebas del modo servicio (servicio.ServicioIngesta).
+"""
+
+import os
+import asyncio
+import servicio
+import main
+
+class CacheEspia:
+    def __init__(self):
+        self.desalojos = 0
+
+    def desalojar(self):
+        self.desalojos += 1
+
+def _servicio(tmp_path, **opciones):
+    bandeja = tmp_path / 'bandeja'
+    bandeja.mkdir()
+    ingesta = servicio.ServicioIngesta(main.procesar_pdf_a_datos, main.construir_filas, str(bandeja),
+                                       str(tmp_path / 'salida'), formatos=('csv',), espera_estable=0.05,
+                                       **opciones)
+    os.makedirs(ingesta.directorio_salida)
+    return ingesta, bandeja
+
+def test_pdf_vacio_termina_en_errores(tmp_path):
+    ingesta, bandeja = _servicio(tmp_path, espera_vacio=0.2)
+    (bandeja / 'vacio.pdf').write_bytes(b'')
+
+    async def atender():
+        ingesta.cupos = asyncio.Semaphore(1)
+        await ingesta._atender('vacio.pdf')
+    asyncio.run(atender())
+    ingesta.salida.cerrar()
+
+    assert os.listdir(bandeja / servicio.DIRECTORIO_ERRORES) == ['vacio.pdf']
+    assert ingesta.fallidos == 1
+
+def test_detener_el_servicio_desaloja_la_cache(tmp_path):
+    cache = CacheEspia()
+    ingesta, _ = _servicio(tmp_path, cache=cache, intervalo_sondeo=0.05)
+
+    async def correr_y_detener():
+        tarea = asyncio.get_running_loop().create_task(ingesta.ejecutar())
+        while ingesta.detenido is None:
+            await asyncio.sleep(0.01)
+        ingesta.detenido.set()
+        await tarea
+    asyncio.run(correr_y_detener())
+
+    assert cache.desalojos == 1
+
+def test_pdf_que_desaparece_antes_de_estabilizarse_se_ignora(tmp_path):
+    ingesta, bandeja = _servicio(tmp_path, espera_vacio=5)
+    ruta = bandeja / 'renombrado.pdf'
+    ruta.write_bytes(b'')
+
+    async def atender_y_borrar():
+        ingesta.cupos = asyncio.Semaphore(1)
+        tarea = asyncio.get_running_loop().create_task(ingesta._atender('renombrado.pdf'))
+        await asyncio.sleep(0.2)
+        ruta.unlink()
+        await asyncio.wait_for(tarea, 5)
+    asyncio.run(atender_y_borrar())
+    assert ingesta.salida.exportador is None and ingesta.exitosos == ingesta.fallidos == 0
+    ingesta.salida.cerrar()
+
+    assert os.listdir(bandeja) == []
+    assert os.listdir(ingesta.directorio_salida) == []
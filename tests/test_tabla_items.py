@@ -0,0 +1,53 @@
+"""
+Pruebas de la lectura de la tabla de ítems por columnas (tabla_items.ColumnasTabla).
+"""
+
+import extractores
+from extractores_pdf import Fila
+from tabla_items import ColumnasTabla, FUERA_DE_TABLA, FIN_DE_TABLA
+
+ANCHO = 5.0  # Ancho de carácter de las filas de prueba
+
+def _fila(*celdas):
+    """Fila a partir de (texto, x0); el ancho sale del largo del texto."""
+    return Fila(' '.join(t for t, _ in celdas), [(t, x, x + len(t) * ANCHO) for t, x in celdas])
+
+ENCABEZADO = _fila(('Item', 40), ('Ref', 70), ('Concepto', 110), ('Unidad', 300),
+                   ('Cantidad', 350), ('Tarifa', 430), ('Total', 500))
+
+def _item(*extra, concepto='Energía en bolsa', item='1'):
+    return _fila(*[c for c in [(item, 40)] if item], ('EN', 70), (concepto, 110), ('kWh', 300),
+                 ('4,280,348', 350), ('135.376', 430), ('579,456,390', 500), *extra)
+
+def test_fila_de_la_tabla():
+    columnas = ColumnasTabla.desde_encabezado(ENCABEZADO)
+    item = columnas.parsear_fila(_item())
+    assert item['item'] == '1' and item['concepto'] == 'Energía en bolsa'
+    assert item['cantidad'] == 4280348 and item['total'] == 579456390
+
+def test_texto_a_la_derecha_de_la_tabla_se_ignora():
+    columnas = ColumnasTabla.desde_encabezado(ENCABEZADO)
+    # Una nota al margen derecho no se pega al total de la última columna
+    item = columnas.parsear_fila(_item(('Pág. 99', 620)))
+    assert item['total'] == 579456390
+    # Una fila solo con texto al margen queda fuera de la tabla
+    assert columnas.parsear_fila(_fila(('Original', 620), ('12,345', 680))) is FUERA_DE_TABLA
+
+def test_fila_de_totales_cierra_la_tabla():
+    columnas = ColumnasTabla.desde_encabezado(ENCABEZADO)
+    for concepto in ['TOTAL', 'Subtotal:', 'Sub total', 'Total general', 'TOTALES']:
+        fila = _item(concepto=concepto, item='')
+        assert columnas.parsear_fila(fila) is FIN_DE_TABLA, concepto
+    # Un ítem numerado cuyo concepto empieza por 'Total' sigue siendo ítem
+    assert columnas.parsear_fila(_item(concepto='Total energía')) not in (FIN_DE_TABLA, FUERA_DE_TABLA, None)
+
+def test_extraer_items_se_detiene_en_el_pie():
+    lineas = [
+        ENCABEZADO,
+        _item(),
+        _fila(('TOTAL', 110), ('579,456,390', 500)),
+        # Bajo el pie: ni la línea con montos ni la nota se leen como ítems
+        _fila(('Contribución', 110), ('kWh', 300), ('1', 350), ('2', 430), ('3,000', 500)),
+    ]
+    items = extractores.extraer_items(lineas)
+    assert [i['concepto'] for i in items] == ['Energía en bolsa']
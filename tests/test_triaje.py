@@ -0,0 +1,78 @@
+"""
+Pruebas del triaje previo (triaje.clasificar) y de su uso en la consolidación (--triaje).
+"""
+
+import shutil
+import pytest
+import triaje
+import main
+from openpyxl import load_workbook
+from benchmarks import generador
+from exportacion import HOJAS
+
+def _pdf(ruta, *lineas):
+    """PDF de una página con las líneas indicadas (sin ninguna, una página sin texto)."""
+    pagina = generador._Pagina()
+    for linea in lineas:
+        pagina.texto(40, linea)
+        pagina.salto()
+    generador.escribir_pdf(str(ruta), [pagina])
+    return str(ruta)
+
+def test_clasificar(tmp_path):
+    factura = str(tmp_path / 'factura.pdf')
+    generador.generar_factura(factura, 100, items=3)
+    assert triaje.clasificar(factura) == (triaje.CLASE_FACTURA, '')
+
+    casos = {
+        _pdf(tmp_path / 'escaneada.pdf'): triaje.CLASE_SIN_TEXTO,
+        _pdf(tmp_path / 'nota.pdf', 'NOTA CRÉDITO ELECTRÓNICA No. 55', 'Referencia: FACTURA 100',
+             'CUFE: abc123'): triaje.CLASE_DESCONOCIDO,
+        _pdf(tmp_path / 'anexo.pdf', 'ANEXO 1 - Detalle horario de la medición de la factura',
+             'Hora 01 12,345 kWh'): triaje.CLASE_DESCONOCIDO,
+        # Con tildes y espacios distintos: 'Factura Electrónica' confirma sin CUFE
+        _pdf(tmp_path / 'sin_cufe.pdf', 'Factura  Electrónica de Venta No. 9', 'Total a pagar 1,000'):
+            triaje.CLASE_FACTURA,
+    }
+    for ruta, clase in casos.items():
+        assert triaje.clasificar(ruta).clase == clase, ruta
+    assert 'nota crédito' in triaje.clasificar(str(tmp_path / 'nota.pdf')).motivo
+
+    corrupto = tmp_path / 'corrupto.pdf'
+    corrupto.write_bytes(b'%PDF-1.4\nbasura')
+    resultado = triaje.clasificar(str(corrupto))
+    assert resultado.clase == triaje.CLASE_DESCONOCIDO and resultado.motivo.startswith('PDF ilegible')
+
+def test_metadatos_excluyen(tmp_path):
+    canvas = pytest.importorskip('reportlab.pdfgen.canvas')
+    ruta = str(tmp_path / 'nota.pdf')
+    documento = canvas.Canvas(ruta)
+    documento.setTitle('Nota Débito 77')
+    documento.drawString(40, 800, 'FACTURA ELECTRONICA DE VENTA No. 77')
+    documento.drawString(40, 780, 'CUFE: 0123456789abcdef0123456789abcdef')
+    documento.save()
+    assert triaje.clasificar(ruta) == (triaje.CLASE_DESCONOCIDO, 'Documento de tipo nota débito')
+
+def _log(salida):
+    ruta, = salida.glob('Consolidado_*.xlsx')
+    workbook = load_workbook(ruta, read_only=True)
+    try:
+        hoja = workbook[HOJAS['validacion']]
+        return {fila[1]: (fila[3], fila[4]) for fila in hoja.iter_rows(min_row=2, values_only=True)}
+    finally:
+        workbook.close()
+
+def test_consolidacion_con_triaje(tmp_path):
+    entrada = tmp_path / 'pdfs'
+    entrada.mkdir()
+    generador.generar_factura(str(entrada / 'a.pdf'), 100, items=3)
+    shutil.copyfile(entrada / 'a.pdf', entrada / 'b_copia.pdf')
+    _pdf(entrada / 'c_escaneada.pdf')
+    _pdf(entrada / 'd_nota.pdf', 'NOTA CREDITO No. 5', 'FACTURA 100 CUFE: abc')
+
+    main.procesar_directorio_consolidado(str(entrada), str(tmp_path / 'salida'), triaje_previo=True)
+    log = _log(tmp_path / 'salida')
+    assert log['a.pdf'][0] == 'SÍ'
+    assert log['b_copia.pdf'] == ('OMITIDO', 'Triaje DUPLICADO: Mismo contenido (hash) que a.pdf')
+    assert log['c_escaneada.pdf'][1].startswith(f"Triaje {triaje.CLASE_SIN_TEXTO}:")
+    assert log['d_nota.pdf'][1] == f"Triaje {triaje.CLASE_DESCONOCIDO}: Documento de tipo nota crédito"
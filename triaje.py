@@ -0,0 +1,99 @@
+"""
+Módulo de triaje previo de PDFs.
+Clasifica cada archivo leyendo solo el trailer/metadatos y el texto crudo de la
+página 1 (sin análisis de layout), para enviar a la extracción completa únicamente
+las facturas. Notas crédito, anexos, imágenes escaneadas sin capa de texto y copias
+repetidas quedan registradas en el Log_Proceso sin pasar por extraer_datos_factura.
+"""
+
+import re
+import logging
+import unicodedata
+from collections import namedtuple
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.psparser import PSLiteral
+from pdfminer.pdftypes import resolve1
+from pdfminer.utils import decode_text
+import extractores_pdf
+
+logger = logging.getLogger(__name__)
+
+# Clases del triaje
+CLASE_FACTURA = 'FACTURA'
+CLASE_SIN_TEXTO = 'SIN TEXTO'
+CLASE_DUPLICADO = 'DUPLICADO'
+CLASE_DESCONOCIDO = 'DESCONOCIDO'
+
+# Caracteres (sin espacios) por debajo de los cuales la página 1 se considera sin texto
+MIN_CARACTERES_TEXTO = 20
+
+# Marcadores sobre el texto normalizado (mayúsculas, sin tildes ni espacios)
+MARCADOR_FACTURA = 'FACTURA'
+MARCADORES_CONFIRMACION = ('CUFE', 'FACTURAELECTRONICA')
+MARCADORES_EXCLUSION = {
+    'NOTACREDITO': 'nota crédito',
+    'NOTADEBITO': 'nota débito',
+}
+# Las exclusiones solo se buscan en los metadatos y el inicio de la página (el título)
+LARGO_ENCABEZADO = 300
+
+CAMPOS_METADATOS = ('Title', 'Subject', 'Keywords')
+
+RE_NO_ALFANUMERICO = re.compile(r'[^A-Z0-9]')
+
+ResultadoTriaje = namedtuple('ResultadoTriaje', ['clase', 'motivo'])
+
+def normalizar(texto):
+    """Mayúsculas, sin tildes y sin nada que no sea letra o dígito."""
+    sin_tildes = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+    return RE_NO_ALFANUMERICO.sub('', sin_tildes.upper())
+
+def _texto_metadato(valor):
+    valor = resolve1(valor)
+    if isinstance(valor, bytes):
+        return decode_text(valor)
+    if isinstance(valor, PSLiteral):
+        return str(valor.name)
+    return valor if isinstance(valor, str) else ''
+
+def leer_metadatos(documento):
+    """
+    Campos descriptivos del diccionario Info del trailer.
+    """
+    metadatos = {}
+    for info in documento.info:
+        for campo in CAMPOS_METADATOS:
+            if campo in info:
+                metadatos[campo] = _texto_metadato(info[campo])
+    return metadatos
+
+def duplicado(original):
+    """Resultado para un PDF con el mismo contenido (hash) que otro ya visto."""
+    return ResultadoTriaje(CLASE_DUPLICADO, f"Mismo contenido (hash) que {original}")
+
+def clasificar(ruta_pdf):
+    """
+    Clasifica un PDF como FACTURA, SIN TEXTO o DESCONOCIDO.
+    Returns:
+        ResultadoTriaje: (clase, motivo)
+    """
+    try:
+        with open(ruta_pdf, 'rb') as archivo:
+            documento = PDFDocument(PDFParser(archivo))
+            metadatos = leer_metadatos(documento)
+            texto = normalizar(extractores_pdf.texto_crudo_primera_pagina(documento))
+    except Exception as e:
+        return ResultadoTriaje(CLASE_DESCONOCIDO, f"PDF ilegible: {type(e).__name__}: {e}")
+
+    if len(texto) < MIN_CARACTERES_TEXTO:
+        return ResultadoTriaje(CLASE_SIN_TEXTO, "La página 1 no tiene capa de texto (¿imagen escaneada?)")
+
+    encabezado = normalizar(' '.join(metadatos.values())) + texto[:LARGO_ENCABEZADO]
+    for marcador, tipo in MARCADORES_EXCLUSION.items():
+        if marcador in encabezado:
+            return ResultadoTriaje(CLASE_DESCONOCIDO, f"Documento de tipo {tipo}")
+
+    if MARCADOR_FACTURA in encabezado + texto and any(m in texto for m in MARCADORES_CONFIRMACION):
+        return ResultadoTriaje(CLASE_FACTURA, "")
+    return ResultadoTriaje(CLASE_DESCONOCIDO, "La página 1 no tiene los marcadores de una factura (FACTURA y CUFE)")
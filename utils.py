@@ -1,12 +1,14 @@
 import os
 import re
+import hashlib
 from datetime import datetime
 import logging
+from numeros import interpretar_numero
 
-# Configuración básica de logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+RE_DIGITO = re.compile(r'\d')
+
 def crear_directorio_si_no_existe(ruta):
     if not os.path.exists(ruta):
         try:
@@ -17,46 +19,36 @@ def crear_directorio_si_no_existe(ruta):
 def obtener_nombre_archivo_sin_extension(ruta):
     return os.path.splitext(os.path.basename(ruta))[0]
 
+def calcular_hash_archivo(ruta, tam_bloque=1024 * 1024):
+    """
+    Calcula el SHA-256 del contenido de un archivo leyendo por bloques.
+    """
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(tam_bloque), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
 def limpiar_moneda(valor_str):
     """
     Convierte un string de moneda a float, tolerando espacios internos.
     Ej: '$ 8 . 3 6 0 . 5 6 6' -> 8360566.0
+    La interpretación (con caché y formato detectado) está en numeros.interpretar_numero.
     """
     if not valor_str:
         return 0.0
     
     if isinstance(valor_str, (int, float)):
         return float(valor_str)
-        
-    # 1. Eliminar símbolos de moneda y texto 'COP'
-    s = str(valor_str).upper().replace('$', '').replace('COP', '').strip()
-    
-    if not s:
-        return 0.0
     
-    try:
-        # 2. Truco para OCR/PDFMiner:
-        # A veces los números vienen con espacios: "2 9 , 7 6 0 , 0 0 0"
-        # Si detectamos que hay digitos separados por espacios, los unimos.
-        if re.search(r'\d\s+\d', s):
-            s = s.replace(' ', '')
-            
-        # 3. Limpieza estándar (Asumiendo formato Colombia: 1.000,00 o 1,000.00)
-        # La factura muestra "8,360,566,080" (Comas miles) y "280.933" (Punto decimal o miles)
-        # Gecelca parece usar coma para miles y punto para decimales en totales grandes,
-        # pero a veces punto para miles en tarifas.
-        
-        # Estrategia segura: Eliminar comas
-        s_limpia = s.replace(',', '')
-        
-        # Si quedan puntos, verificar si son miles o decimales
-        # Si hay más de un punto, son miles -> eliminarlos
-        if s_limpia.count('.') > 1:
-            s_limpia = s_limpia.replace('.', '')
-        
-        return float(s_limpia)
-    except ValueError:
-        return 0.0
+    return interpretar_numero(str(valor_str)).valor
+
+def es_numero_valido(token):
+    """Verifica si un string parece un número."""
+    if not RE_DIGITO.search(token):
+        return False
+    limpio = token.replace('$', '').replace(',', '').replace('.', '').replace(' ', '')
+    return limpio.isdigit()
 
 def limpiar_cantidad(valor_str):
     """